@@ -70,6 +70,23 @@ def get_current_user(
     db: Session = Depends(get_db)
 ) -> User:
     """Dependency to get current authenticated user from JWT token"""
+    return _user_for_token(credentials, db)
+
+
+def get_streaming_user(credentials: HTTPAuthorizationCredentials = Security(security)) -> User:
+    """get_current_user for long-lived responses (SSE): the session is closed
+    before the response starts, so an open stream holds no pooled connection.
+    The user comes back detached, with its columns loaded."""
+    db = SessionLocal()
+    try:
+        user = _user_for_token(credentials, db)
+        db.expunge(user)
+        return user
+    finally:
+        db.close()
+
+
+def _user_for_token(credentials: HTTPAuthorizationCredentials, db: Session) -> User:
     token = credentials.credentials
     payload = decode_token(token)
 
@@ -0,0 +1,203 @@
+"""Historical backfill of SDPD NIBRS incidents.
+
+    cd backend
+    python -m backfill --since 2023-01-01 --until 2026-10-01
+    python -m backfill --since 2024-01-01 --url http://127.0.0.1:8765/query   # python -m bench.arcgis_stub
+    python -m backfill --files dumps/                                         # saved ArcGIS query responses
+
+The range is cut into --slice-days slices. A bounded pool (--workers) fetches
+them, every resultOffset page of a slice, while this thread bulk-loads
+finished slices one at a time. Each slice's rows and its checkpoint row in
+backfill_slices commit together. Re-running the same command skips the
+slices already done, so an interrupted run resumes where it stopped, and
+failed slices are retried. With --files, each *.json file is one slice.
+
+Partitions are compacted and hotspots rebuilt once at the end, not per slice.
+A JSON summary goes to stdout and progress to stderr.
+"""
+import argparse
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+import json
+import os
+import sys
+import time
+from typing import Callable, Optional
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def _parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since", type=_parse_date, help="first day to load (YYYY-MM-DD)")
+    parser.add_argument("--until", type=_parse_date, help="stop before this day (default: today)")
+    parser.add_argument("--slice-days", type=int, default=7, help="days per slice (default: 7)")
+    parser.add_argument("--workers", type=int, default=4, help="slices fetched in parallel (default: 4)")
+    parser.add_argument("--page-size", type=int, default=2000, help="ArcGIS resultRecordCount (default: 2000)")
+    parser.add_argument("--url", help="ArcGIS query endpoint (default: the sdpd_nibrs source, SDPD_ARCGIS_URL)")
+    parser.add_argument("--files", help="load saved ArcGIS JSON responses (*.json) from this directory instead")
+    parser.add_argument("--hotspot-source", default="multi", help="source for the final hotspot run (default: multi)")
+    parser.add_argument("--hotspot-mode", choices=["bins", "kde"],
+                        help="mode for the final hotspot run (default: HOTSPOT_MODE, else bins)")
+    parser.add_argument("--no-hotspots", action="store_true", help="skip the final hotspot rebuild")
+    parser.add_argument("--no-compact", action="store_true", help="skip the final partition compaction")
+    args = parser.parse_args(argv)
+    if args.files is None and args.since is None:
+        parser.error("--since is required unless --files is given")
+    if args.slice_days < 1 or args.workers < 1 or args.page_size < 1:
+        parser.error("--slice-days, --workers and --page-size must be positive")
+    return args
+
+
+def date_slices(since: datetime, until: datetime, slice_days: int) -> list[tuple[str, datetime, datetime]]:
+    """(label, start, end) covering [since, until) in `slice_days` steps."""
+    slices = []
+    start = since
+    while start < until:
+        end = min(start + timedelta(days=slice_days), until)
+        slices.append((f"{start:%Y-%m-%d}/{end:%Y-%m-%d}", start, end))
+        start = end
+    return slices
+
+
+def _log(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
+
+
+def _checkpoints(db, source: str, slices: list[tuple[str, Optional[datetime], Optional[datetime]]]) -> dict:
+    """Checkpoint rows for `slices` by label, creating the missing ones as pending."""
+    from models import BackfillSlice
+
+    rows = {row.label: row for row in db.query(BackfillSlice).filter(BackfillSlice.source == source)}
+    for label, start, end in slices:
+        if label not in rows:
+            rows[label] = BackfillSlice(source=source, label=label, slice_start=start, slice_end=end, status="pending")
+            db.add(rows[label])
+    db.commit()
+    return rows
+
+
+def run(args: argparse.Namespace) -> dict:
+    import httpx
+
+    import change_bus
+    from db import Base, SessionLocal, engine
+    import jsonstream
+    import main as app_main
+    import partitions
+    import sources
+
+    Base.metadata.create_all(bind=engine)
+    app_main._ensure_incident_columns()
+    app_main._ensure_hotspot_columns()
+
+    sdpd = sources.get("sdpd_nibrs")
+    client: Optional[httpx.Client] = None
+    fetchers: dict[str, Callable[[], list]] = {}
+    if args.files:
+        directory = os.path.abspath(args.files)
+        source = f"files:{directory}"
+        names = sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+        slices = [(name, None, None) for name in names]
+
+        def read_file(path: str) -> list:
+            with open(path, encoding="utf-8") as f:
+                return list(sdpd.parse(jsonstream.iter_items(jsonstream.read_chunks(f), "features")))
+
+        for name in names:
+            fetchers[name] = lambda path=os.path.join(directory, name): read_file(path)
+    else:
+        url = args.url or sdpd.url
+        source = url
+        until = args.until or datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        slices = date_slices(args.since, until, args.slice_days)
+        client = httpx.Client(timeout=60)
+        for label, start, end in slices:
+            fetchers[label] = lambda start=start, end=end: list(sdpd.parse(sdpd.features(
+                start, end, url=url, page_size=args.page_size, client=client
+            )))
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    summary = {"source": source, "slices": len(slices), "skipped": 0, "done": 0, "failed": 0,
+               "fetched": 0, "inserted": 0, "updated": 0}
+    try:
+        checkpoints = _checkpoints(db, source, slices)
+        todo = [label for label, _, _ in slices if checkpoints[label].status != "done"]
+        summary["skipped"] = len(slices) - len(todo)
+        _log(f"backfill {source}: {len(todo)} of {len(slices)} slices to load")
+
+        def load(label: str, future: Future) -> None:
+            checkpoint = checkpoints[label]
+            try:
+                incidents = future.result()
+                inserted, updated = app_main._upsert_incidents(db, incidents)
+            except Exception as e:
+                db.rollback()
+                checkpoint.attempts += 1
+                checkpoint.updated_at = datetime.utcnow()
+                checkpoint.status = "failed"
+                checkpoint.error = str(e)[:2000]
+                db.commit()
+                summary["failed"] += 1
+                _log(f"  {label}: failed: {e}")
+                return
+            checkpoint.attempts += 1
+            checkpoint.updated_at = datetime.utcnow()
+            checkpoint.status = "done"
+            checkpoint.error = None
+            checkpoint.fetched, checkpoint.inserted, checkpoint.updated = len(incidents), inserted, updated
+            db.commit()
+            summary["done"] += 1
+            summary["fetched"] += len(incidents)
+            summary["inserted"] += inserted
+            summary["updated"] += updated
+            _log(f"  {label}: {len(incidents)} fetched, {inserted} new, {updated} updated")
+
+        # Keep at most two slices per worker in memory; loading is the serial part.
+        window = args.workers * 2
+        queue = list(todo)
+        in_flight: dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="backfill") as pool:
+            try:
+                while queue or in_flight:
+                    while queue and len(in_flight) < window:
+                        label = queue.pop(0)
+                        in_flight[pool.submit(fetchers[label])] = label
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        load(in_flight.pop(future), future)
+            except KeyboardInterrupt:
+                for future in in_flight:
+                    future.cancel()
+                _log("interrupted; finished slices are checkpointed, re-run to resume")
+                raise
+
+        if summary["inserted"] or summary["updated"]:
+            change_bus.record(db, "incidents.changed", {"source": "sdpd_nibrs", "inserted": summary["inserted"]})
+            db.commit()
+        if not args.no_compact:
+            summary["compaction"] = partitions.compact(db)
+    finally:
+        db.close()
+        if client is not None:
+            client.close()
+
+    if not args.no_hotspots and (summary["inserted"] or summary["updated"]):
+        summary["hotspots"] = app_main._run_hotspots(
+            app_main._resolve_hotspot_sources(args.hotspot_source), mode=args.hotspot_mode
+        )
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    summary = run(_parse_args(argv))
+    print(json.dumps(summary, indent=2, default=str))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
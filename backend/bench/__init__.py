@@ -0,0 +1 @@
+"""Synthetic data and end-to-end API benchmarks (see `python -m bench.run --help`)."""
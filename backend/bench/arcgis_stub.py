@@ -0,0 +1,124 @@
+"""Local stand-in for the SDPD NIBRS ArcGIS FeatureServer.
+
+Serves a fixed, seeded set of features in the FeatureServer's JSON shape so
+`/events/pull` can be benchmarked, and the backfill exercised, without the
+network. Feature ids are stable across requests, so repeated pulls exercise
+the update path. Like the real service it honours the OCCURED_ON range in
+`where` and pages with resultOffset / resultRecordCount.
+
+    python -m bench.arcgis_stub --features 200000 --days 730 --port 8765
+"""
+import argparse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+import threading
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from bench.datagen import incident_rows
+
+_EPOCH = datetime(1970, 1, 1)
+_TIMESTAMP_RE = re.compile(r"OCCURED_ON\s*(>=|<)\s*TIMESTAMP\s*'([^']+)'")
+
+
+def build_features(n: int, seed: int = 11, days: int = 7) -> list[dict]:
+    rows = incident_rows(np.random.default_rng(seed), n, datetime.utcnow(), days=days)
+    return [
+        {
+            "attributes": {
+                "NIBRS_UNIQ": f"stub{i}",
+                "OCCURED_ON": int((row["occurred_at"] - _EPOCH).total_seconds() * 1000),
+                "IBR_OFFENSE_DESCRIPTION": row["incident_type"],
+                "PD_OFFENSE_CATEGORY": row["offense_category"],
+                "BLOCK_ADDR": row["block_address"],
+                "CODE_SECTION": None,
+                "IBR_OFFENSE": None,
+                "X": row["lon"],
+                "Y": row["lat"],
+            },
+            "geometry": {"x": row["lon"], "y": row["lat"]},
+        }
+        for i, row in enumerate(rows)
+    ]
+
+
+def _millis(value: str) -> int:
+    return int((datetime.fromisoformat(value) - _EPOCH).total_seconds() * 1000)
+
+
+def query(features: list[dict], where: str, offset: int, count: Optional[int]) -> dict:
+    """The features a FeatureServer query would return for these parameters."""
+    low, high = None, None
+    for op, value in _TIMESTAMP_RE.findall(where or ""):
+        if op == ">=":
+            low = _millis(value)
+        else:
+            high = _millis(value)
+    matched = [
+        feature for feature in features
+        if (low is None or feature["attributes"]["OCCURED_ON"] >= low)
+        and (high is None or feature["attributes"]["OCCURED_ON"] < high)
+    ]
+    page = matched[offset:offset + count] if count else matched[offset:]
+    body: dict = {"features": page}
+    if offset + len(page) < len(matched):
+        body["exceededTransferLimit"] = True
+    return body
+
+
+class ArcGISStub:
+    """`with ArcGISStub(2000) as url:` serves `n` features at `url` until exit."""
+
+    def __init__(self, n_features: int, seed: int = 11, days: int = 7, port: int = 0):
+        features = build_features(n_features, seed, days)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                params = {key: values[-1] for key, values in parse_qs(urlparse(self.path).query).items()}
+                count = int(params["resultRecordCount"]) if params.get("resultRecordCount") else None
+                payload = json.dumps(
+                    query(features, params.get("where", ""), int(params.get("resultOffset") or 0), count)
+                ).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="arcgis-stub", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/query"
+
+    def __enter__(self) -> str:
+        self._thread.start()
+        return self.url
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--features", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=365, help="spread features over this many days before now")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    stub = ArcGISStub(args.features, args.seed, args.days, args.port)
+    print(f"serving {args.features} features at {stub.url}", flush=True)
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,272 @@
+"""Bulk synthetic data for benchmarks.
+
+Rows go in through Core executemany in chunks rather than one ORM object at a
+time, so a million incidents load in seconds. Generation is seeded, so two
+runs at the same scale produce identical datasets.
+"""
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+import time
+
+import numpy as np
+from sqlalchemy import insert
+
+from auth import hash_password
+from models import (
+    Client,
+    ContactLog,
+    FieldReport,
+    FieldReportShare,
+    Group,
+    GroupMember,
+    Incident,
+    IncidentTaxonomy,
+    User,
+)
+
+CHUNK = 10_000
+BENCH_PASSWORD = "bench-password"
+
+# Same neighbourhood centres as the demo seeders in main.py.
+CENTERS = np.array([
+    (32.7157, -117.1611),  # Downtown
+    (32.7406, -117.0840),  # City Heights
+    (32.7007, -117.0825),  # SE SD
+    (32.7831, -117.1192),  # Clairemont
+    (32.7484, -117.1325),  # North Park
+])
+NEIGHBORHOODS = ["Downtown", "City Heights", "Southeastern", "Clairemont", "North Park"]
+OFFENSES = [
+    ("Assault Offenses", "Simple Assault"),
+    ("Larceny/Theft Offenses", "Theft From Motor Vehicle"),
+    ("Burglary/Breaking & Entering", "Burglary/Breaking & Entering"),
+    ("Destruction/Damage/Vandalism of Property", "Destruction/Damage/Vandalism of Property"),
+    ("Motor Vehicle Theft", "Motor Vehicle Theft"),
+    ("Drug/Narcotic Offenses", "Drug/Narcotic Violations"),
+    ("Robbery", "Robbery"),
+]
+OUTCOMES = np.array(["reached", "no_answer", "referral", "other"])
+SEVERITIES = np.array(["low", "medium", "high"])
+
+
+@dataclass(frozen=True)
+class Scale:
+    incidents: int
+    clients: int
+    contacts_per_client: int
+    users: int
+    groups: int
+    field_reports: int
+
+
+SCALES = {
+    "small": Scale(incidents=10_000, clients=1_000, contacts_per_client=5, users=50, groups=8, field_reports=1_000),
+    "medium": Scale(incidents=100_000, clients=5_000, contacts_per_client=6, users=200, groups=20, field_reports=10_000),
+    "large": Scale(incidents=1_000_000, clients=20_000, contacts_per_client=8, users=500, groups=50, field_reports=50_000),
+}
+
+
+def _insert(conn, model, rows: list[dict]) -> None:
+    for start in range(0, len(rows), CHUNK):
+        conn.execute(insert(model.__table__), rows[start:start + CHUNK])
+
+
+def _points(rng: np.random.Generator, n: int, spread_deg: float) -> tuple[np.ndarray, np.ndarray]:
+    """Points clustered around the neighbourhood centres (normal scatter)."""
+    centers = CENTERS[rng.integers(0, len(CENTERS), n)]
+    lat = centers[:, 0] + rng.normal(0, spread_deg, n)
+    lon = centers[:, 1] + rng.normal(0, spread_deg, n)
+    return lat, lon
+
+
+def incident_rows(rng: np.random.Generator, n: int, now: datetime, days: int = 60, first_id: int = 0) -> list[dict]:
+    """SDPD-shaped incidents, weighted toward the recent past like real feeds."""
+    lat, lon = _points(rng, n, 0.015)
+    age_s = rng.exponential(days * 86400 / 3, n).clip(0, days * 86400)
+    offense = rng.integers(0, len(OFFENSES), n)
+    return [
+        {
+            "external_id": f"bench_{first_id + i}",
+            "source": "sdpd_nibrs",
+            "incident_type": OFFENSES[offense[i]][1],
+            "offense_category": OFFENSES[offense[i]][0],
+            "block_address": f"{100 * (i % 50) + 100} BLOCK BENCH ST",
+            "code_section": None,
+            "offense_code": None,
+            "occurred_at": now - timedelta(seconds=float(age_s[i])),
+            "lat": float(lat[i]),
+            "lon": float(lon[i]),
+        }
+        for i in range(n)
+    ]
+
+
+def _encode_incidents(conn, rows: list[dict]) -> list[dict]:
+    """Feed-shaped rows (as incident_rows returns them) -> incidents rows with
+    taxonomy ids, inserting one incident_taxonomy row per distinct combination."""
+    fields = ("source", "incident_type", "offense_category", "code_section", "offense_code")
+    ids: dict[tuple, int] = {}
+    for row in rows:
+        ids.setdefault(tuple(row[f] or "" for f in fields), len(ids) + 1)
+    _insert(conn, IncidentTaxonomy, [{"id": i, **dict(zip(fields, key))} for key, i in ids.items()])
+    return [
+        {
+            "external_id": row["external_id"],
+            "taxonomy_id": ids[tuple(row[f] or "" for f in fields)],
+            "block_address": row["block_address"],
+            "occurred_at": row["occurred_at"],
+            "lat": row["lat"],
+            "lon": row["lon"],
+        }
+        for row in rows
+    ]
+
+
+def generate(engine, scale: Scale, seed: int = 7) -> dict[str, object]:
+    """Populate an empty schema at `scale`; returns counts, the user ids to
+    authenticate as, and how long each table took to load."""
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow()
+    timings: dict[str, float] = {}
+    password_hash = hash_password(BENCH_PASSWORD)
+
+    def timed(label: str, fn) -> None:
+        started = time.perf_counter()
+        fn()
+        timings[label] = round(time.perf_counter() - started, 3)
+
+    with engine.begin() as conn:
+        roles = ["admin"] + ["police" if i % 3 == 0 else "outreach" for i in range(1, scale.users)]
+        users = [
+            {
+                "id": i + 1,
+                "name": f"Bench User {i + 1}",
+                "email": f"bench{i + 1}@example.org",
+                "hashed_password": password_hash,
+                "role": role,
+                "is_active": True,
+                "must_reset_password": False,
+                "created_at": now,
+            }
+            for i, role in enumerate(roles)
+        ]
+        timed("users", lambda: _insert(conn, User, users))
+        user_ids = np.arange(1, scale.users + 1)
+
+        groups = [
+            {"id": g + 1, "name": f"Bench Group {g + 1}", "description": None, "created_by_user_id": 1, "created_at": now}
+            for g in range(scale.groups)
+        ]
+        members = []
+        for g in range(scale.groups):
+            for user_id in rng.choice(user_ids[1:], size=min(12, scale.users - 1), replace=False):
+                members.append({"group_id": g + 1, "user_id": int(user_id), "created_at": now})
+
+        def load_groups() -> None:
+            _insert(conn, Group, groups)
+            _insert(conn, GroupMember, members)
+        timed("groups", load_groups)
+
+        timed("incidents", lambda: _insert(
+            conn, Incident, _encode_incidents(conn, incident_rows(rng, scale.incidents, now))
+        ))
+
+        lat, lon = _points(rng, scale.clients, 0.02)
+        needs = rng.random((scale.clients, 5)) < 0.3
+        follow_up = rng.integers(-10, 20, scale.clients)
+        owners = rng.choice(user_ids, scale.clients)
+        clients = [
+            {
+                "id": c + 1,
+                "display_name": f"Client {c + 1}",
+                "created_by_user_id": int(owners[c]),
+                "neighborhood": NEIGHBORHOODS[c % len(NEIGHBORHOODS)],
+                "notes": None,
+                "created_at": now - timedelta(days=90),
+                "follow_up_at": now + timedelta(days=int(follow_up[c])) if follow_up[c] < 15 else None,
+                "need_housing": bool(needs[c, 0]),
+                "need_food": bool(needs[c, 1]),
+                "need_therapy": bool(needs[c, 2]),
+                "need_job": bool(needs[c, 3]),
+                "need_transport": bool(needs[c, 4]),
+                "home_lat": float(lat[c]),
+                "home_lon": float(lon[c]),
+            }
+            for c in range(scale.clients)
+        ]
+        contact_count = scale.clients * scale.contacts_per_client
+        contact_client = np.repeat(np.arange(1, scale.clients + 1), scale.contacts_per_client)
+        contact_age = rng.uniform(0, 60 * 86400, contact_count)
+        contact_outcome = OUTCOMES[rng.choice(len(OUTCOMES), contact_count, p=[0.5, 0.3, 0.1, 0.1])]
+        contacts = [
+            {
+                "client_id": int(contact_client[k]),
+                "created_by_user_id": int(owners[contact_client[k] - 1]),
+                "contacted_at": now - timedelta(seconds=float(contact_age[k])),
+                "outcome": str(contact_outcome[k]),
+                "note": None,
+            }
+            for k in range(contact_count)
+        ]
+
+        def load_clients() -> None:
+            _insert(conn, Client, clients)
+            _insert(conn, ContactLog, contacts)
+        timed("clients", load_clients)
+
+        senders = rng.choice(user_ids, scale.field_reports)
+        published = rng.random(scale.field_reports) < 0.1
+        report_age = rng.uniform(0, 30 * 86400, scale.field_reports)
+        severity = SEVERITIES[rng.integers(0, len(SEVERITIES), scale.field_reports)]
+        reports = [
+            {
+                "id": r + 1,
+                "sender_user_id": int(senders[r]),
+                "title": f"Field report {r + 1}",
+                "message": "Synthetic benchmark report.",
+                "location_text": NEIGHBORHOODS[r % len(NEIGHBORHOODS)],
+                "severity": str(severity[r]),
+                "status": "new",
+                "published_to_all": bool(published[r]),
+                "published_by_user_id": 1 if published[r] else None,
+                "created_at": now - timedelta(seconds=float(report_age[r])),
+                "published_at": now if published[r] else None,
+            }
+            for r in range(scale.field_reports)
+        ]
+        shares = []
+        for r in range(scale.field_reports):
+            for user_id in rng.choice(user_ids, size=2, replace=False):
+                shares.append({
+                    "field_report_id": r + 1,
+                    "shared_with_user_id": int(user_id),
+                    "shared_with_group_id": None,
+                    "created_by_user_id": int(senders[r]),
+                    "created_at": now,
+                })
+            if scale.groups and r % 4 == 0:
+                shares.append({
+                    "field_report_id": r + 1,
+                    "shared_with_user_id": None,
+                    "shared_with_group_id": int(rng.integers(1, scale.groups + 1)),
+                    "created_by_user_id": int(senders[r]),
+                    "created_at": now,
+                })
+
+        def load_reports() -> None:
+            _insert(conn, FieldReport, reports)
+            _insert(conn, FieldReportShare, shares)
+        timed("field_reports", load_reports)
+
+    member_ids = {row["user_id"] for row in members}
+    return {
+        "scale": asdict(scale),
+        "seed": seed,
+        "admin_user_id": 1,
+        # A police member of at least one group, so their feed exercises every visibility path.
+        "member_user_id": next(
+            (u["id"] for u in users if u["role"] == "police" and u["id"] in member_ids),
+            users[-1]["id"],
+        ),
+        "load_seconds": timings,
+    }
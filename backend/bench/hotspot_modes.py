@@ -0,0 +1,104 @@
+"""Hotspot computation alone, bin counts vs the KDE surface (kde.py).
+
+    cd backend
+    python -m bench.hotspot_modes
+    python -m bench.hotspot_modes --incidents 10000 100000 1000000 --repeat 5
+
+Runs both modes on the same seeded datagen incidents, with no database or
+HTTP in the way, and reports the median of --repeat runs per stage:
+
+- bins: `_bin_hotspot_cells`, the /hotspots/run default.
+- kde_arrays: rows to numpy arrays. Both modes walk every row once; this is
+  the KDE's share of that.
+- kde_surface: rasterize and FFT-convolve the whole city grid.
+- kde_cells: the full `kde.hotspot_cells` (surface, peaks and counts).
+
+The surface cost depends on the grid, not the incident count, so it stays
+flat while bins grows with the rows. The JSON report goes to stdout.
+"""
+import argparse
+from collections import namedtuple
+from datetime import datetime
+import json
+import os
+import sys
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+
+def _parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--incidents", type=int, nargs="+", default=[10_000, 100_000],
+                        help="incident counts to run (default: 10000 100000)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per stage; the median is reported")
+    parser.add_argument("--days", type=int, default=60, help="spread incidents over this many days")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args(argv)
+
+
+def _median_ms(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return round(float(np.median(samples)) * 1000, 2)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = _parse_args(argv)
+    # main binds its engine at import; nothing here touches it.
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+    from bench.datagen import incident_rows
+    import kde
+    from main import _bin_hotspot_cells
+
+    Row = namedtuple("Row", "lat lon occurred_at")
+    grid = kde.Grid()
+    sigma_cells = kde.BANDWIDTH_METERS / grid.cell_m
+    results = []
+    for n in args.incidents:
+        now = datetime.utcnow()
+        rows = [
+            Row(item["lat"], item["lon"], item["occurred_at"])
+            for item in incident_rows(np.random.default_rng(args.seed), n, now, days=args.days)
+        ]
+        lat, lon, age_days = kde.arrays(rows, now)
+        row, col, inside = grid.index(lat, lon)
+        weights = 1.0 + np.exp2(-age_days[inside] / kde.HALF_LIFE_DAYS)
+        bins = _bin_hotspot_cells(rows, now)
+        cells, _ = kde.hotspot_cells(lat, lon, age_days, grid)
+        result = {
+            "incidents": n,
+            "bins_ms": _median_ms(lambda: _bin_hotspot_cells(rows, now), args.repeat),
+            "kde_arrays_ms": _median_ms(lambda: kde.arrays(rows, now), args.repeat),
+            "kde_surface_ms": _median_ms(
+                lambda: kde.smooth(grid.rasterize(row[inside], col[inside], weights), sigma_cells), args.repeat
+            ),
+            "kde_cells_ms": _median_ms(lambda: kde.hotspot_cells(lat, lon, age_days, grid), args.repeat),
+            "bin_cells": len(bins),
+            "kde_peaks": len(cells),
+        }
+        print(f"  {n:>9} incidents  bins={result['bins_ms']}ms  kde: arrays={result['kde_arrays_ms']}ms "
+              f"surface={result['kde_surface_ms']}ms cells={result['kde_cells_ms']}ms", file=sys.stderr)
+        results.append(result)
+
+    report = {
+        "meta": {
+            "grid": [grid.rows, grid.cols],
+            "cell_m": grid.cell_m,
+            "bandwidth_m": kde.BANDWIDTH_METERS,
+            "repeat": args.repeat,
+            "numpy": np.__version__,
+        },
+        "runs": results,
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Cross-worker consistency: two uvicorn processes sharing one SQLite file.
+
+    cd backend
+    python -m bench.multiworker
+    python -m bench.multiworker --poll-seconds 0.5 --slack 0.5
+
+Starts two API workers on a fresh temp database (or --database-url), writes
+through worker A and asserts that worker B catches up within
+--poll-seconds (CHANGE_BUS_POLL_SECONDS) plus --slack for the request itself:
+
+- spatial_incidents: B's /triage/clients/{id}/context counts the incidents
+  A seeded (the incident index was built before the seed).
+- dashboard_events: B's /dashboard/map?sections=events stops serving its
+  cached section and returns the seeded rows.
+- spatial_hotspots: B's context finds the hotspot A computed.
+- stream: an SSE /stream open on B receives A's hotspots.updated event.
+
+Caches are warmed on B first and DASHBOARD_CACHE_SECONDS is set high, so
+only the change bus can refresh them in time. The JSON report goes to
+stdout; the exit status is 1 if any check missed its deadline.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Optional
+
+import httpx
+
+ADMIN_EMAIL = "bench-admin@example.org"
+ADMIN_PASSWORD = "bench-password"
+HOME = (32.7157, -117.1611)  # downtown, one of the seed centres
+
+
+def _parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="use this empty database instead of a temp SQLite file")
+    parser.add_argument("--poll-seconds", type=float, default=0.5, help="CHANGE_BUS_POLL_SECONDS for both workers")
+    parser.add_argument("--slack", type=float, default=0.5, help="allowance on top of the poll interval")
+    parser.add_argument("--seed-incidents", type=int, default=200)
+    return parser.parse_args(argv)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_worker(env: dict[str, str], port: int, log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def _wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready in {timeout}s")
+
+
+def _wait_for(check: Callable[[], bool], started: float, budget: float) -> Optional[float]:
+    """Seconds from `started` until `check()` held, or None if it didn't within `budget`."""
+    deadline = started + budget
+    while True:
+        if check():
+            return round(time.monotonic() - started, 3)
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(0.05)
+
+
+class _StreamWatcher:
+    """Reads an SSE stream in the background and timestamps each event name."""
+
+    def __init__(self, url: str, headers: dict[str, str]):
+        self.seen: list[tuple[str, float]] = []
+        self.connected = threading.Event()
+        self._client = httpx.Client(timeout=None)
+        threading.Thread(target=self._run, args=(url, headers), daemon=True).start()
+
+    def _run(self, url: str, headers: dict[str, str]) -> None:
+        try:
+            with self._client.stream("GET", url, headers=headers) as response:
+                for line in response.iter_lines():
+                    self.connected.set()
+                    if line.startswith("event: "):
+                        self.seen.append((line[len("event: "):], time.monotonic()))
+        except httpx.HTTPError:
+            pass  # closed by close(), or the worker went away
+
+    def close(self) -> None:
+        # An open stream would hold up the worker's graceful shutdown.
+        self._client.close()
+
+    def saw(self, topic: str, since: float) -> bool:
+        return any(name == topic and at >= since for name, at in list(self.seen))
+
+
+def run(args: argparse.Namespace) -> dict:
+    workdir = tempfile.mkdtemp(prefix="vpsd-multiworker-")
+    env = {
+        **os.environ,
+        "DATABASE_URL": args.database_url or f"sqlite:///{workdir}/shared.db",
+        "BOOTSTRAP_ADMIN_EMAIL": ADMIN_EMAIL,
+        "BOOTSTRAP_ADMIN_PASSWORD": ADMIN_PASSWORD,
+        "BOOTSTRAP_ADMIN_NAME": "Bench Admin",
+        "CHANGE_BUS_POLL_SECONDS": str(args.poll_seconds),
+        "DASHBOARD_CACHE_SECONDS": "600",
+    }
+    urls = {}
+    workers = []
+    watcher = None
+    try:
+        # Start one at a time: both create the schema on startup.
+        for name in ("a", "b"):
+            port = _free_port()
+            workers.append(_start_worker(env, port, os.path.join(workdir, f"worker-{name}.log")))
+            urls[name] = f"http://127.0.0.1:{port}"
+            _wait_ready(urls[name])
+
+        a = httpx.Client(base_url=urls["a"], timeout=30)
+        b = httpx.Client(base_url=urls["b"], timeout=30)
+        token = a.post("/auth/login", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}).json()["access_token"]
+        for client in (a, b):
+            client.headers["Authorization"] = f"Bearer {token}"
+
+        client_id = a.post(
+            "/triage/clients", json={"display_name": "Bench client", "home_lat": HOME[0], "home_lon": HOME[1]}
+        ).json()["client"]["id"]
+
+        def context() -> dict:
+            return b.get(f"/triage/clients/{client_id}/context", params={"radius_m": 5000}).json()
+
+        def dashboard() -> dict:
+            return b.get("/dashboard/map", params={"sections": "events", "days": 30}).json()
+
+        # Warm B's caches before the writes.
+        incidents_before = context()["nearby_incidents"]["last_30d"]
+        dashboard()
+        warm = dashboard()
+        assert "events" in warm["cached"], "dashboard events section was not cached on worker B"
+        events_before = len(warm["events"])
+
+        watcher = _StreamWatcher(f"{urls['b']}/stream", {"Authorization": f"Bearer {token}"})
+        watcher.connected.wait(10)
+
+        budget = args.poll_seconds + args.slack
+        checks = {}
+
+        a.post("/hotspots/seed", params={"n": args.seed_incidents}).raise_for_status()
+        written = time.monotonic()
+        checks["spatial_incidents"] = _wait_for(
+            lambda: context()["nearby_incidents"]["last_30d"] > incidents_before, written, budget
+        )
+        checks["dashboard_events"] = _wait_for(
+            lambda: (lambda d: "events" not in d["cached"] and len(d["events"]) > events_before)(dashboard()),
+            written,
+            budget,
+        )
+
+        a.post("/hotspots/run", params={"source": "sdpd_demo"}).raise_for_status()
+        written = time.monotonic()
+        checks["spatial_hotspots"] = _wait_for(lambda: context()["nearest_hotspot"] is not None, written, budget)
+        checks["stream"] = _wait_for(lambda: watcher.saw("hotspots.updated", written), written, budget)
+    finally:
+        if watcher is not None:
+            watcher.close()
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            try:
+                worker.wait(10)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+                worker.wait()
+
+    return {
+        "database": env["DATABASE_URL"],
+        "poll_seconds": args.poll_seconds,
+        "budget_seconds": budget,
+        "seconds_to_visible": checks,
+        "passed": all(seconds is not None for seconds in checks.values()),
+        "logs": workdir,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    report = run(_parse_args(argv))
+    print(json.dumps(report, indent=2))
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""SQL query budgets for the hot endpoints.
+
+    cd backend
+    python -m bench.query_budgets
+    python -m bench.query_budgets --scale medium
+
+Builds a fresh database (as bench.run does), loads the app with SQL_PROFILE=1
+and calls each endpoint below once warm, reading the x-sql-profile header:
+
+- GET /triage/queue
+- GET /hotspots
+- POST /events/pull (against the local ArcGIS stand-in)
+- triage.refresh_all_states, called directly under sql_profile.max_queries
+
+A check fails if it runs more statements than its budget or any statement
+shape reaches SQL_PROFILE_REPEAT_THRESHOLD (an N+1 loop). Budgets are fixed
+counts, so they must hold at every --scale; the pull is the exception and
+also gets PULL_QUERIES_PER_CHUNK per batch of features it saves (repeating
+those per-batch statements is expected). The JSON report goes
+to stdout; the exit status is 1 if any check failed.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from typing import Callable, Optional
+
+# Statements per call. Raise one only together with the change that needs it.
+BUDGETS = {
+    "refresh_all_states": 8,
+    "triage_queue": 4,
+    "hotspots": 4,
+    "events_pull": 28,
+}
+# /events/pull saves what it pulls in sources.CHUNK-sized batches: one lookup
+# and one write per batch on top of the fixed cost above.
+PULL_QUERIES_PER_CHUNK = 2
+
+
+def _parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=["small", "medium", "large"], default="small",
+                        help="10k / 100k / 1M incidents (default: small)")
+    parser.add_argument("--database-url", help="check against this empty database instead of a temp SQLite file")
+    parser.add_argument("--arcgis-features", type=int, default=2000, help="features served by the ArcGIS stand-in")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args(argv)
+
+
+def _check(name: str, budget: int, run: Callable[[int], str], per_chunk: bool = False) -> dict[str, object]:
+    """`run(budget)` enforces the budget through sql_profile and returns the profile summary."""
+    import sql_profile
+
+    result: dict[str, object] = {"name": name, "budget": budget}
+    try:
+        summary = sql_profile.parse_header(run(budget))
+        result["queries"] = int(summary["queries"])
+        result["repeated"] = int(summary["repeated"])
+        if result["repeated"] and not per_chunk:
+            raise AssertionError(f"{result['repeated']} statement shape(s) repeated, i.e. an N+1 loop")
+    except AssertionError as e:
+        result["error"] = str(e)
+    result["passed"] = "error" not in result
+    print(f"  {name:<20} queries={result.get('queries')} budget={result['budget']} "
+          f"{'ok' if result['passed'] else 'FAIL: ' + result['error']}", file=sys.stderr)
+    return result
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = _parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="vpsd-budgets-")
+    # Settings are read at import time, so they must be in place before the app loads.
+    os.environ["SQL_PROFILE"] = "1"
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/budgets.db"
+    os.environ["SINGLEFLIGHT_REUSE_SECONDS"] = "0"  # every request does real work
+
+    from bench.arcgis_stub import ArcGISStub
+    from bench.datagen import SCALES, generate
+
+    with ArcGISStub(args.arcgis_features) as arcgis_url:
+        os.environ["SDPD_ARCGIS_URL"] = arcgis_url
+
+        from fastapi.testclient import TestClient
+
+        from auth import create_access_token
+        from db import Base, SessionLocal, engine
+        import main as app_main
+        import search
+        import sources
+        import sql_profile
+        import triage
+
+        Base.metadata.create_all(bind=engine)
+        search.ensure_schema()
+        print(f"generating {args.scale} dataset in {os.environ['DATABASE_URL']}", file=sys.stderr)
+        dataset = generate(engine, SCALES[args.scale], seed=args.seed)
+
+        def refresh(budget: int) -> str:
+            db = SessionLocal()
+            try:
+                with sql_profile.max_queries(budget) as profile:
+                    triage.refresh_all_states(db)
+                db.commit()
+                return profile.summary()
+            finally:
+                db.close()
+
+        results = [_check("refresh_all_states", BUDGETS["refresh_all_states"], refresh)]
+        pull_chunks = -(-args.arcgis_features // sources.CHUNK)
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(dataset['admin_user_id'])})}"}
+        with TestClient(app_main.app) as client:
+            # Cells must exist before /hotspots has anything to read.
+            client.post("/hotspots/run?source=sdpd_nibrs&mode=bins", headers=headers).raise_for_status()
+            for name, method, path in (
+                ("triage_queue", "GET", "/triage/queue"),
+                ("hotspots", "GET", "/hotspots"),
+                ("events_pull", "POST", "/events/pull?days=7"),
+            ):
+                def request(budget: int, method: str = method, path: str = path) -> str:
+                    client.request(method, path, headers=headers)  # warm caches first
+                    response = client.request(method, path, headers=headers)
+                    if response.status_code >= 400:
+                        raise AssertionError(f"{method} {path} returned {response.status_code}")
+                    sql_profile.assert_max_queries(response, budget)
+                    return response.headers[sql_profile.HEADER]
+
+                budget = BUDGETS[name]
+                if name == "events_pull":
+                    budget += PULL_QUERIES_PER_CHUNK * pull_chunks
+                results.append(_check(name, budget, request, per_chunk=name == "events_pull"))
+
+    report = {
+        "scale": args.scale,
+        "database": os.environ["DATABASE_URL"],
+        "checks": results,
+        "passed": all(row["passed"] for row in results),
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
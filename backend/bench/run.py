@@ -0,0 +1,231 @@
+"""End-to-end API benchmark.
+
+    cd backend
+    python -m bench.run --scale small --out bench-small.json
+    python -m bench.run --scale small --compare bench-small.json
+
+Builds a fresh database at the chosen scale (a temp SQLite file unless
+--database-url is given), starts a local ArcGIS stand-in, and drives the real
+FastAPI app in-process through httpx's ASGI transport. Each scenario reports
+p50/p95/p99 latency and throughput; the JSON on stdout (or --out) is meant
+to be diffed run to run.
+"""
+import argparse
+import asyncio
+from datetime import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+import numpy as np
+
+
+def _parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=["small", "medium", "large"], default="small",
+                        help="10k / 100k / 1M incidents (default: small)")
+    parser.add_argument("--database-url", help="benchmark against this empty database instead of a temp SQLite file")
+    parser.add_argument("--requests", type=int, default=50, help="measured requests per read scenario")
+    parser.add_argument("--write-requests", type=int, default=5, help="measured requests per write scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="in-flight requests for read scenarios")
+    parser.add_argument("--arcgis-features", type=int, default=2000, help="features served by the ArcGIS stand-in")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="previous JSON report; prints p50/p95 changes to stderr")
+    return parser.parse_args(argv)
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    values = np.array(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "p99_ms": round(float(np.percentile(values, 99)), 2),
+        "mean_ms": round(float(values.mean()), 2),
+        "max_ms": round(float(values.max()), 2),
+    }
+
+
+async def _run_scenario(
+    client,
+    name: str,
+    method: str,
+    path: str,
+    token: str,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> dict[str, object]:
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(record: bool) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(method, path, headers=headers)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+        elif record:
+            latencies.append(elapsed)
+
+    for _ in range(warmup):
+        await one(record=False)
+    started = time.perf_counter()
+    await asyncio.gather(*(one(record=True) for _ in range(requests)))
+    wall = time.perf_counter() - started
+
+    result: dict[str, object] = {
+        "name": name,
+        "method": method,
+        "path": path,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+    }
+    if latencies:
+        result.update(_percentiles(latencies))
+    print(f"  {name:<28} p50={result.get('p50_ms')}ms p95={result.get('p95_ms')}ms "
+          f"rps={result['throughput_rps']} errors={errors or 0}", file=sys.stderr)
+    return result
+
+
+async def _run_all(app, tokens: dict[str, str], args: argparse.Namespace) -> list[dict[str, object]]:
+    import httpx
+
+    reads = [
+        ("hotspots", "GET", "/hotspots", "admin"),
+        ("events_7d", "GET", "/events?days=7", "admin"),
+        ("events_7d_columnar", "GET", "/events?days=7&format=columnar", "admin"),
+        ("forecast", "GET", "/hotspots/forecast?source=sdpd_nibrs", "admin"),
+        ("dashboard_map", "GET", "/dashboard/map", "admin"),
+        ("triage_queue", "GET", "/triage/queue", "admin"),
+        ("field_reports_member", "GET", "/field-reports", "member"),
+        ("field_reports_admin", "GET", "/field-reports", "admin"),
+        ("search_member", "GET", "/search?q=field+report", "member"),
+    ]
+    writes = [
+        ("events_pull", "POST", "/events/pull?days=7", "admin"),
+        ("hotspots_run", "POST", "/hotspots/run?source=sdpd_nibrs&mode=bins", "admin"),
+        ("hotspots_run_kde", "POST", "/hotspots/run?source=sdpd_nibrs&mode=kde", "admin"),
+    ]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        # Cells must exist before the read scenarios are meaningful.
+        await client.post("/hotspots/run?source=sdpd_nibrs&mode=bins", headers={"Authorization": f"Bearer {tokens['admin']}"})
+        results = []
+        for name, method, path, who in reads:
+            results.append(await _run_scenario(
+                client, name, method, path, tokens[who], args.requests, args.concurrency, warmup=3,
+            ))
+        for name, method, path, who in writes:
+            results.append(await _run_scenario(
+                client, name, method, path, tokens[who], args.write_requests, 1, warmup=1,
+            ))
+        return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _compare(previous_path: str, report: dict[str, object]) -> None:
+    with open(previous_path) as f:
+        previous = {row["name"]: row for row in json.load(f)["scenarios"]}
+    print(f"\nvs {previous_path}:", file=sys.stderr)
+    for row in report["scenarios"]:
+        before = previous.get(row["name"])
+        if not before or "p50_ms" not in before or "p50_ms" not in row:
+            continue
+        deltas = [
+            f"{key[:3]} {before[key]} -> {row[key]}ms ({(row[key] - before[key]) / before[key] * 100:+.0f}%)"
+            for key in ("p50_ms", "p95_ms")
+            if before[key]
+        ]
+        print(f"  {row['name']:<28} " + "  ".join(deltas), file=sys.stderr)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = _parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="vpsd-bench-")
+    # Settings are read at import time, so they must be in place before the app loads.
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/bench.db"
+    os.environ["SINGLEFLIGHT_REUSE_SECONDS"] = "0"  # every write request does real work
+    os.environ["DASHBOARD_CACHE_SECONDS"] = "0"  # and every dashboard read rebuilds its sections
+
+    from bench.arcgis_stub import ArcGISStub
+    from bench.datagen import SCALES, generate
+
+    with ArcGISStub(args.arcgis_features) as arcgis_url:
+        os.environ["SDPD_ARCGIS_URL"] = arcgis_url
+
+        from auth import create_access_token
+        from db import Base, SessionLocal, engine
+        import main as app_main
+        import report_visibility
+        import search
+        import triage
+
+        Base.metadata.create_all(bind=engine)
+        search.ensure_schema()
+        print(f"generating {args.scale} dataset in {os.environ['DATABASE_URL']}", file=sys.stderr)
+        started = time.perf_counter()
+        dataset = generate(engine, SCALES[args.scale], seed=args.seed)
+        db = SessionLocal()
+        try:
+            report_visibility.rebuild_all(db)
+            search.rebuild_all(db)
+            triage.refresh_all_states(db)
+            db.commit()
+        finally:
+            db.close()
+        dataset["setup_seconds"] = round(time.perf_counter() - started, 3)
+
+        tokens = {
+            "admin": create_access_token({"sub": str(dataset["admin_user_id"])}),
+            "member": create_access_token({"sub": str(dataset["member_user_id"])}),
+        }
+        print("running scenarios", file=sys.stderr)
+        scenarios = asyncio.run(_run_all(app_main.app, tokens, args))
+
+    report = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+            "arcgis_features": args.arcgis_features,
+            "requests": args.requests,
+            "write_requests": args.write_requests,
+            "concurrency": args.concurrency,
+        },
+        "dataset": dataset,
+        "scenarios": scenarios,
+    }
+    if args.compare:
+        _compare(args.compare, report)
+    encoded = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(encoded + "\n")
+    else:
+        print(encoded)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+import select as select_module
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import event, func, text
+
+from db import DATABASE_URL, SessionLocal, engine
+from models import ChangeLogEntry
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = float(os.getenv("CHANGE_BUS_POLL_SECONDS", "0.5"))
+RETENTION_SECONDS = int(os.getenv("CHANGE_BUS_RETENTION_SECONDS", "3600"))
+# How long a skipped seq is re-checked before we assume its transaction rolled back.
+GAP_GRACE_SECONDS = 30
+_PRUNE_EVERY_SECONDS = 300
+_BATCH = 500
+_PG_CHANNEL = "vpsd_changes"
+_IS_POSTGRES = DATABASE_URL.startswith("postgresql")
+
+Handler = Callable[[ChangeLogEntry], None]
+
+
+def record(db, topic: str, payload: dict, audience: Optional[Iterable[int]] = None) -> None:
+    """Append a change inside the caller's transaction; it becomes visible on commit."""
+    db.add(
+        ChangeLogEntry(
+            topic=topic,
+            payload=json.dumps(payload, default=str),
+            audience=json.dumps(sorted(audience)) if audience is not None else None,
+        )
+    )
+    db.info["change_bus_pending"] = True
+    if _IS_POSTGRES:
+        # Delivered by Postgres only if and when this transaction commits.
+        db.execute(text("SELECT pg_notify(:channel, '')"), {"channel": _PG_CHANNEL})
+
+
+class ChangeBus:
+    """Per-process consumer of the shared change_log table.
+
+    Every worker tails change_log by seq and runs the local handlers
+    registered for each topic (cache invalidation, SSE fan-out), so state
+    held in process memory converges across uvicorn workers. Postgres wakes
+    consumers with LISTEN/NOTIFY; SQLite relies on the poll interval, and
+    commits in this process wake the local consumer immediately.
+    """
+
+    def __init__(self, poll_seconds: float = POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._handlers: list[tuple[str, Handler]] = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_seq = 0
+        self._gaps: dict[int, float] = {}
+        self._last_prune = 0.0
+
+    def subscribe(self, topic_prefix: str, handler: Handler) -> None:
+        self._handlers.append((topic_prefix, handler))
+
+    def poke(self) -> None:
+        self._wake.set()
+
+    @property
+    def last_seq(self) -> int:
+        return self._last_seq
+
+    def open_gaps(self) -> list[int]:
+        """Skipped seqs whose rows may still commit (see drain)."""
+        return list(self._gaps.copy())
+
+    def start(self, warm: Optional[Callable[[list[ChangeLogEntry]], None]] = None, warm_limit: int = 0) -> None:
+        """Begin consuming from the current end of the log.
+
+        `warm` receives the newest `warm_limit` existing entries (oldest first)
+        without running handlers, e.g. to pre-fill an SSE replay buffer.
+        """
+        if self._thread is not None:
+            return
+        db = SessionLocal()
+        try:
+            self._last_seq = db.query(func.max(ChangeLogEntry.seq)).scalar() or 0
+            if warm is not None and warm_limit:
+                recent = (
+                    db.query(ChangeLogEntry)
+                    .order_by(ChangeLogEntry.seq.desc())
+                    .limit(warm_limit)
+                    .all()
+                )
+                warm(list(reversed(recent)))
+        finally:
+            db.close()
+
+        self._thread = threading.Thread(target=self._run, name="change-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self) -> None:
+        listener = self._pg_listener() if _IS_POSTGRES else None
+        while not self._stop.is_set():
+            try:
+                self.drain()
+                self._maybe_prune()
+            except Exception:
+                logger.exception("change bus poll failed")
+            self._wait(listener)
+
+    def _wait(self, listener) -> None:
+        if listener is None:
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            return
+        try:
+            ready, _, _ = select_module.select([listener], [], [], self.poll_seconds)
+            if ready:
+                listener.poll()
+                listener.notifies.clear()
+        except Exception:
+            logger.exception("change bus LISTEN connection failed; falling back to polling")
+            time.sleep(self.poll_seconds)
+        self._wake.clear()
+
+    def _pg_listener(self):
+        try:
+            raw = engine.raw_connection()
+            conn = raw.driver_connection
+            conn.set_isolation_level(0)  # autocommit so LISTEN takes effect immediately
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {_PG_CHANNEL}")
+            return conn
+        except Exception:
+            logger.exception("change bus could not LISTEN; polling only")
+            return None
+
+    def drain(self) -> int:
+        """Dispatch every committed entry past our cursor; returns how many ran."""
+        db = SessionLocal()
+        try:
+            entries = (
+                db.query(ChangeLogEntry)
+                .filter(ChangeLogEntry.seq > self._last_seq)
+                .order_by(ChangeLogEntry.seq.asc())
+                .limit(_BATCH)
+                .all()
+            )
+            if self._gaps:
+                entries += (
+                    db.query(ChangeLogEntry)
+                    .filter(ChangeLogEntry.seq.in_(list(self._gaps)))
+                    .all()
+                )
+                entries.sort(key=lambda entry: entry.seq)
+            for entry in entries:
+                db.expunge(entry)
+        finally:
+            db.close()
+
+        now = time.monotonic()
+        for entry in entries:
+            if entry.seq in self._gaps:
+                del self._gaps[entry.seq]
+            elif entry.seq > self._last_seq:
+                # Seqs are allocated before commit; on Postgres a lower one can
+                # commit after a higher one, so remember skipped values for a while.
+                for missing in range(self._last_seq + 1, entry.seq):
+                    self._gaps[missing] = now
+                self._last_seq = entry.seq
+            else:
+                continue
+            self._dispatch(entry)
+
+        self._gaps = {seq: seen for seq, seen in self._gaps.items() if now - seen < GAP_GRACE_SECONDS}
+        return len(entries)
+
+    def _dispatch(self, entry: ChangeLogEntry) -> None:
+        for prefix, handler in self._handlers:
+            if entry.topic.startswith(prefix):
+                try:
+                    handler(entry)
+                except Exception:
+                    logger.exception("change bus handler failed for %s", entry.topic)
+
+    def _maybe_prune(self) -> None:
+        now = time.monotonic()
+        if now - self._last_prune < _PRUNE_EVERY_SECONDS:
+            return
+        self._last_prune = now
+        db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=RETENTION_SECONDS)
+            db.query(ChangeLogEntry).filter(ChangeLogEntry.created_at < cutoff).delete(
+                synchronize_session=False
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+def entry_payload(entry: ChangeLogEntry) -> dict:
+    return json.loads(entry.payload)
+
+
+def entry_audience(entry: ChangeLogEntry) -> Optional[set[int]]:
+    return set(json.loads(entry.audience)) if entry.audience is not None else None
+
+
+bus = ChangeBus()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _wake_local_consumer(session) -> None:
+    if session.info.pop("change_bus_pending", False):
+        bus.poke()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _clear_pending(session) -> None:
+    session.info.pop("change_bus_pending", None)
@@ -0,0 +1,227 @@
+"""Cross-source incident deduplication at ingest.
+
+The same event can arrive from several sources under different external ids
+(SDPD and the Sheriff both reporting a call near a city line). Every ingested
+incident gets a dedup_key: its offense, a grid cell twice DISTANCE_METERS on
+a side and a time bucket twice WINDOW_MINUTES long. A match is then at most
+half a cell or bucket away, so a new incident's candidates are the rows under
+its own key or the neighbouring cell/bucket on its nearer side along each
+axis, for the same offense. That is 8 keys, read through
+ix_incidents_dedup_key, so each incident costs a few hash lookups and is
+never compared pairwise against the table.
+
+A candidate matches when it comes from another source and lies within
+DISTANCE_METERS and WINDOW_MINUTES. The new row is linked, through
+canonical_id, to the closest match's canonical incident. Rows with
+canonical_id NULL are canonical. Only inserts are linked; re-pulled rows
+keep their link.
+
+Per-source views (/hotspots/forecast, daily summaries) count every row of
+their source. Aggregations across sources count a duplicate only when its
+canonical incident is not counted too (see `counted`).
+"""
+import functools
+import math
+import os
+import re
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import bindparam, exists, or_, select, text
+from sqlalchemy.orm import aliased
+
+import metrics
+from models import Incident, IncidentTaxonomy
+import taxonomy
+
+DISTANCE_METERS = float(os.getenv("INCIDENT_DEDUP_DISTANCE_METERS", "150"))
+WINDOW_MINUTES = float(os.getenv("INCIDENT_DEDUP_WINDOW_MINUTES", "30"))
+ENABLED = DISTANCE_METERS > 0 and WINDOW_MINUTES > 0
+
+_METERS_PER_DEGREE = 111_320.0
+# Longitude cells are sized at 34N, just north of the county, so a cell is at
+# least 2 * DISTANCE_METERS wide wherever our incidents are.
+_LAT_STEP = 2 * DISTANCE_METERS / _METERS_PER_DEGREE if ENABLED else 1.0
+_LON_STEP = _LAT_STEP / math.cos(math.radians(34.0))
+_BUCKET_SECONDS = 2 * WINDOW_MINUTES * 60 if ENABLED else 1.0
+_EPOCH = datetime(1970, 1, 1)
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+@functools.lru_cache(maxsize=1024)
+def _normalize(raw: str) -> str:
+    return _NON_ALNUM.sub("", raw.lower()) or "unknown"
+
+
+def offense(item: dict) -> str:
+    """Offense part of the key: the category, lowercased, letters and digits only,
+    so "ASSAULT OFFENSES" and "Assault offenses" agree across feeds."""
+    return _normalize(str(item.get("offense_category") or item.get("incident_type") or ""))
+
+
+def _position(lat: float, lon: float, occurred_at: datetime) -> tuple[float, float, float]:
+    """Position in cell/bucket units; the integer parts make the key."""
+    return lat / _LAT_STEP, lon / _LON_STEP, (occurred_at - _EPOCH).total_seconds() / _BUCKET_SECONDS
+
+
+def key(item: dict) -> Optional[str]:
+    """dedup_key for a normalized incident dict; None when dedup is off."""
+    if not ENABLED:
+        return None
+    x, y, t = _position(float(item["lat"]), float(item["lon"]), item["occurred_at"])
+    return f"{offense(item)}:{math.floor(x)}:{math.floor(y)}:{math.floor(t)}"
+
+
+def _neighbour_keys(dedup_key: str, lat: float, lon: float, occurred_at: datetime) -> list[str]:
+    """The keys any match of the incident at (lat, lon, occurred_at) can be under."""
+    name = dedup_key.rsplit(":", 3)[0]
+    axes = []
+    for value in _position(lat, lon, occurred_at):
+        cell = math.floor(value)
+        axes.append((cell, cell - 1 if value - cell < 0.5 else cell + 1))
+    return [f"{name}:{i}:{j}:{b}" for i in axes[0] for j in axes[1] for b in axes[2]]
+
+
+def _distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dy = (lat2 - lat1) * _METERS_PER_DEGREE
+    dx = (lon2 - lon1) * _METERS_PER_DEGREE * math.cos(math.radians((lat1 + lat2) / 2))
+    return math.hypot(dx, dy)
+
+
+def link(db, external_ids: list[str]) -> int:
+    """Link the just-inserted incidents `external_ids` to earlier matches from
+    other sources. Returns how many were linked."""
+    if not ENABLED or not external_ids:
+        return 0
+    table = Incident.__table__
+    columns = (table.c.id, table.c.canonical_id, table.c.dedup_key, table.c.lat, table.c.lon,
+               table.c.occurred_at, IncidentTaxonomy.source)
+    new_rows = db.execute(
+        select(*columns).join_from(table, IncidentTaxonomy, table.c.taxonomy_id == IncidentTaxonomy.id)
+        .where(table.c.external_id.in_(external_ids), table.c.dedup_key.is_not(None))
+        .order_by(table.c.id)
+    ).all()
+    neighbours = {
+        row.id: _neighbour_keys(row.dedup_key, float(row.lat), float(row.lon), row.occurred_at)
+        for row in new_rows
+    }
+    wanted = sorted({k for keys in neighbours.values() for k in keys})
+    if not wanted:
+        return 0
+    joined = select(*columns).join_from(table, IncidentTaxonomy, table.c.taxonomy_id == IncidentTaxonomy.id)
+
+    # The hash index: dedup_key -> [id, canonical_id, lat, lon, occurred_at, source].
+    # It holds the new rows too, so a chunk can match within itself.
+    index: dict[str, list[list]] = {}
+    for offset in range(0, len(wanted), 5000):
+        for row in db.execute(
+            joined.where(table.c.dedup_key.in_(bindparam("keys", expanding=True))),
+            {"keys": wanted[offset:offset + 5000]},
+        ):
+            index.setdefault(row.dedup_key, []).append(
+                [row.id, row.canonical_id, float(row.lat), float(row.lon), row.occurred_at, row.source]
+            )
+    by_id = {entry[0]: entry for entries in index.values() for entry in entries}
+
+    # Sources already in each candidate cluster (canonical id -> sources): a
+    # cluster never takes a second incident from the same source. Members can
+    # sit outside the neighbourhood read above, so fetch them by canonical id.
+    clusters: dict[int, set[str]] = {}
+    for entry in by_id.values():
+        clusters.setdefault(entry[1] or entry[0], set()).add(entry[5])
+    roots = list(clusters)
+    for offset in range(0, len(roots), 5000):
+        batch = roots[offset:offset + 5000]
+        for root, member, source in db.execute(
+            select(table.c.canonical_id, table.c.id, IncidentTaxonomy.source)
+            .join_from(table, IncidentTaxonomy, table.c.taxonomy_id == IncidentTaxonomy.id)
+            .where(or_(table.c.id.in_(bindparam("ids", expanding=True)),
+                       table.c.canonical_id.in_(bindparam("ids", expanding=True)))),
+            {"ids": batch},
+        ):
+            clusters[root or member].add(source)
+
+    window = WINDOW_MINUTES * 60
+    links = []
+    for row in new_rows:
+        lat, lon = float(row.lat), float(row.lon)
+        best = None
+        best_score = None
+        for neighbour in neighbours[row.id]:
+            for cand_id, cand_canonical, cand_lat, cand_lon, cand_at, _ in index.get(neighbour, ()):
+                root = cand_canonical or cand_id
+                # Earlier rows only: a row is never the canonical of something ingested before it.
+                if cand_id >= row.id or row.source in clusters[root]:
+                    continue
+                seconds = abs((cand_at - row.occurred_at).total_seconds())
+                if seconds > window:
+                    continue
+                meters = _distance_m(lat, lon, cand_lat, cand_lon)
+                if meters > DISTANCE_METERS:
+                    continue
+                score = seconds / window + meters / DISTANCE_METERS
+                if best_score is None or score < best_score:
+                    best, best_score = root, score
+        if best is not None:
+            by_id[row.id][1] = best
+            clusters[best].add(row.source)
+            links.append({"row_id": row.id, "canonical_id": best})
+
+    if links:
+        db.execute(
+            table.update().where(table.c.id == bindparam("row_id")).values(canonical_id=bindparam("canonical_id")),
+            links,
+        )
+        metrics.INCIDENT_DUPLICATES.inc(len(links))
+    return len(links)
+
+
+def counted(sources: Optional[list[str]] = None):
+    """Filter on Incident keeping each event once: drops a duplicate whose
+    canonical incident is counted as well, being from one of `sources` (any
+    source when None)."""
+    if sources is None:
+        return Incident.canonical_id.is_(None)
+    canonical = aliased(Incident)
+    return ~exists().where(
+        canonical.id == Incident.canonical_id,
+        canonical.taxonomy_id.in_(taxonomy.source_ids(*sources)),
+    )
+
+
+def promote_orphans(db) -> int:
+    """Make duplicates whose canonical row left the hot table (archived or
+    expired) canonical themselves."""
+    return db.execute(text(
+        "UPDATE incidents SET canonical_id = NULL WHERE canonical_id IS NOT NULL"
+        " AND NOT EXISTS (SELECT 1 FROM incidents AS canonical WHERE canonical.id = incidents.canonical_id)"
+    )).rowcount
+
+
+def rebuild(db, chunk: int = 5000) -> int:
+    """Key and link the ingested hot rows that predate dedup (dedup_key NULL),
+    oldest id first, as if they had been ingested now. Demo rows have no
+    external_id and are left out. Returns how many were linked."""
+    if not ENABLED:
+        return 0
+    table = Incident.__table__
+    linked = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(table.c.id, table.c.external_id, table.c.lat, table.c.lon, table.c.occurred_at,
+                   IncidentTaxonomy.offense_category, IncidentTaxonomy.incident_type)
+            .join_from(table, IncidentTaxonomy, table.c.taxonomy_id == IncidentTaxonomy.id)
+            .where(table.c.dedup_key.is_(None), table.c.external_id.is_not(None), table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(chunk)
+        ).all()
+        if not rows:
+            return linked
+        db.execute(
+            table.update().where(table.c.id == bindparam("row_id")).values(dedup_key=bindparam("dedup_key")),
+            [{"row_id": row.id, "dedup_key": key(row._asdict())} for row in rows],
+        )
+        linked += link(db, [row.external_id for row in rows if row.external_id])
+        db.commit()
+        last_id = rows[-1].id
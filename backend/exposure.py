@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta
+from math import cos, radians
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+
+import dedup
+from models import Client, ClientExposure, HotspotCell, Incident
+
+DEFAULT_RADIUS_M = 500
+HOTSPOT_RADIUS_M = 1500
+_M_PER_DEG_LAT = 111_320.0
+_NEIGHBOR_OFFSETS = [(di, dj) for di in (-1, 0, 1) for dj in (-1, 0, 1)]
+
+
+def _project(lat: np.ndarray, lon: np.ndarray, ref_lat: float) -> tuple[np.ndarray, np.ndarray]:
+    """Equirectangular projection to meters; accurate to well under 1% at city scale."""
+    return lon * _M_PER_DEG_LAT * cos(radians(ref_lat)), lat * _M_PER_DEG_LAT
+
+
+def grid_join(
+    a_x: np.ndarray,
+    a_y: np.ndarray,
+    b_x: np.ndarray,
+    b_y: np.ndarray,
+    radius_m: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Every (a, b) pair closer than `radius_m`, as (a_idx, b_idx, distance_m).
+
+    `b` is bucketed into `radius_m` cells and sorted by cell key; each `a`
+    point then only pairs with the slices of its own and the eight
+    neighbouring cells, found with `searchsorted`. Work is proportional to
+    the number of candidate pairs, never len(a) * len(b).
+    """
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+    if not len(a_x) or not len(b_x):
+        return empty
+
+    b_i = np.floor(b_y / radius_m).astype(np.int64)
+    b_j = np.floor(b_x / radius_m).astype(np.int64)
+    # Pack (row, col) into one sortable key; offsets keep both halves positive.
+    stride = np.int64(1 << 31)
+    b_key = (b_i + (1 << 30)) * stride + (b_j + (1 << 30))
+    order = np.argsort(b_key, kind="stable")
+    b_key_sorted = b_key[order]
+
+    a_i = np.floor(a_y / radius_m).astype(np.int64)
+    a_j = np.floor(a_x / radius_m).astype(np.int64)
+
+    a_parts, b_parts = [], []
+    for di, dj in _NEIGHBOR_OFFSETS:
+        key = (a_i + di + (1 << 30)) * stride + (a_j + dj + (1 << 30))
+        lo = np.searchsorted(b_key_sorted, key, side="left")
+        hi = np.searchsorted(b_key_sorted, key, side="right")
+        counts = hi - lo
+        total = int(counts.sum())
+        if not total:
+            continue
+        a_idx = np.repeat(np.arange(len(a_x)), counts)
+        # Position within each a-point's run, added to that run's start offset.
+        run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        b_pos = np.repeat(lo, counts) + (np.arange(total) - run_starts)
+        a_parts.append(a_idx)
+        b_parts.append(order[b_pos])
+
+    if not a_parts:
+        return empty
+
+    a_idx = np.concatenate(a_parts)
+    b_idx = np.concatenate(b_parts)
+    dist = np.hypot(a_x[a_idx] - b_x[b_idx], a_y[a_idx] - b_y[b_idx])
+    keep = dist <= radius_m
+    return a_idx[keep], b_idx[keep], dist[keep]
+
+
+def compute_exposure(
+    db,
+    *,
+    radius_m: int = DEFAULT_RADIUS_M,
+    hotspot_radius_m: int = HOTSPOT_RADIUS_M,
+    now: Optional[datetime] = None,
+) -> list[dict[str, object]]:
+    """Exposure metrics for every client with a home location, in one batched pass."""
+    now = now or datetime.utcnow()
+    clients = db.execute(
+        select(Client.id, Client.home_lat, Client.home_lon)
+        .where(Client.home_lat.is_not(None), Client.home_lon.is_not(None))
+    ).all()
+    if not clients:
+        return []
+
+    client_ids = np.array([row[0] for row in clients], dtype=np.int64)
+    c_lat = np.array([row[1] for row in clients], dtype=float)
+    c_lon = np.array([row[2] for row in clients], dtype=float)
+    ref_lat = float(c_lat.mean())
+    c_x, c_y = _project(c_lat, c_lon, ref_lat)
+
+    incidents = db.execute(
+        select(Incident.lat, Incident.lon, Incident.occurred_at)
+        .where(Incident.occurred_at >= now - timedelta(days=30), dedup.counted())
+    ).all()
+    i_lat = np.array([row[0] for row in incidents], dtype=float)
+    i_lon = np.array([row[1] for row in incidents], dtype=float)
+    i_age_h = np.array([(now - row[2]).total_seconds() / 3600 for row in incidents], dtype=float)
+    i_x, i_y = _project(i_lat, i_lon, ref_lat)
+
+    c_idx, inc_idx, _ = grid_join(c_x, c_y, i_x, i_y, radius_m)
+    ages = i_age_h[inc_idx]
+    n = len(client_ids)
+    counts_30d = np.bincount(c_idx, minlength=n)
+    counts_7d = np.bincount(c_idx[ages <= 24 * 7], minlength=n)
+    counts_24h = np.bincount(c_idx[ages <= 24], minlength=n)
+
+    hotspots = db.execute(select(HotspotCell.id, HotspotCell.grid_lat, HotspotCell.grid_lon, HotspotCell.risk_score)).all()
+    nearest_cell = np.full(n, -1, dtype=np.int64)
+    nearest_dist = np.full(n, np.inf)
+    if hotspots:
+        h_x, h_y = _project(
+            np.array([row[1] for row in hotspots], dtype=float),
+            np.array([row[2] for row in hotspots], dtype=float),
+            ref_lat,
+        )
+        hc_idx, h_idx, h_dist = grid_join(c_x, c_y, h_x, h_y, hotspot_radius_m)
+        if len(hc_idx):
+            # Sort by (client, distance) and keep the first row per client.
+            order = np.lexsort((h_dist, hc_idx))
+            hc_sorted = hc_idx[order]
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = hc_sorted[1:] != hc_sorted[:-1]
+            winners = order[first]
+            nearest_cell[hc_idx[winners]] = h_idx[winners]
+            nearest_dist[hc_idx[winners]] = h_dist[winners]
+
+    results = []
+    for k in range(n):
+        cell = hotspots[nearest_cell[k]] if nearest_cell[k] >= 0 else None
+        results.append({
+            "client_id": int(client_ids[k]),
+            "radius_m": radius_m,
+            "incidents_24h": int(counts_24h[k]),
+            "incidents_7d": int(counts_7d[k]),
+            "incidents_30d": int(counts_30d[k]),
+            "nearest_hotspot_id": cell[0] if cell else None,
+            "nearest_hotspot_risk": cell[3] if cell else None,
+            "nearest_hotspot_distance_m": int(round(nearest_dist[k])) if cell else None,
+        })
+    return results
+
+
+def store_exposure(db, results: list[dict[str, object]], now: Optional[datetime] = None) -> int:
+    """Replace the stored exposure snapshot with `results` (caller commits)."""
+    now = now or datetime.utcnow()
+    db.query(ClientExposure).delete(synchronize_session=False)
+    if results:
+        db.bulk_insert_mappings(ClientExposure, [{**row, "computed_at": now} for row in results])
+    return len(results)
+
+
+def serialize_exposure(row: ClientExposure) -> dict[str, object]:
+    return {
+        "client_id": row.client_id,
+        "radius_m": row.radius_m,
+        "incidents_24h": row.incidents_24h,
+        "incidents_7d": row.incidents_7d,
+        "incidents_30d": row.incidents_30d,
+        "nearest_hotspot_id": row.nearest_hotspot_id,
+        "nearest_hotspot_risk": row.nearest_hotspot_risk,
+        "nearest_hotspot_distance_m": row.nearest_hotspot_distance_m,
+        "computed_at": row.computed_at.isoformat() if row.computed_at else None,
+    }
@@ -2,6 +2,7 @@ from datetime import datetime, timedelta
 from math import floor
 from db import SessionLocal
 from models import Incident, HotspotCell
+import taxonomy
 
 GRID_SIZE = 0.005  # ≈ 500m
 
@@ -16,7 +17,7 @@ def compute_hotspots(source: str):
     recent_cut = now - timedelta(days=7)
     baseline_cut = now - timedelta(days=35)
 
-    incidents = db.query(Incident).filter(Incident.source == source).all()
+    incidents = db.query(Incident).filter(Incident.taxonomy_id.in_(taxonomy.source_ids(source))).all()
     cells = {}
 
     for i in incidents:
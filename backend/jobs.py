@@ -0,0 +1,347 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+import socket
+import threading
+from typing import Callable, Optional
+import uuid
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+import change_bus
+from db import SessionLocal
+from models import Job
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "20"))
+# Each runner bumps heartbeat_at on its own queued/running jobs this often...
+HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+# ...so an active job whose heartbeat is older than this belongs to a worker that is gone.
+STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "120"))
+# Written to Job.owner; a restarted worker gets a new one.
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+ACTIVE_STATES = ("queued", "running")
+_INTERRUPTED = "Interrupted: worker stopped before the job finished"
+FINAL_STATES = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(BaseException):
+    """Raised inside a handler once cancellation was requested.
+
+    Derives from BaseException (like asyncio.CancelledError) so the
+    endpoint-style `except Exception` blocks in handlers roll back and let it
+    through instead of reporting it as a failure.
+    """
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobContext:
+    """Handed to a running handler for progress reporting and cancellation checks."""
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+
+    def progress(self, fraction: float, note: Optional[str] = None) -> None:
+        """Persist progress (0..1) and raise JobCancelled if a cancel was requested.
+
+        Writes in its own session, so call it before the handler's session starts
+        writing: SQLite allows one writer at a time. check_cancelled only reads.
+        """
+        db = SessionLocal()
+        try:
+            job = db.get(Job, self.job_id)
+            job.progress = max(0.0, min(1.0, float(fraction)))
+            if note is not None:
+                job.progress_note = note[:200]
+            job.heartbeat_at = datetime.utcnow()
+            cancelled = job.cancel_requested
+            db.commit()
+        finally:
+            db.close()
+        if cancelled:
+            raise JobCancelled()
+
+    def check_cancelled(self) -> None:
+        db = SessionLocal()
+        try:
+            cancelled = db.query(Job.cancel_requested).filter(Job.id == self.job_id).scalar()
+        finally:
+            db.close()
+        if cancelled:
+            raise JobCancelled()
+
+
+Handler = Callable[[JobContext, dict], dict]
+
+
+class JobRunner:
+    """Persisted jobs executed on a bounded per-process thread pool.
+
+    The `jobs` table is the source of truth: any worker can report status or
+    accept a cancel, while execution happens in the process that accepted the
+    submission. Submissions beyond `max_pending` queued or running jobs in
+    this process are refused with QueueFull rather than piling up.
+
+    Each job records the INSTANCE_ID that runs it. While the process lives,
+    the heartbeat loop keeps its jobs' heartbeat_at fresh, and fails other
+    owners' jobs once their heartbeat goes stale; a live worker's job never
+    does, however long it runs or waits in the queue.
+    """
+
+    def __init__(self, workers: int = WORKERS, max_pending: int = MAX_PENDING):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._handlers: dict[str, Handler] = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    def submit(self, kind: str, params: dict, user_id: Optional[int]) -> tuple[Job, bool]:
+        """Queue a job; returns (job, created).
+
+        An identical job (same kind and params) that is still queued or running
+        is returned instead of starting another, so repeated taps share one run.
+        A stale one is failed in the same transaction: its worker is gone. The
+        unique index on active (kind, params) settles concurrent submissions;
+        the loser returns the winner's job.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        encoded = json.dumps(params, sort_keys=True)
+
+        db = SessionLocal()
+        try:
+            existing = _active_job(db, kind, encoded)
+            if existing is not None:
+                if existing.heartbeat_at is not None and existing.heartbeat_at >= _stale_cutoff():
+                    db.expunge(existing)
+                    return existing, False
+                _finish(db, existing, "failed", error=_INTERRUPTED)
+                db.flush()
+
+            with self._lock:
+                if self._pending >= self.max_pending:
+                    raise QueueFull(f"{self._pending} jobs already pending")
+                self._pending += 1
+
+            try:
+                now = datetime.utcnow()
+                job = Job(
+                    kind=kind,
+                    params=encoded,
+                    status="queued",
+                    created_by_user_id=user_id,
+                    owner=INSTANCE_ID,
+                    created_at=now,
+                    heartbeat_at=now,
+                )
+                db.add(job)
+                try:
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()
+                    existing = _active_job(db, kind, encoded)
+                    if existing is None:
+                        raise
+                    with self._lock:
+                        self._pending -= 1
+                    db.expunge(existing)
+                    return existing, False
+                db.refresh(job)
+                db.expunge(job)
+                self._executor.submit(self._execute, job.id)
+            except BaseException:
+                with self._lock:
+                    self._pending -= 1
+                raise
+            return job, True
+        except BaseException:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def cancel(self, db, job: Job) -> None:
+        """Request cancellation (caller commits); queued jobs stop immediately."""
+        if job.status in FINAL_STATES:
+            return
+        job.cancel_requested = True
+        if job.status == "queued":
+            _finish(db, job, "cancelled")
+
+    def recover_orphans(self) -> int:
+        """Fail other workers' queued or running jobs whose heartbeat went stale."""
+        db = SessionLocal()
+        try:
+            stale = (
+                db.query(Job)
+                .filter(
+                    Job.status.in_(ACTIVE_STATES),
+                    or_(Job.owner.is_(None), Job.owner != INSTANCE_ID),
+                    or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < _stale_cutoff()),
+                )
+                .all()
+            )
+            for job in stale:
+                _finish(db, job, "failed", error=_INTERRUPTED)
+            db.commit()
+            return len(stale)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def heartbeat(self) -> int:
+        """Bump heartbeat_at on this process's queued and running jobs."""
+        db = SessionLocal()
+        try:
+            beaten = (
+                db.query(Job)
+                .filter(Job.owner == INSTANCE_ID, Job.status.in_(ACTIVE_STATES))
+                .update({Job.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+            )
+            db.commit()
+            return beaten
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def start_heartbeat_loop(self, interval_seconds: int = HEARTBEAT_SECONDS) -> threading.Event:
+        """Recover orphans now, then heartbeat and recover again every `interval_seconds`."""
+        stop = threading.Event()
+        self.recover_orphans()
+
+        def _loop() -> None:
+            while not stop.wait(interval_seconds):
+                try:
+                    self.heartbeat()
+                    self.recover_orphans()
+                except Exception:
+                    logger.exception("job heartbeat failed")
+
+        threading.Thread(target=_loop, name="job-heartbeat", daemon=True).start()
+        return stop
+
+    def _execute(self, job_id: int) -> None:
+        try:
+            if not self._claim(job_id):
+                return
+            db = SessionLocal()
+            try:
+                job = db.get(Job, job_id)
+                kind, params = job.kind, json.loads(job.params)
+            finally:
+                db.close()
+
+            status, result, error = "succeeded", None, None
+            try:
+                result = self._handlers[kind](JobContext(job_id), params)
+            except JobCancelled:
+                status = "cancelled"
+            except Exception as e:
+                # Handlers reuse endpoint helpers, which raise HTTPException(detail=...).
+                status, error = "failed", str(getattr(e, "detail", None) or e)
+                logger.exception("job %s (%s) failed", job_id, kind)
+            self._complete(job_id, status, result, error)
+        except Exception:
+            logger.exception("job %s could not be run", job_id)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _claim(self, job_id: int) -> bool:
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            claimed = (
+                db.query(Job)
+                .filter(Job.id == job_id, Job.status == "queued", Job.cancel_requested.is_(False))
+                .update({Job.status: "running", Job.started_at: now, Job.heartbeat_at: now}, synchronize_session=False)
+            )
+            db.commit()
+            return claimed == 1
+        finally:
+            db.close()
+
+    def _complete(self, job_id: int, status: str, result: Optional[dict], error: Optional[str]) -> None:
+        db = SessionLocal()
+        try:
+            job = db.get(Job, job_id)
+            _finish(db, job, status, result=result, error=error)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+def _active_job(db, kind: str, encoded: str) -> Optional[Job]:
+    return (
+        db.query(Job)
+        .filter(Job.kind == kind, Job.params == encoded, Job.status.in_(ACTIVE_STATES))
+        .order_by(Job.id.asc())
+        .first()
+    )
+
+
+def _stale_cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=STALE_SECONDS)
+
+
+def _finish(db, job: Job, status: str, *, result: Optional[dict] = None, error: Optional[str] = None) -> None:
+    now = datetime.utcnow()
+    job.status = status
+    job.finished_at = now
+    job.heartbeat_at = now
+    if status == "succeeded":
+        job.progress = 1.0
+        job.result = json.dumps(result or {}, default=str)
+    job.error = error
+    audience = [job.created_by_user_id] if job.created_by_user_id is not None else []
+    change_bus.record(db, "jobs.finished", {"job_id": job.id, "kind": job.kind, "status": status}, audience=audience)
+
+
+def serialize_job(job: Job) -> dict[str, object]:
+    def seconds(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+        return round((end - start).total_seconds(), 3) if start and end else None
+
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "params": json.loads(job.params),
+        "status": job.status,
+        "progress": job.progress,
+        "progress_note": job.progress_note,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "cancel_requested": bool(job.cancel_requested),
+        "created_by_user_id": job.created_by_user_id,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "queued_seconds": seconds(job.created_at, job.started_at),
+        "run_seconds": seconds(job.started_at, job.finished_at),
+    }
+
+
+runner = JobRunner()
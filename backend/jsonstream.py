@@ -0,0 +1,115 @@
+"""Incremental JSON parsing for large API responses.
+
+`iter_items` yields the elements of one top-level array while the body is
+still arriving, so a response is never held whole: only the unread tail of
+the current chunk and the element being decoded stay in memory. Elements
+are decoded with json.JSONDecoder.raw_decode, so each is an ordinary dict
+or list, exactly as json.loads would build it.
+"""
+import json
+import re
+from typing import Any, Iterable, Iterator, Optional
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# What may still follow a number's decoded prefix ("0" of "0.", "1" of "1e+").
+_NUMBER_TAIL = re.compile(r"[-+.eE0-9]*\Z")
+READ_SIZE = 64 * 1024
+
+
+class _Reader:
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = iter(chunks)
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Append the next chunk, dropping what has been consumed. False at end of input."""
+        for chunk in self._chunks:
+            if chunk:
+                self._buf = self._buf[self._pos:] + chunk
+                self._pos = 0
+                return True
+        self._eof = True
+        return False
+
+    def peek(self) -> str:
+        """The next non-whitespace character, or "" at end of input."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def take(self, allowed: str) -> str:
+        char = self.peek()
+        if not char or char not in allowed:
+            raise ValueError(f"expected one of {allowed!r}, got {char or 'end of input'!r}")
+        self._pos += 1
+        return char
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number near the buffer's end may carry on in the next chunk: raw_decode
+            # reads "0." as 0 and "1e" as 1, so refill unless something else follows it.
+            if (
+                isinstance(value, (int, float))
+                and not self._eof
+                and _NUMBER_TAIL.match(self._buf, end)
+                and self._fill()
+            ):
+                continue
+            self._pos = end
+            return value
+
+
+def iter_items(chunks: Iterable[str], key: str, meta: Optional[dict] = None) -> Iterator[Any]:
+    """Yield the elements of the array under top-level `key` of the JSON object in `chunks`.
+
+    Every other top-level member is decoded whole into `meta`, which is
+    complete once the iterator is exhausted (members after the array, like
+    ArcGIS's exceededTransferLimit, only arrive then). Malformed input
+    raises ValueError.
+    """
+    reader = _Reader(chunks)
+    reader.take("{")
+    if reader.peek() == "}":
+        reader.take("}")
+    else:
+        while True:
+            name = reader.value()
+            if not isinstance(name, str):
+                raise ValueError(f"expected an object key, got {name!r}")
+            reader.take(":")
+            if name == key and reader.peek() == "[":
+                reader.take("[")
+                if reader.peek() == "]":
+                    reader.take("]")
+                else:
+                    while True:
+                        yield reader.value()
+                        if reader.take(",]") == "]":
+                            break
+            elif meta is not None:
+                meta[name] = reader.value()
+            else:
+                reader.value()
+            if reader.take(",}") == "}":
+                break
+    if reader.peek():
+        raise ValueError("unexpected data after the JSON object")
+
+
+def read_chunks(f, size: int = READ_SIZE) -> Iterator[str]:
+    """`f` (a text file) in `size` pieces, for iter_items."""
+    return iter(lambda: f.read(size), "")
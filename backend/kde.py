@@ -0,0 +1,205 @@
+"""Kernel density hotspots.
+
+Bin counts (`round(lat, 2)`, about 1 km) split a cluster that straddles a bin
+edge and under-rank it. This mode instead rasterizes incidents onto a fine
+grid over BOUNDS (CELL_METERS cells) and smooths the raster with a Gaussian
+of BANDWIDTH_METERS. The convolution is a product in frequency space: one
+rfft2 of the raster, times the kernel's spectrum (a Gaussian too, computed
+analytically and cached per grid shape), and one irfft2. The raster is
+zero-padded by four bandwidths so nothing wraps around the edges. The cost
+depends on the grid size, not on how many incidents fall in a cell.
+
+The surface's local maxima, at least a bandwidth apart, become HotspotCell
+rows. The kernel is 1 at its centre, so a peak's value is a weighted count
+of the incidents around it. Each incident weighs 1 + 0.5 ** (age_days /
+HALF_LIFE_DAYS): 2 when fresh, falling towards 1, much like the bins'
+recent * 2 + baseline. recent_count and baseline_count count the incidents in
+the square of side 2 * radius_m around the peak.
+"""
+from datetime import datetime
+import functools
+import math
+import os
+from typing import Optional
+
+import numpy as np
+
+_METERS_PER_DEGREE = 111_320.0
+
+
+def _bounds(value: str) -> tuple[float, float, float, float]:
+    south, north, west, east = (float(part) for part in value.split(","))
+    return south, north, west, east
+
+
+# south, north, west, east: the City of San Diego with a small margin.
+BOUNDS = _bounds(os.getenv("HOTSPOT_KDE_BOUNDS", "32.52,33.13,-117.32,-116.89"))
+CELL_METERS = float(os.getenv("HOTSPOT_KDE_CELL_METERS", "100"))
+BANDWIDTH_METERS = float(os.getenv("HOTSPOT_KDE_BANDWIDTH_METERS", "250"))
+HALF_LIFE_DAYS = float(os.getenv("HOTSPOT_KDE_HALF_LIFE_DAYS", "7"))
+MAX_PEAKS = int(os.getenv("HOTSPOT_KDE_MAX_PEAKS", "200"))
+# A peak must carry at least half an incident's weight.
+MIN_DENSITY = 0.5
+RECENT_DAYS = 8  # same split as the bins: (now - occurred_at).days <= 7
+
+
+class Grid:
+    """The raster over `bounds`: `rows` x `cols` cells of about `cell_m` meters."""
+
+    def __init__(self, bounds: tuple[float, float, float, float] = BOUNDS, cell_m: float = CELL_METERS):
+        self.south, self.north, self.west, self.east = bounds
+        self.cell_m = cell_m
+        mid_lat = math.radians((self.south + self.north) / 2)
+        self.lat_step = cell_m / _METERS_PER_DEGREE
+        self.lon_step = self.lat_step / math.cos(mid_lat)
+        self.rows = max(1, math.ceil((self.north - self.south) / self.lat_step))
+        self.cols = max(1, math.ceil((self.east - self.west) / self.lon_step))
+
+    def index(self, lat: np.ndarray, lon: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(row, col, inside) for each point; row/col are only valid where inside."""
+        row = np.floor((lat - self.south) / self.lat_step).astype(np.int64)
+        col = np.floor((lon - self.west) / self.lon_step).astype(np.int64)
+        inside = (row >= 0) & (row < self.rows) & (col >= 0) & (col < self.cols)
+        return row, col, inside
+
+    def rasterize(self, row: np.ndarray, col: np.ndarray, weights: Optional[np.ndarray] = None) -> np.ndarray:
+        flat = np.bincount(row * self.cols + col, weights=weights, minlength=self.rows * self.cols)
+        return flat.reshape(self.rows, self.cols).astype(np.float64, copy=False)
+
+    def centre(self, row: np.ndarray, col: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return self.south + (row + 0.5) * self.lat_step, self.west + (col + 0.5) * self.lon_step
+
+
+def _fast_length(n: int) -> int:
+    """Smallest 2^a * 3^b * 5^c >= n; pocketfft is quickest on those."""
+    best = 1 << max(0, (n - 1).bit_length())
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            candidate = p35
+            while candidate < n:
+                candidate *= 2
+            best = min(best, candidate)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+@functools.lru_cache(maxsize=8)
+def _kernel_spectrum(rows: int, cols: int, sigma_cells: float) -> np.ndarray:
+    """rfft2 of a Gaussian with peak 1 and std `sigma_cells`, on a rows x cols grid."""
+    scale = -2.0 * (math.pi * sigma_cells) ** 2
+    fy = np.fft.fftfreq(rows)
+    fx = np.fft.rfftfreq(cols)
+    gy = np.exp(scale * fy * fy)
+    gx = np.exp(scale * fx * fx)
+    return (2.0 * math.pi * sigma_cells * sigma_cells) * np.outer(gy, gx)
+
+
+def smooth(raster: np.ndarray, sigma_cells: float) -> np.ndarray:
+    """`raster` convolved with a Gaussian (peak 1, std `sigma_cells`), via FFT."""
+    pad = math.ceil(4 * sigma_cells)
+    rows = _fast_length(raster.shape[0] + pad)
+    cols = _fast_length(raster.shape[1] + pad)
+    spectrum = np.fft.rfft2(raster, s=(rows, cols))
+    spectrum *= _kernel_spectrum(rows, cols, float(sigma_cells))
+    surface = np.fft.irfft2(spectrum, s=(rows, cols))[: raster.shape[0], : raster.shape[1]]
+    # Round-off leaves tiny negatives where there is no data.
+    return np.maximum(surface, 0.0, out=surface)
+
+
+def _window_max(a: np.ndarray, r: int) -> np.ndarray:
+    """Max over the (2r + 1)^2 square around each cell (separable, one axis at a time)."""
+    out = a
+    for axis in (0, 1):
+        src = out
+        out = src.copy()
+        for s in range(1, r + 1):
+            if axis == 0:
+                np.maximum(out[s:], src[:-s], out=out[s:])
+                np.maximum(out[:-s], src[s:], out=out[:-s])
+            else:
+                np.maximum(out[:, s:], src[:, :-s], out=out[:, s:])
+                np.maximum(out[:, :-s], src[:, s:], out=out[:, :-s])
+    return out
+
+
+def _window_sums(raster: np.ndarray, row: np.ndarray, col: np.ndarray, r: int) -> np.ndarray:
+    """Sum of `raster` over the (2r + 1)^2 square around each (row, col), from a summed-area table."""
+    table = np.zeros((raster.shape[0] + 1, raster.shape[1] + 1))
+    np.cumsum(np.cumsum(raster, axis=0), axis=1, out=table[1:, 1:])
+    top = np.clip(row - r, 0, raster.shape[0])
+    bottom = np.clip(row + r + 1, 0, raster.shape[0])
+    left = np.clip(col - r, 0, raster.shape[1])
+    right = np.clip(col + r + 1, 0, raster.shape[1])
+    return table[bottom, right] - table[top, right] - table[bottom, left] + table[top, left]
+
+
+def peaks(surface: np.ndarray, r: int, limit: int, min_value: float = MIN_DENSITY) -> tuple[np.ndarray, np.ndarray]:
+    """(row, col) of the `limit` highest local maxima of `surface`, at least r + 1 cells apart."""
+    candidate = (surface >= min_value) & (surface == _window_max(surface, r))
+    row, col = np.nonzero(candidate)
+    order = np.argsort(surface[row, col])[::-1]
+    # Equal neighbours (a plateau) are all maxima; keep the first of each.
+    taken = np.zeros(surface.shape, dtype=bool)
+    kept = []
+    for k in order:
+        i, j = row[k], col[k]
+        if taken[i, j]:
+            continue
+        kept.append(k)
+        taken[max(0, i - r): i + r + 1, max(0, j - r): j + r + 1] = True
+        if len(kept) == limit:
+            break
+    kept_index = np.array(kept, dtype=np.int64)
+    return row[kept_index], col[kept_index]
+
+
+def arrays(incidents, now: datetime) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(lat, lon, age_days) arrays from (lat, lon, occurred_at) rows."""
+    n = len(incidents)
+    lat = np.fromiter((float(row[0]) for row in incidents), dtype=np.float64, count=n)
+    lon = np.fromiter((float(row[1]) for row in incidents), dtype=np.float64, count=n)
+    seconds = np.fromiter(((now - row[2]).total_seconds() for row in incidents), dtype=np.float64, count=n)
+    return lat, lon, seconds / 86400.0
+
+
+def hotspot_cells(
+    lat: np.ndarray,
+    lon: np.ndarray,
+    age_days: np.ndarray,
+    grid: Optional[Grid] = None,
+    bandwidth_m: float = BANDWIDTH_METERS,
+    half_life_days: float = HALF_LIFE_DAYS,
+    limit: int = MAX_PEAKS,
+) -> tuple[list[dict], int]:
+    """HotspotCell rows for the density peaks of these incidents, and how many fell outside the grid."""
+    grid = grid or Grid()
+    row, col, inside = grid.index(lat, lon)
+    outside = int(len(inside) - np.count_nonzero(inside))
+    row, col, age_days = row[inside], col[inside], age_days[inside]
+    if not len(row):
+        return [], outside
+
+    weights = 1.0 + np.exp2(-np.maximum(age_days, 0.0) / half_life_days)
+    surface = smooth(grid.rasterize(row, col, weights), bandwidth_m / grid.cell_m)
+
+    r = max(1, round(bandwidth_m / grid.cell_m))
+    peak_row, peak_col = peaks(surface, r, limit)
+    recent = age_days < RECENT_DAYS
+    recent_counts = _window_sums(grid.rasterize(row[recent], col[recent]), peak_row, peak_col, r)
+    baseline_counts = _window_sums(grid.rasterize(row[~recent], col[~recent]), peak_row, peak_col, r)
+    peak_lat, peak_lon = grid.centre(peak_row, peak_col)
+    radius_m = (r + 0.5) * grid.cell_m
+    return [
+        {
+            "grid_lat": round(float(peak_lat[k]), 5),
+            "grid_lon": round(float(peak_lon[k]), 5),
+            "recent_count": int(round(recent_counts[k])),
+            "baseline_count": int(round(baseline_counts[k])),
+            "risk_score": max(1, int(round(surface[peak_row[k], peak_col[k]]))),
+            "radius_m": radius_m,
+        }
+        for k in range(len(peak_row))
+    ], outside
@@ -1,42 +1,71 @@
+import asyncio
 from datetime import datetime, timedelta
+import itertools
+import json
 import logging
+import math
 import os
 import random
-from typing import Optional
+import time
+from typing import Iterable, Optional
 
-import httpx
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, ConfigDict, Field
-from sqlalchemy import func, inspect, or_, text
+from sqlalchemy import bindparam, func, inspect, or_, select, text
 
 from db import SessionLocal, engine, Base
 from models import (
     Incident,
+    IncidentTaxonomy,
     HotspotCell,
     Client,
+    ClientExposure,
     ContactLog,
     ContactLogShare,
     FieldReport,
     FieldReportShare,
     Group,
     GroupMember,
+    Job,
+    ScreeningFlag,
     User,
 )
-from auth import hash_password, verify_password, create_access_token, get_current_user
-
-# ArcGIS FeatureServer for SDPD NIBRS (City of San Diego hosted)
-_ARCGIS_URL = (
-    "https://webmaps.sandiego.gov/arcgis/rest/services"
-    "/SDPD/SDPD_NIBRS_Crime_Offenses_Geo/FeatureServer/0/query"
-)
-
+from auth import hash_password, verify_password, create_access_token, get_current_user, get_streaming_user
+import change_bus
+import dedup
+import exposure
+from fast_json import FastJSONResponse, stream_list
+import jobs
+import kde
+import metrics
+import partitions
+from realtime import REPLAY_BUFFER_SIZE, hub, sse_stream
+import report_visibility
+import screening
+import search
+import singleflight
+import sources
+import sql_profile
+import taxonomy
+import triage
+from spatial import spatial_index
+import wire_format
 
 app = FastAPI()
 logger = logging.getLogger(__name__)
+metrics.instrument_engine(engine)
+sql_profile.instrument_engine(engine)
 
 
 def _ensure_incident_columns() -> None:
+    """Bring `incidents` up to date: columns, indexes, taxonomy, shards, id sequence, dedup keys.
+
+    A migration, not a check: it runs at startup, /admin/init and backfill,
+    never per request.
+    """
     inspector = inspect(engine)
     if "incidents" not in inspector.get_table_names():
         return
@@ -44,13 +73,32 @@ def _ensure_incident_columns() -> None:
     existing = {col["name"] for col in inspector.get_columns("incidents")}
     needed = {
         "block_address": "VARCHAR(255)",
-        "code_section": "VARCHAR(255)",
-        "offense_code": "VARCHAR(64)",
+        "canonical_id": "INTEGER",
+        "dedup_key": "VARCHAR(96)",
     }
     with engine.begin() as conn:
         for name, column_type in needed.items():
             if name not in existing:
                 conn.execute(text(f"ALTER TABLE incidents ADD COLUMN {name} {column_type}"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_incidents_occurred_at ON incidents (occurred_at)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_incidents_dedup_key ON incidents (dedup_key)"))
+    partitions.migrate(inspector)
+
+    # The taxonomy strings moved to incident_taxonomy; fold any legacy columns in.
+    moved = taxonomy.migrate(inspector)
+    if moved:
+        logger.info("Moved %s incidents onto incident_taxonomy", moved)
+    partitions.ensure_unique_ids()
+
+    # Incidents stored before cross-source dedup get keyed and linked once.
+    if "dedup_key" not in existing:
+        db = SessionLocal()
+        try:
+            linked = dedup.rebuild(db)
+        finally:
+            db.close()
+        if linked:
+            logger.info("Linked %s stored incidents to canonical incidents", linked)
 
 
 def _ensure_contact_log_columns() -> None:
@@ -114,6 +162,48 @@ def _ensure_user_columns() -> None:
                 conn.execute(text(f"ALTER TABLE users ADD COLUMN {name} {column_type}"))
 
 
+def _ensure_hotspot_columns() -> None:
+    inspector = inspect(engine)
+    if "hotspot_cells" not in inspector.get_table_names():
+        return
+
+    existing = {col["name"] for col in inspector.get_columns("hotspot_cells")}
+    needed = {
+        "radius_m": "FLOAT",
+    }
+    with engine.begin() as conn:
+        for name, column_type in needed.items():
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE hotspot_cells ADD COLUMN {name} {column_type}"))
+
+
+def _ensure_job_columns() -> None:
+    inspector = inspect(engine)
+    if "jobs" not in inspector.get_table_names():
+        return
+
+    existing = {col["name"] for col in inspector.get_columns("jobs")}
+    needed = {
+        "owner": "VARCHAR(64)",
+    }
+    with engine.begin() as conn:
+        for name, column_type in needed.items():
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE jobs ADD COLUMN {name} {column_type}"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_owner ON jobs (owner)"))
+        if "uq_jobs_active_kind_params" not in {index["name"] for index in inspector.get_indexes("jobs")}:
+            # Older trees could start identical jobs concurrently; keep the first of each.
+            conn.execute(text(
+                "UPDATE jobs SET status = 'failed', error = 'Duplicate of an earlier identical job', finished_at = :now"
+                " WHERE status IN ('queued', 'running') AND id NOT IN"
+                " (SELECT MIN(id) FROM jobs WHERE status IN ('queued', 'running') GROUP BY kind, params)"
+            ), {"now": datetime.utcnow()})
+            conn.execute(text(
+                "CREATE UNIQUE INDEX uq_jobs_active_kind_params ON jobs (kind, params)"
+                " WHERE status IN ('queued', 'running')"
+            ))
+
+
 class UserResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -227,6 +317,9 @@ def _upsert_bootstrap_user(
             if name:
                 user.name = name
 
+        db.flush()
+        report_visibility.sync_user(db, user.id)
+        change_bus.record(db, "user.synced", {"user_id": user.id})
         db.commit()
         print(f"[startup] Synced {label} user: email={email} role={role} created={created}")
         result: dict[str, object] = {
@@ -265,6 +358,35 @@ def _sync_bootstrap_users() -> list[dict[str, object]]:
     print(f"[startup] Bootstrap user sync complete: {results}")
     return results
 
+
+def _backfill_search_index(force: bool = False) -> None:
+    search.ensure_schema()
+    db = SessionLocal()
+    try:
+        if force or search.needs_backfill(db):
+            rows = search.rebuild_all(db)
+            db.commit()
+            print(f"[startup] Rebuilt search index: documents={rows}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _backfill_report_visibility(force: bool = False) -> None:
+    db = SessionLocal()
+    try:
+        if force or report_visibility.needs_backfill(db):
+            rows = report_visibility.rebuild_all(db)
+            db.commit()
+            print(f"[startup] Rebuilt field report visibility: rows={rows}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 # ---------------------------
 # STARTUP: CREATE TABLES
 # ---------------------------
@@ -273,11 +395,20 @@ def on_startup():
     # Creates tables automatically on boot (critical for Render)
     Base.metadata.create_all(bind=engine)
     _ensure_incident_columns()
+    taxonomy.ensure_view()
     _ensure_contact_log_columns()
     _ensure_client_columns()
     _ensure_field_report_columns()
     _ensure_user_columns()
+    _ensure_hotspot_columns()
+    _ensure_job_columns()
     _sync_bootstrap_users()
+    _backfill_report_visibility()
+    _backfill_search_index()
+    jobs.runner.start_heartbeat_loop()
+    triage.start_decay_loop()
+    partitions.start_compaction_loop(lambda: jobs.runner.submit("incidents.compact", {}, None))
+    change_bus.bus.start(warm=_warm_stream, warm_limit=REPLAY_BUFFER_SIZE)
 
 
 # ---------------------------
@@ -290,6 +421,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware, skip_paths=("/metrics",))
+if sql_profile.ENABLED:
+    # Debug only: adds an X-SQL-Profile header and logs N+1 shapes / large-table scans.
+    app.add_middleware(sql_profile.SQLProfileMiddleware, engine=engine, skip_paths=("/metrics", "/stream"))
 
 
 # ---------------------------
@@ -300,11 +435,14 @@ def admin_init():
     # Manual “fix it now” endpoint
     Base.metadata.create_all(bind=engine)
     _ensure_incident_columns()
+    taxonomy.ensure_view()
     _ensure_contact_log_columns()
     _ensure_client_columns()
     _ensure_field_report_columns()
     _ensure_user_columns()
     bootstrap = _sync_bootstrap_users()
+    _backfill_report_visibility(force=True)
+    triage.run_decay_pass()
     return {"status": "initialized", "users": bootstrap}
 
 
@@ -316,6 +454,173 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def get_metrics(request: Request):
+    """Prometheus text exposition for this worker process."""
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("authorization") != f"Bearer {token}":
+        raise HTTPException(401, "Invalid metrics token")
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+metrics.registry.register(metrics.Gauge(
+    "vpsd_stream_subscribers", "Open /stream connections in this process.", func=lambda: hub.subscriber_count
+))
+metrics.registry.register(metrics.Gauge(
+    "vpsd_jobs_pending", "Jobs queued or running in this process.", func=lambda: jobs.runner.pending
+))
+
+
+# ---------------------------
+# STREAM (server-sent events)
+# ---------------------------
+@app.get("/stream")
+async def stream(request: Request, last_event_id: Optional[int] = None, current_user: User = Depends(get_streaming_user)):
+    """Push field report, triage and hotspot changes so devices stop polling."""
+    header_id = request.headers.get("last-event-id")
+    if header_id:
+        try:
+            last_event_id = int(header_id)
+        except ValueError:
+            raise HTTPException(400, "Invalid Last-Event-ID header.")
+
+    return StreamingResponse(
+        sse_stream(
+            hub,
+            current_user.id,
+            _is_admin(current_user),
+            last_event_id,
+            request.is_disconnected,
+            change_bus.bus.open_gaps(),
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _record_field_report_change(db, topic: str, report: FieldReport) -> None:
+    """Queue a report change for the stream, addressed to whoever can see it right now."""
+    db.flush()
+    change_bus.record(
+        db,
+        topic,
+        {
+            "report_id": report.id,
+            "status": report.status,
+            "published_to_all": bool(report.published_to_all),
+        },
+        audience=report_visibility.visible_user_ids(db, report.id),
+    )
+
+
+def _forward_to_stream(entry) -> None:
+    hub.publish(
+        entry.topic,
+        change_bus.entry_payload(entry),
+        audience=change_bus.entry_audience(entry),
+        event_id=entry.seq,
+    )
+
+
+def _warm_stream(entries) -> None:
+    for entry in entries:
+        if entry.topic.startswith(_STREAM_TOPIC_PREFIXES):
+            _forward_to_stream(entry)
+
+
+_STREAM_TOPIC_PREFIXES = ("field_report.", "triage.", "hotspots.", "jobs.")
+for _prefix in _STREAM_TOPIC_PREFIXES:
+    change_bus.bus.subscribe(_prefix, _forward_to_stream)
+change_bus.bus.subscribe("hotspots.", lambda entry: spatial_index.invalidate_hotspots())
+change_bus.bus.subscribe("incidents.", lambda entry: spatial_index.invalidate_incidents())
+change_bus.bus.subscribe("incidents.", lambda entry: singleflight.group.forget_namespace("hotspots.run"))
+for _namespace in ("dashboard.hotspots", "dashboard.events", "dashboard.forecast"):
+    change_bus.bus.subscribe("incidents.", lambda entry, ns=_namespace: singleflight.group.forget_namespace(ns))
+for _namespace in ("dashboard.cells", "dashboard.hotspots"):
+    change_bus.bus.subscribe("hotspots.", lambda entry, ns=_namespace: singleflight.group.forget_namespace(ns))
+
+
+# ---------------------------
+# JOBS (long-running work off the request path)
+# ---------------------------
+def _enqueue_job(kind: str, params: dict, current_user: User) -> JSONResponse:
+    try:
+        job, created = jobs.runner.submit(kind, params, current_user.id)
+    except jobs.QueueFull:
+        raise HTTPException(503, "Job queue is full; try again shortly.", headers={"Retry-After": "30"})
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job.id,
+            "status": job.status,
+            "created": created,
+            "status_url": f"/jobs/{job.id}",
+        },
+    )
+
+
+def _get_visible_job(db, job_id: int, current_user: User) -> Job:
+    job = db.get(Job, job_id)
+    if not job or (not _is_admin(current_user) and job.created_by_user_id != current_user.id):
+        raise HTTPException(404, "Job not found")
+    return job
+
+
+@app.get("/jobs")
+def list_jobs(limit: int = 50, status: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    limit = max(1, min(limit, 200))
+    db = SessionLocal()
+    try:
+        query = db.query(Job)
+        if not _is_admin(current_user):
+            query = query.filter(Job.created_by_user_id == current_user.id)
+        if status:
+            query = query.filter(Job.status == status.strip().lower())
+        rows = query.order_by(Job.id.desc()).limit(limit).all()
+        return {"jobs": [jobs.serialize_job(job) for job in rows]}
+    finally:
+        db.close()
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: int, current_user: User = Depends(get_current_user)):
+    db = SessionLocal()
+    try:
+        return jobs.serialize_job(_get_visible_job(db, job_id, current_user))
+    finally:
+        db.close()
+
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: int, current_user: User = Depends(get_current_user)):
+    db = SessionLocal()
+    try:
+        job = _get_visible_job(db, job_id, current_user)
+        jobs.runner.cancel(db, job)
+        db.commit()
+        db.refresh(job)
+        return jobs.serialize_job(job)
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(500, f"cancel_job failed: {e}")
+    finally:
+        db.close()
+
+
+jobs.runner.register("events.pull", lambda job, params: _pull_events(int(params["days"]), job=job))
+jobs.runner.register(
+    "hotspots.run", lambda job, params: _run_hotspots(params["sources"], job=job, mode=params.get("mode"))
+)
+jobs.runner.register(
+    "hotspots.seed",
+    lambda job, params: _seed_hotspots(params["source"], int(params["n"]), job=job),
+)
+jobs.runner.register("screening.rescan", lambda job, params: _rescan_screening(bool(params["full"]), job=job))
+jobs.runner.register("incidents.compact", lambda job, params: _compact_incidents(job=job))
+
+
 # ---------------------------
 # AUTHENTICATION
 # ---------------------------
@@ -357,6 +662,9 @@ def create_user(payload: CreateUserPayload, current_user: User = Depends(get_cur
             must_reset_password=True,
         )
         db.add(user)
+        db.flush()
+        report_visibility.sync_user(db, user.id)
+        change_bus.record(db, "user.created", {"user_id": user.id})
         db.commit()
         db.refresh(user)
 
@@ -393,6 +701,7 @@ def reset_password(payload: ResetPasswordPayload, current_user: User = Depends(g
 
         user.hashed_password = hash_password(new_password)
         user.must_reset_password = True
+        change_bus.record(db, "user.password_reset", {"user_id": user.id})
         db.commit()
 
         return {"success": True, "message": "Password reset successful."}
@@ -424,6 +733,7 @@ def change_password(payload: ChangePasswordPayload, current_user: User = Depends
 
         user.hashed_password = hash_password(new_password)
         user.must_reset_password = False
+        change_bus.record(db, "user.password_changed", {"user_id": user.id})
         db.commit()
         db.refresh(user)
 
@@ -490,6 +800,15 @@ def delete_user(user_id: int, current_user: User = Depends(get_current_user)):
                 f"User cannot be deleted because they still own {joined}. Remove or reassign those records first.",
             )
 
+        # Shares this user created are deleted below, so those reports need re-fanning.
+        affected_report_ids = [
+            report_id
+            for (report_id,) in db.query(FieldReportShare.field_report_id)
+            .filter(FieldReportShare.created_by_user_id == user_id)
+            .distinct()
+            .all()
+        ]
+
         db.query(GroupMember).filter(GroupMember.user_id == user_id).delete(synchronize_session=False)
         db.query(FieldReportShare).filter(
             or_(
@@ -515,8 +834,16 @@ def delete_user(user_id: int, current_user: User = Depends(get_current_user)):
             {FieldReport.published_by_user_id: None},
             synchronize_session=False,
         )
+        db.query(Job).filter(Job.created_by_user_id == user_id).update(
+            {Job.created_by_user_id: None},
+            synchronize_session=False,
+        )
+        for report_id in affected_report_ids:
+            report_visibility.sync_report(db, report_id)
+        report_visibility.remove_user(db, user_id)
 
         db.delete(user)
+        change_bus.record(db, "user.deleted", {"user_id": user_id})
         db.commit()
 
         return {
@@ -612,6 +939,8 @@ def create_group(payload: CreateGroupPayload, current_user: User = Depends(get_c
             created_by_user_id=current_user.id,
         )
         db.add(group)
+        db.flush()
+        change_bus.record(db, "group.created", {"group_id": group.id})
         db.commit()
         db.refresh(group)
         return {
@@ -708,6 +1037,12 @@ def add_group_members(group_id: int, payload: GroupMembersPayload, current_user:
                 continue
             db.add(GroupMember(group_id=group_id, user_id=user_id))
 
+        report_visibility.sync_users(db, valid_user_ids - existing_ids)
+        change_bus.record(
+            db,
+            "group.members_added",
+            {"group_id": group_id, "user_ids": sorted(valid_user_ids - existing_ids)},
+        )
         db.commit()
         all_members = (
             db.query(GroupMember)
@@ -749,6 +1084,8 @@ def remove_group_member(group_id: int, user_id: int, current_user: User = Depend
             raise HTTPException(404, "Group member not found")
 
         db.delete(member)
+        report_visibility.sync_user(db, user_id)
+        change_bus.record(db, "group.member_removed", {"group_id": group_id, "user_id": user_id})
         db.commit()
         return {"success": True, "group_id": group_id, "user_id": user_id}
     except HTTPException:
@@ -771,11 +1108,19 @@ def delete_group(group_id: int, current_user: User = Depends(get_current_user)):
         if not group:
             raise HTTPException(404, "Group not found")
 
+        member_user_ids = [
+            member_user_id
+            for (member_user_id,) in db.query(GroupMember.user_id)
+            .filter(GroupMember.group_id == group_id)
+            .all()
+        ]
         db.query(GroupMember).filter(GroupMember.group_id == group_id).delete(synchronize_session=False)
         db.query(FieldReportShare).filter(
             FieldReportShare.shared_with_group_id == group_id
         ).delete(synchronize_session=False)
         db.delete(group)
+        report_visibility.sync_users(db, member_user_ids)
+        change_bus.record(db, "group.deleted", {"group_id": group_id})
         db.commit()
 
         return {
@@ -798,14 +1143,37 @@ def delete_group(group_id: int, current_user: User = Depends(get_current_user)):
 def _resolve_hotspot_sources(source: str) -> list[str]:
     normalized = (source or "").strip().lower()
     if normalized == "multi":
-        return ["sdpd_nibrs", "el_cajon", "la_mesa", "sheriff"]
+        return sources.ids()
     if normalized == "demo":
         return ["sdpd_demo_events"]
     return [source]
 
 
+# "bins": counts per 0.01 deg cell. "kde": density peaks (kde.py).
+_HOTSPOT_MODES = ("bins", "kde")
+_HOTSPOT_MODE = os.getenv("HOTSPOT_MODE", "bins")
+
+
+def _resolve_hotspot_mode(mode: Optional[str]) -> str:
+    normalized = (mode or _HOTSPOT_MODE).strip().lower()
+    if normalized not in _HOTSPOT_MODES:
+        raise HTTPException(400, f"mode must be one of: {', '.join(_HOTSPOT_MODES)}")
+    return normalized
+
+
 @app.post("/hotspots/seed")
-def seed_hotspots(source: str = "sdpd_demo", n: int = 120, current_user: User = Depends(get_current_user)):
+def seed_hotspots(
+    source: str = "sdpd_demo",
+    n: int = 120,
+    background: bool = False,
+    current_user: User = Depends(get_current_user),
+):
+    if background:
+        return _enqueue_job("hotspots.seed", {"source": source, "n": n}, current_user)
+    return _seed_hotspots(source, n)
+
+
+def _seed_hotspots(source: str, n: int, job: Optional[jobs.JobContext] = None) -> dict[str, object]:
     db = SessionLocal()
 
     centers = [
@@ -819,6 +1187,7 @@ def seed_hotspots(source: str = "sdpd_demo", n: int = 120, current_user: User =
     inserted = 0
 
     try:
+        taxonomy_id = taxonomy.cache.resolve(db, taxonomy.entry(source, "demo"))
         for _ in range(n):
             base_lat, base_lon = random.choice(centers)
             lat = base_lat + random.uniform(-0.01, 0.01)
@@ -829,8 +1198,7 @@ def seed_hotspots(source: str = "sdpd_demo", n: int = 120, current_user: User =
 
             db.add(
                 Incident(
-                    source=source,
-                    incident_type="demo",
+                    taxonomy_id=taxonomy_id,
                     occurred_at=occurred_at,
                     lat=lat,
                     lon=lon,
@@ -838,6 +1206,9 @@ def seed_hotspots(source: str = "sdpd_demo", n: int = 120, current_user: User =
             )
             inserted += 1
 
+        if job:
+            job.check_cancelled()
+        change_bus.record(db, "incidents.changed", {"source": source, "inserted": inserted})
         db.commit()
         return {"status": "seeded", "inserted": inserted, "source": source}
 
@@ -849,125 +1220,249 @@ def seed_hotspots(source: str = "sdpd_demo", n: int = 120, current_user: User =
 
 
 @app.post("/hotspots/run")
-def compute_hotspots(source: str = "sdpd_demo", current_user: User = Depends(get_current_user)):
-    db = SessionLocal()
-    try:
-        # clear previous cells
-        db.query(HotspotCell).delete()
-        db.commit()
+def compute_hotspots(
+    source: str = "sdpd_demo",
+    mode: Optional[str] = None,
+    background: bool = False,
+    current_user: User = Depends(get_current_user),
+):
+    sources = _resolve_hotspot_sources(source)
+    mode = _resolve_hotspot_mode(mode)
+    if background:
+        return _enqueue_job("hotspots.run", {"sources": sources, "mode": mode}, current_user)
+    # Concurrent taps on "Run" share one recompute instead of racing on hotspot_cells.
+    result, shared = singleflight.group.do(
+        ("hotspots.run", tuple(sources), mode),
+        lambda: _run_hotspots(sources, mode=mode),
+    )
+    return {**result, "coalesced": shared}
 
-        sources = _resolve_hotspot_sources(source)
-        incidents = db.query(Incident).filter(Incident.source.in_(sources)).all()
-        if not incidents:
-            return {"status": "no_incidents", "cells": 0, "sources": sources}
 
-        grid = {}
-        now = datetime.utcnow()
+def _bin_hotspot_cells(incidents, now: datetime) -> list[dict]:
+    """HotspotCell rows counting (lat, lon, occurred_at) rows per 0.01 deg cell."""
+    grid = {}
+    for inc in incidents:
+        cell_lat = round(float(inc.lat), 2)
+        cell_lon = round(float(inc.lon), 2)
+        key = (cell_lat, cell_lon)
 
-        for inc in incidents:
-            cell_lat = round(float(inc.lat), 2)
-            cell_lon = round(float(inc.lon), 2)
-            key = (cell_lat, cell_lon)
+        if key not in grid:
+            grid[key] = {"recent": 0, "baseline": 0}
 
-            if key not in grid:
-                grid[key] = {"recent": 0, "baseline": 0}
+        if (now - inc.occurred_at).days <= 7:
+            grid[key]["recent"] += 1
+        else:
+            grid[key]["baseline"] += 1
+
+    return [
+        {
+            "grid_lat": cell_lat,
+            "grid_lon": cell_lon,
+            "recent_count": vals["recent"],
+            "baseline_count": vals["baseline"],
+            "risk_score": vals["recent"] * 2 + vals["baseline"],
+        }
+        for (cell_lat, cell_lon), vals in grid.items()
+    ]
 
-            if (now - inc.occurred_at).days <= 7:
-                grid[key]["recent"] += 1
-            else:
-                grid[key]["baseline"] += 1
 
-        for (cell_lat, cell_lon), vals in grid.items():
-            risk = vals["recent"] * 2 + vals["baseline"]
-            db.add(
-                HotspotCell(
-                    grid_lat=cell_lat,
-                    grid_lon=cell_lon,
-                    recent_count=vals["recent"],
-                    baseline_count=vals["baseline"],
-                    risk_score=risk,
-                )
-            )
+def _run_hotspots(
+    sources: list[str], job: Optional[jobs.JobContext] = None, mode: Optional[str] = None
+) -> dict[str, object]:
+    mode = _resolve_hotspot_mode(mode)
+    started = time.perf_counter()
+    status = "failed"
+    db = SessionLocal()
+    try:
+        # Each event once: a cross-source duplicate is skipped when its canonical is also counted.
+        incidents = db.execute(
+            select(Incident.lat, Incident.lon, Incident.occurred_at)
+            .where(Incident.taxonomy_id.in_(taxonomy.source_ids(*sources)), dedup.counted(sources))
+        ).all()
+        if job:
+            job.progress(0.3, f"{'smoothing' if mode == 'kde' else 'binning'} {len(incidents)} incidents")
+
+        # clear previous cells; the rewrite below lands in the same transaction
+        db.query(HotspotCell).delete()
+        if not incidents:
+            change_bus.record(db, "hotspots.updated", {"cells": 0, "sources": sources, "mode": mode})
+            db.commit()
+            status = "no_incidents"
+            metrics.HOTSPOT_CELLS.set(0)
+            return {"status": "no_incidents", "cells": 0, "sources": sources, "mode": mode}
 
+        now = datetime.utcnow()
+        result: dict[str, object] = {"status": "computed", "sources": sources, "mode": mode}
+        if mode == "kde":
+            cells, result["outside"] = kde.hotspot_cells(*kde.arrays(incidents, now))
+        else:
+            cells = _bin_hotspot_cells(incidents, now)
+        db.add_all(HotspotCell(**cell) for cell in cells)
+
+        if job:
+            job.check_cancelled()
+        change_bus.record(db, "hotspots.updated", {"cells": len(cells), "sources": sources, "mode": mode})
         db.commit()
-        return {"status": "computed", "cells": len(grid), "sources": sources}
+        status = "computed"
+        metrics.HOTSPOT_CELLS.set(len(cells))
+        return {**result, "cells": len(cells)}
 
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"compute_hotspots failed: {e}")
     finally:
         db.close()
+        metrics.HOTSPOT_RECOMPUTE_SECONDS.observe(time.perf_counter() - started, status=status)
+
+
+# Fields dictionary-encoded in the columnar layouts (see wire_format).
+_HOTSPOT_CATEGORICAL = {"cells": ("top_crime_type",)}
+
+
+def _top_hotspot_cells(db) -> list:
+    return db.execute(
+        select(
+            HotspotCell.id,
+            HotspotCell.grid_lat,
+            HotspotCell.grid_lon,
+            HotspotCell.risk_score,
+            HotspotCell.recent_count,
+            HotspotCell.baseline_count,
+            HotspotCell.radius_m,
+        )
+        .order_by(HotspotCell.risk_score.desc())
+        .limit(50)
+    ).all()
+
+
+def _enrich_hotspot_cells(cells: list, incident_rows, type_names) -> list[dict]:
+    """Add per-cell incident intelligence (type counts, latest incident, trend, summary).
+
+    `incident_rows` yields (lat, lon, taxonomy_id, occurred_at); rows outside
+    every cell are skipped, so callers may pass a superset. A 0.01 deg bin
+    takes the rows that round to it; a KDE peak (radius_m set) takes the rows
+    in its square, found through the 0.01 deg buckets the square overlaps.
+    Counting runs on the integer ids; `type_names(ids)` maps the ids seen to
+    incident types once at the end.
+    """
+    cell_keys = {(float(c.grid_lat), float(c.grid_lon)) for c in cells}
+    id_counts_by_cell: dict[tuple[float, float], dict[int, int]] = {key: {} for key in cell_keys}
+    last_at_by_cell: dict[tuple[float, float], datetime] = {}
+    binned = {(float(c.grid_lat), float(c.grid_lon)) for c in cells if not c.radius_m}
+    windows: dict[tuple[int, int], list[tuple]] = {}
+    for c in cells:
+        if not c.radius_m:
+            continue
+        lat, lon = float(c.grid_lat), float(c.grid_lon)
+        half_lat = c.radius_m / 111_320
+        half_lon = half_lat / math.cos(math.radians(lat))
+        window = ((lat, lon), lat - half_lat, lat + half_lat, lon - half_lon, lon + half_lon)
+        for i in range(math.floor((lat - half_lat) * 100), math.floor((lat + half_lat) * 100) + 1):
+            for j in range(math.floor((lon - half_lon) * 100), math.floor((lon + half_lon) * 100) + 1):
+                windows.setdefault((i, j), []).append(window)
+
+    for lat, lon, taxonomy_id, occurred_at in incident_rows:
+        key = (round(float(lat), 2), round(float(lon), 2))
+        if key in binned:
+            keys: Iterable[tuple[float, float]] = (key,)
+        elif windows:
+            lat, lon = float(lat), float(lon)
+            keys = [
+                window_key
+                for window_key, south, north, west, east in windows.get((math.floor(lat * 100), math.floor(lon * 100)), ())
+                if south <= lat <= north and west <= lon <= east
+            ]
+        else:
+            continue
+        for key in keys:
+            counts = id_counts_by_cell[key]
+            counts[taxonomy_id] = counts.get(taxonomy_id, 0) + 1
+            last = last_at_by_cell.get(key)
+            if last is None or occurred_at > last:
+                last_at_by_cell[key] = occurred_at
+
+    names = type_names({taxonomy_id for counts in id_counts_by_cell.values() for taxonomy_id in counts})
+    enriched = []
+    for c in cells:
+        key = (float(c.grid_lat), float(c.grid_lon))
+
+        # Top crime type by frequency; several taxonomy ids can share a type name.
+        type_counts: dict[str, int] = {}
+        for taxonomy_id, n in id_counts_by_cell[key].items():
+            t = str(names.get(taxonomy_id) or "unknown")
+            type_counts[t] = type_counts.get(t, 0) + n
+        last_at = last_at_by_cell.get(key)
+
+        top_crime = max(type_counts, key=type_counts.get) if type_counts else None  # type: ignore[arg-type]
+        top_crime_types = sorted(type_counts, key=lambda k: type_counts[k], reverse=True)[:3] if type_counts else []
+
+        # Trend
+        if c.baseline_count and c.baseline_count > 0:
+            trend_pct = round(((c.recent_count - c.baseline_count) / c.baseline_count) * 100)
+        elif c.recent_count > 0:
+            trend_pct = None  # "New Spike"
+        else:
+            trend_pct = 0
+
+        # Build human-readable summary
+        trend_word = "increasing" if (trend_pct is not None and trend_pct > 0) else (
+            "decreasing" if (trend_pct is not None and trend_pct < 0) else "new activity"
+        )
+        rc: int = c.recent_count or 0
+        summary = f"Hot because {rc} recent incident{'s' if rc != 1 else ''}"
+        if top_crime:
+            summary += f", mostly {top_crime}"
+        summary += f", with activity {trend_word} vs baseline."
+
+        enriched.append({
+            "id": c.id,
+            "grid_lat": c.grid_lat,
+            "grid_lon": c.grid_lon,
+            "risk_score": c.risk_score,
+            "recent_count": c.recent_count,
+            "baseline_count": c.baseline_count,
+            "radius_m": c.radius_m,
+            "top_crime_type": top_crime,
+            "top_crime_types": top_crime_types,
+            "last_incident_at": last_at,
+            "trend_pct": trend_pct,
+            "summary": summary,
+        })
+    return enriched
+
+
+def _hotspot_incident_rows(db, cells: list):
+    """(lat, lon, taxonomy_id, occurred_at) of the counted incidents that can land in `cells`."""
+    if not cells:
+        return []
+    # Only the incidents inside the cells' bounding box can land in a cell. Bins are
+    # 0.01 deg buckets centred on grid_lat/grid_lon; pad a little past half a bin, or
+    # past a KDE peak's square.
+    pad = max([0.006] + [c.radius_m / 111_320 * 1.25 for c in cells if c.radius_m])
+    lats = [float(c.grid_lat) for c in cells]
+    lons = [float(c.grid_lon) for c in cells]
+    return db.execute(
+        select(Incident.lat, Incident.lon, Incident.taxonomy_id, Incident.occurred_at).where(
+            Incident.lat.between(min(lats) - pad, max(lats) + pad),
+            Incident.lon.between(min(lons) - pad, max(lons) + pad),
+            dedup.counted(),
+        )
+    )
 
 
 @app.get("/hotspots")
-def get_hotspots(current_user: User = Depends(get_current_user)):
+def get_hotspots(request: Request, current_user: User = Depends(get_current_user)):
+    fmt = wire_format.choose_format(request)
     db = SessionLocal()
     try:
-        cells = (
-            db.query(HotspotCell)
-            .order_by(HotspotCell.risk_score.desc())
-            .limit(50)
-            .all()
+        cells = _top_hotspot_cells(db)
+        enriched = _enrich_hotspot_cells(
+            cells, _hotspot_incident_rows(db, cells), lambda ids: taxonomy.cache.incident_types(db, ids)
         )
 
-        # Enrich each cell with incident intelligence
-        all_incidents = db.query(Incident).all()
-        # Build a grid lookup: (rounded_lat, rounded_lon) -> list of incidents
-        grid_incidents: dict[tuple[float, float], list] = {}
-        for inc in all_incidents:
-            key = (round(float(inc.lat), 2), round(float(inc.lon), 2))
-            grid_incidents.setdefault(key, []).append(inc)
-
-        enriched = []
-        for c in cells:
-            key = (float(c.grid_lat), float(c.grid_lon))
-            cell_incs = grid_incidents.get(key, [])
-
-            # Top crime type by frequency
-            type_counts: dict[str, int] = {}
-            last_at = None
-            for inc in cell_incs:
-                t = str(inc.incident_type or "unknown")
-                type_counts[t] = type_counts.get(t, 0) + 1
-                if last_at is None or inc.occurred_at > last_at:
-                    last_at = inc.occurred_at
-
-            top_crime = max(type_counts, key=type_counts.get) if type_counts else None  # type: ignore[arg-type]
-            top_crime_types = sorted(type_counts, key=lambda k: type_counts[k], reverse=True)[:3] if type_counts else []
-
-            # Trend
-            if c.baseline_count and c.baseline_count > 0:
-                trend_pct = round(((c.recent_count - c.baseline_count) / c.baseline_count) * 100)
-            elif c.recent_count > 0:
-                trend_pct = None  # "New Spike"
-            else:
-                trend_pct = 0
-
-            # Build human-readable summary
-            trend_word = "increasing" if (trend_pct is not None and trend_pct > 0) else (
-                "decreasing" if (trend_pct is not None and trend_pct < 0) else "new activity"
-            )
-            rc: int = getattr(c, "recent_count", 0)  # type: ignore[assignment]
-            summary = f"Hot because {rc} recent incident{'s' if rc != 1 else ''}"
-            if top_crime:
-                summary += f", mostly {top_crime}"
-            summary += f", with activity {trend_word} vs baseline."
-
-            enriched.append({
-                "id": c.id,
-                "grid_lat": c.grid_lat,
-                "grid_lon": c.grid_lon,
-                "risk_score": c.risk_score,
-                "recent_count": c.recent_count,
-                "baseline_count": c.baseline_count,
-                "top_crime_type": top_crime,
-                "top_crime_types": top_crime_types,
-                "last_incident_at": last_at.isoformat() if last_at else None,
-                "trend_pct": trend_pct,
-                "summary": summary,
-            })
-
-        return {"cells": enriched}
+        return wire_format.respond(
+            request, fmt, {"cells": enriched}, list_keys=("cells",), categorical=_HOTSPOT_CATEGORICAL
+        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"get_hotspots failed: {e}")
@@ -975,46 +1470,56 @@ def get_hotspots(current_user: User = Depends(get_current_user)):
         db.close()
 
 
+def _forecast_rows(db, source: str):
+    """(lat, lon, occurred_at) of `source`'s incidents, for _forecast_cells."""
+    return db.execute(
+        select(Incident.lat, Incident.lon, Incident.occurred_at)
+        .where(Incident.taxonomy_id.in_(taxonomy.source_ids(source)))
+    )
+
+
+def _forecast_cells(incident_rows, now: datetime) -> list[dict]:
+    """Top 30 cells likely to stay hot, from (lat, lon, occurred_at) rows of one source."""
+    grid: dict[tuple[float, float], dict] = {}
+    for lat, lon, occurred_at in incident_rows:
+        key = (round(float(lat), 2), round(float(lon), 2))
+        if key not in grid:
+            grid[key] = {"recent": 0, "very_recent": 0, "baseline": 0}
+
+        age_hours = max(0, (now - occurred_at).total_seconds() / 3600)
+        if age_hours <= 24:
+            grid[key]["very_recent"] += 1
+        if age_hours <= 168:  # 7 days
+            grid[key]["recent"] += 1
+        else:
+            grid[key]["baseline"] += 1
+
+    forecast_cells = []
+    for (lat, lon), v in grid.items():
+        score = (v["very_recent"] * 5) + (v["recent"] * 2) + v["baseline"]
+        if score > 0:
+            forecast_cells.append({
+                "grid_lat": lat,
+                "grid_lon": lon,
+                "forecast_score": score,
+                "very_recent_24h": v["very_recent"],
+                "recent_7d": v["recent"],
+                "baseline": v["baseline"],
+            })
+
+    forecast_cells.sort(key=lambda x: x["forecast_score"], reverse=True)
+    return forecast_cells[:30]
+
+
 @app.get("/hotspots/forecast")
-def hotspot_forecast(source: str = "sdpd_nibrs", current_user: User = Depends(get_current_user)):
+def hotspot_forecast(request: Request, source: str = "sdpd_nibrs", current_user: User = Depends(get_current_user)):
     """Lightweight predictive layer: which cells stay hot in the next 12h."""
+    fmt = wire_format.choose_format(request)
     Base.metadata.create_all(bind=engine)
     db = SessionLocal()
     try:
-        now = datetime.utcnow()
-        incidents = db.query(Incident).filter(Incident.source == source).all()
-        if not incidents:
-            return {"cells": []}
-
-        grid: dict[tuple[float, float], dict] = {}
-        for inc in incidents:
-            key = (round(float(inc.lat), 2), round(float(inc.lon), 2))
-            if key not in grid:
-                grid[key] = {"recent": 0, "very_recent": 0, "baseline": 0}
-
-            age_hours = max(0, (now - inc.occurred_at).total_seconds() / 3600)
-            if age_hours <= 24:
-                grid[key]["very_recent"] += 1
-            if age_hours <= 168:  # 7 days
-                grid[key]["recent"] += 1
-            else:
-                grid[key]["baseline"] += 1
-
-        forecast_cells = []
-        for (lat, lon), v in grid.items():
-            score = (v["very_recent"] * 5) + (v["recent"] * 2) + v["baseline"]
-            if score > 0:
-                forecast_cells.append({
-                    "grid_lat": lat,
-                    "grid_lon": lon,
-                    "forecast_score": score,
-                    "very_recent_24h": v["very_recent"],
-                    "recent_7d": v["recent"],
-                    "baseline": v["baseline"],
-                })
-
-        forecast_cells.sort(key=lambda x: x["forecast_score"], reverse=True)
-        return {"cells": forecast_cells[:30]}
+        cells = _forecast_cells(_forecast_rows(db, source), datetime.utcnow())
+        return wire_format.respond(request, fmt, {"cells": cells}, list_keys=("cells",))
 
     except Exception as e:
         raise HTTPException(500, f"hotspot_forecast failed: {e}")
@@ -1025,6 +1530,11 @@ def hotspot_forecast(source: str = "sdpd_nibrs", current_user: User = Depends(ge
 # ---------------------------
 # TRIAGE
 # ---------------------------
+_TRIAGE_QUEUE_MAX_LIMIT = 500
+_FIELD_REPORTS_MAX_LIMIT = 200
+_CONTEXT_MAX_RADIUS_M = 5000
+
+
 def _is_admin(user: User) -> bool:
     return (user.role or "").strip().lower() == "admin"
 
@@ -1044,11 +1554,6 @@ def _can_share_contact_log(contact_log: ContactLog, current_user: User) -> bool:
     )
 
 
-def _get_user_group_ids(db, user_id: int) -> list[int]:
-    rows = db.query(GroupMember.group_id).filter(GroupMember.user_id == user_id).all()
-    return [group_id for group_id, in rows]
-
-
 def _serialize_group(group: Group, members: list[GroupMember], users_by_id: dict[int, User]):
     return {
         "id": group.id,
@@ -1075,14 +1580,32 @@ def _serialize_field_report(
     shared_with_users: Optional[list[dict[str, object]]] = None,
     shared_with_groups: Optional[list[dict[str, object]]] = None,
 ):
+    return _field_report_payload(
+        report,
+        sender.name if sender else None,
+        sender.email if sender else None,
+        shared_with_users=shared_with_users,
+        shared_with_groups=shared_with_groups,
+    )
+
+
+def _field_report_payload(
+    report,
+    sender_name: Optional[str],
+    sender_email: Optional[str],
+    *,
+    shared_with_users: Optional[list[dict[str, object]]] = None,
+    shared_with_groups: Optional[list[dict[str, object]]] = None,
+):
+    """`report` is a FieldReport or a report_visibility.feed_query row."""
     share_users = shared_with_users or []
     share_groups = shared_with_groups or []
     is_shared = bool(share_users or share_groups)
     return {
         "id": report.id,
         "sender_user_id": report.sender_user_id,
-        "sender_name": sender.name if sender else None,
-        "sender_email": sender.email if sender else None,
+        "sender_name": sender_name,
+        "sender_email": sender_email,
         "title": report.title,
         "message": report.message,
         "location_text": report.location_text,
@@ -1118,55 +1641,47 @@ def serialize_client(c: Client, current_user: Optional[User] = None):
     }
 
 
-def _serialize_field_reports_for_rows(db, rows: list[tuple[FieldReport, User]]):
-    report_ids = [report.id for report, _ in rows]
+def _serialize_field_reports_for_rows(db, rows):
+    """Serialize report_visibility.feed_query rows with their shares."""
+    report_ids = [row.id for row in rows]
+    # One joined read for the page: share rows with their user/group display fields.
     share_rows = (
-        db.query(FieldReportShare)
+        db.query(
+            FieldReportShare.field_report_id,
+            User.id,
+            User.name,
+            User.email,
+            Group.id,
+            Group.name,
+        )
+        .outerjoin(User, User.id == FieldReportShare.shared_with_user_id)
+        .outerjoin(Group, Group.id == FieldReportShare.shared_with_group_id)
         .filter(FieldReportShare.field_report_id.in_(report_ids))
         .order_by(FieldReportShare.id.asc())
         .all()
         if report_ids
         else []
     )
-    shares_by_report: dict[int, list[FieldReportShare]] = {}
-    shared_user_ids: set[int] = set()
-    shared_group_ids: set[int] = set()
-    for share in share_rows:
-        shares_by_report.setdefault(share.field_report_id, []).append(share)
-        if share.shared_with_user_id is not None:
-            shared_user_ids.add(share.shared_with_user_id)
-        if share.shared_with_group_id is not None:
-            shared_group_ids.add(share.shared_with_group_id)
-
-    shared_users = {
-        user.id: {"id": user.id, "name": user.name, "email": user.email}
-        for user in db.query(User).filter(User.id.in_(shared_user_ids)).all()
-    } if shared_user_ids else {}
-    shared_groups = {
-        group.id: {"id": group.id, "name": group.name}
-        for group in db.query(Group).filter(Group.id.in_(shared_group_ids)).all()
-    } if shared_group_ids else {}
-
-    serialized = []
-    for report, sender in rows:
-        report_shares = shares_by_report.get(report.id, [])
-        serialized.append(
-            _serialize_field_report(
-                report,
-                sender,
-                shared_with_users=[
-                    shared_users[share.shared_with_user_id]
-                    for share in report_shares
-                    if share.shared_with_user_id in shared_users
-                ],
-                shared_with_groups=[
-                    shared_groups[share.shared_with_group_id]
-                    for share in report_shares
-                    if share.shared_with_group_id in shared_groups
-                ],
+    users_by_report: dict[int, list[dict[str, object]]] = {}
+    groups_by_report: dict[int, list[dict[str, object]]] = {}
+    for report_id, user_id, user_name, user_email, group_id, group_name in share_rows:
+        if user_id is not None:
+            users_by_report.setdefault(report_id, []).append(
+                {"id": user_id, "name": user_name, "email": user_email}
             )
+        if group_id is not None:
+            groups_by_report.setdefault(report_id, []).append({"id": group_id, "name": group_name})
+
+    return [
+        _field_report_payload(
+            row,
+            row.sender_name,
+            row.sender_email,
+            shared_with_users=users_by_report.get(row.id, []),
+            shared_with_groups=groups_by_report.get(row.id, []),
         )
-    return serialized
+        for row in rows
+    ]
 
 
 @app.post("/triage/clients")
@@ -1197,6 +1712,10 @@ def create_client(payload: dict, current_user: User = Depends(get_current_user))
             home_lon=payload.get("home_lon"),
         )
         db.add(c)
+        db.flush()
+        triage.refresh_client_state(db, c)
+        search.index_client(db, c)
+        change_bus.record(db, "triage.client_created", {"client_id": c.id})
         db.commit()
         db.refresh(c)
         return {"client": serialize_client(c, current_user)}
@@ -1245,6 +1764,9 @@ def update_client(client_id: int, payload: dict, current_user: User = Depends(ge
         if "home_lon" in payload:
             c.home_lon = payload.get("home_lon")
 
+        triage.refresh_client_state(db, c)
+        search.index_client(db, c)
+        change_bus.record(db, "triage.client_updated", {"client_id": c.id})
         db.commit()
         db.refresh(c)
         return {"client": serialize_client(c, current_user)}
@@ -1352,7 +1874,11 @@ def delete_client(client_id: int, current_user: User = Depends(get_current_user)
             raise HTTPException(403, "You do not have permission to delete this client.")
 
         db.query(ContactLog).filter(ContactLog.client_id == client_id).delete()
+        db.query(ScreeningFlag).filter(ScreeningFlag.client_id == client_id).delete()
+        search.remove_client(db, client_id)
+        triage.delete_client_state(db, client_id)
         db.delete(c)
+        change_bus.record(db, "triage.client_deleted", {"client_id": client_id})
         db.commit()
 
         return {"success": True, "client_id": client_id}
@@ -1387,6 +1913,13 @@ def log_contact(client_id: int, payload: dict, current_user: User = Depends(get_
             note=note,
         )
         db.add(cl)
+        state = triage.refresh_client_state(db, c)
+        search.index_contact_log(db, cl)
+        change_bus.record(
+            db,
+            "triage.contact_logged",
+            {"client_id": client_id, "contact_id": cl.id, "urgency_score": state.urgency_score},
+        )
         db.commit()
         db.refresh(cl)
 
@@ -1457,6 +1990,12 @@ def share_contact_log(log_id: int, payload: ShareContactLogPayload, current_user
                 )
             )
 
+        change_bus.record(
+            db,
+            "contact_log.shared",
+            {"contact_log_id": log_id},
+            audience=valid_target_ids | {contact_log.created_by_user_id},
+        )
         db.commit()
 
         shared_with_users = [
@@ -1500,6 +2039,10 @@ def create_field_report(payload: CreateFieldReportPayload, current_user: User =
             status="new",
         )
         db.add(report)
+        db.flush()
+        report_visibility.sync_report(db, report.id)
+        search.index_field_report(db, report)
+        _record_field_report_change(db, "field_report.created", report)
         db.commit()
         db.refresh(report)
         return {"report": _serialize_field_report(report, current_user)}
@@ -1519,13 +2062,8 @@ def field_reports_inbox(current_user: User = Depends(get_current_user)):
 
     db = SessionLocal()
     try:
-        rows = (
-            db.query(FieldReport, User)
-            .join(User, User.id == FieldReport.sender_user_id)
-            .order_by(FieldReport.created_at.desc(), FieldReport.id.desc())
-            .all()
-        )
-        return {"reports": _serialize_field_reports_for_rows(db, rows)}
+        rows = db.execute(report_visibility.feed_query(None)).all()
+        return FastJSONResponse({"reports": _serialize_field_reports_for_rows(db, rows)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"field_reports_inbox failed: {e}")
     finally:
@@ -1533,35 +2071,31 @@ def field_reports_inbox(current_user: User = Depends(get_current_user)):
 
 
 @app.get("/field-reports")
-def field_reports(current_user: User = Depends(get_current_user)):
-    db = SessionLocal()
-    try:
-        rows_query = db.query(FieldReport, User).join(User, User.id == FieldReport.sender_user_id)
-        if _is_admin(current_user):
-            pass
-        else:
-            shared_report_ids = (
-                db.query(FieldReportShare.field_report_id)
-                .filter(FieldReportShare.shared_with_user_id == current_user.id)
-            )
-            group_ids = _get_user_group_ids(db, current_user.id)
-            if group_ids:
-                shared_report_ids = shared_report_ids.union(
-                    db.query(FieldReportShare.field_report_id).filter(FieldReportShare.shared_with_group_id.in_(group_ids))
-                )
+def field_reports(limit: int = 100, cursor: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    if limit < 1 or limit > _FIELD_REPORTS_MAX_LIMIT:
+        raise HTTPException(400, f"limit must be between 1 and {_FIELD_REPORTS_MAX_LIMIT}.")
 
-            visibility_filter = or_(
-                FieldReport.published_to_all.is_(True),
-                FieldReport.id.in_(shared_report_ids.subquery()),
-            )
-            if (current_user.role or "").strip().lower() == "police":
-                visibility_filter = or_(visibility_filter, FieldReport.sender_user_id == current_user.id)
-            rows_query = rows_query.filter(
-                visibility_filter
-            )
+    before = None
+    if cursor:
+        try:
+            before = report_visibility.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(400, "Invalid cursor.")
 
-        rows = rows_query.order_by(FieldReport.created_at.desc(), FieldReport.id.desc()).all()
-        return {"reports": _serialize_field_reports_for_rows(db, rows)}
+    db = SessionLocal()
+    try:
+        feed_user_id = None if _is_admin(current_user) else current_user.id
+        rows = db.execute(report_visibility.feed_query(feed_user_id, before=before).limit(limit + 1)).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = report_visibility.encode_cursor(rows[-1])
+
+        return FastJSONResponse({
+            "reports": _serialize_field_reports_for_rows(db, rows),
+            "next_cursor": next_cursor,
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"field_reports failed: {e}")
     finally:
@@ -1580,6 +2114,7 @@ def mark_field_report_reviewed(report_id: int, current_user: User = Depends(get_
             raise HTTPException(404, "Field report not found")
 
         report.status = "reviewed"
+        _record_field_report_change(db, "field_report.reviewed", report)
         db.commit()
         db.refresh(report)
 
@@ -1608,6 +2143,13 @@ def delete_field_report(report_id: int, current_user: User = Depends(get_current
         db.query(FieldReportShare).filter(
             FieldReportShare.field_report_id == report_id
         ).delete(synchronize_session=False)
+        db.query(ScreeningFlag).filter(
+            ScreeningFlag.subject_type == "field_report",
+            ScreeningFlag.subject_id == report_id,
+        ).delete(synchronize_session=False)
+        _record_field_report_change(db, "field_report.deleted", report)
+        report_visibility.remove_report(db, report_id)
+        search.remove(db, "field_report", [report_id])
         db.delete(report)
         db.commit()
 
@@ -1710,6 +2252,8 @@ def share_field_report(report_id: int, payload: ShareFieldReportPayload, current
                 )
             )
 
+        report_visibility.sync_report(db, report_id)
+        _record_field_report_change(db, "field_report.shared", report)
         db.commit()
 
         return {
@@ -1748,6 +2292,8 @@ def publish_field_report(report_id: int, current_user: User = Depends(get_curren
         report.published_to_all = True
         report.published_by_user_id = current_user.id
         report.published_at = datetime.utcnow()
+        report_visibility.sync_report(db, report_id)
+        _record_field_report_change(db, "field_report.published", report)
         db.commit()
         db.refresh(report)
 
@@ -1763,77 +2309,135 @@ def publish_field_report(report_id: int, current_user: User = Depends(get_curren
 
 
 @app.get("/triage/queue")
-def triage_queue(current_user: User = Depends(get_current_user)):
+def triage_queue(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    top: Optional[int] = None,
+    neighborhood: Optional[str] = None,
+    needs: Optional[str] = None,
+    owner: Optional[str] = None,
+    overdue: bool = False,
+    current_user: User = Depends(get_current_user),
+):
+    """Urgency-ordered queue page. `top=k` returns only the k most urgent clients."""
+    if top is not None:
+        if top < 1 or top > _TRIAGE_QUEUE_MAX_LIMIT:
+            raise HTTPException(400, f"top must be between 1 and {_TRIAGE_QUEUE_MAX_LIMIT}.")
+        if cursor:
+            raise HTTPException(400, "cursor cannot be combined with top.")
+    if limit < 1 or limit > _TRIAGE_QUEUE_MAX_LIMIT:
+        raise HTTPException(400, f"limit must be between 1 and {_TRIAGE_QUEUE_MAX_LIMIT}.")
+
+    after = None
+    if cursor:
+        try:
+            after = triage.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(400, "Invalid cursor.")
+
+    need_names = tuple(
+        dict.fromkeys(n.strip().lower() for n in (needs or "").split(",") if n.strip())
+    )
+    unknown = [n for n in need_names if n not in triage.NEED_NAMES]
+    if unknown:
+        raise HTTPException(400, f"Unknown need(s): {', '.join(unknown)}.")
+
+    owner_id: Optional[int] = None
+    if owner:
+        if owner.strip().lower() == "me":
+            owner_id = current_user.id
+        else:
+            try:
+                owner_id = int(owner)
+            except ValueError:
+                raise HTTPException(400, "owner must be 'me' or a user id.")
+
     db = SessionLocal()
     now = datetime.utcnow()
-    cutoff = now - timedelta(days=30)
 
     try:
-        last_contact = (
-            db.query(ContactLog.client_id, func.max(ContactLog.contacted_at).label("last_time"))
-            .group_by(ContactLog.client_id)
-            .subquery()
-        )
+        page_size = top if top is not None else limit
+        rows = db.execute(triage.queue_query(
+            after=after,
+            # One extra row tells us whether another page exists.
+            limit=page_size if top is not None else page_size + 1,
+            neighborhood=neighborhood,
+            needs=need_names,
+            owner_id=owner_id,
+            overdue_only=overdue,
+            now=now,
+        )).all()
+
+        next_cursor = None
+        if top is None and len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = triage.encode_cursor(rows[-1])
+
+        return FastJSONResponse({
+            "items": [triage.serialize_queue_item(row, now) for row in rows],
+            "next_cursor": next_cursor,
+        })
 
-        misses = (
-            db.query(ContactLog.client_id, func.count(ContactLog.id).label("misses_30d"))
-            .filter(ContactLog.outcome == "no_answer", ContactLog.contacted_at >= cutoff)
-            .group_by(ContactLog.client_id)
-            .subquery()
-        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"triage_queue failed: {e}")
+    finally:
+        db.close()
 
-        rows = (
-            db.query(Client, last_contact.c.last_time, misses.c.misses_30d)
-            .outerjoin(last_contact, last_contact.c.client_id == Client.id)
-            .outerjoin(misses, misses.c.client_id == Client.id)
-            .all()
-        )
 
-        items = []
-        for c, last_time, miss_count in rows:
-            miss_count = int(miss_count or 0)
-            days_since = 9999 if not last_time else max(0, (now - last_time).days)
-
-            base_urgency = (miss_count * 5) + min(days_since, 60)
-
-            follow_up_urgency = 0
-            if c.follow_up_at:
-                diff_days = (now - c.follow_up_at).days
-                if diff_days >= 0:
-                    follow_up_urgency = 50 + min(diff_days, 30)
-                else:
-                    soon = abs(diff_days)
-                    if soon <= 2:
-                        follow_up_urgency = 15
-                    elif soon <= 7:
-                        follow_up_urgency = 8
-
-            urgency = base_urgency + follow_up_urgency
-
-            needs_count = (
-                int(bool(c.need_housing))
-                + int(bool(c.need_food))
-                + int(bool(c.need_therapy))
-                + int(bool(c.need_job))
-                + int(bool(c.need_transport))
-            )
+@app.post("/triage/exposure/run")
+def run_exposure(radius_m: int = exposure.DEFAULT_RADIUS_M, current_user: User = Depends(get_current_user)):
+    """Recompute incident/hotspot exposure for the whole caseload and re-score the queue."""
+    if radius_m < 50 or radius_m > _CONTEXT_MAX_RADIUS_M:
+        raise HTTPException(400, f"radius_m must be between 50 and {_CONTEXT_MAX_RADIUS_M}.")
 
-            items.append({
-                "client_id": c.id,
-                "display_name": c.display_name,
-                "neighborhood": c.neighborhood,
-                "days_since_last": days_since,
-                "misses_30d": miss_count,
-                "urgency_score": urgency,
-                "follow_up_at": c.follow_up_at.isoformat() if c.follow_up_at else None,
-                "needs_count": needs_count,
-            })
+    db = SessionLocal()
+    try:
+        results = exposure.compute_exposure(db, radius_m=radius_m)
+        stored = exposure.store_exposure(db, results)
+        change_bus.record(db, "triage.exposure_updated", {"clients": stored, "radius_m": radius_m})
+        db.commit()
+        rescored = triage.refresh_all_states(db)
+        return {
+            "status": "computed",
+            "clients": stored,
+            "radius_m": radius_m,
+            "rescored": rescored["updated"],
+        }
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"run_exposure failed: {e}")
+    finally:
+        db.close()
 
-        items.sort(key=lambda x: x["urgency_score"], reverse=True)
-        return {"items": items}
 
+@app.get("/triage/exposure")
+def list_exposure(limit: int = 100, min_7d: int = 0, current_user: User = Depends(get_current_user)):
+    """Clients ranked by incidents near home in the last 7 days."""
+    if limit < 1 or limit > _TRIAGE_QUEUE_MAX_LIMIT:
+        raise HTTPException(400, f"limit must be between 1 and {_TRIAGE_QUEUE_MAX_LIMIT}.")
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(ClientExposure, Client.display_name, Client.neighborhood)
+            .join(Client, Client.id == ClientExposure.client_id)
+            .filter(ClientExposure.incidents_7d >= min_7d)
+            .order_by(ClientExposure.incidents_7d.desc(), ClientExposure.client_id.asc())
+            .limit(limit)
+            .all()
+        )
+        return {
+            "items": [
+                {
+                    **exposure.serialize_exposure(row),
+                    "display_name": display_name,
+                    "neighborhood": neighborhood,
+                }
+                for row, display_name, neighborhood in rows
+            ]
+        }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"triage_queue failed: {e}")
+        raise HTTPException(status_code=500, detail=f"list_exposure failed: {e}")
     finally:
         db.close()
 
@@ -1841,12 +2445,11 @@ def triage_queue(current_user: User = Depends(get_current_user)):
 # ---------------------------
 # CONTEXT (nearest hotspot for client)
 # ---------------------------
-def _dist2(a_lat, a_lon, b_lat, b_lon):
-    return (a_lat - b_lat) ** 2 + (a_lon - b_lon) ** 2
-
-
 @app.get("/triage/clients/{client_id}/context")
-def client_context(client_id: int, current_user: User = Depends(get_current_user)):
+def client_context(client_id: int, radius_m: int = 800, current_user: User = Depends(get_current_user)):
+    if radius_m < 1 or radius_m > _CONTEXT_MAX_RADIUS_M:
+        raise HTTPException(400, f"radius_m must be between 1 and {_CONTEXT_MAX_RADIUS_M}.")
+
     db = SessionLocal()
     try:
         c = db.query(Client).filter(Client.id == client_id).first()
@@ -1856,27 +2459,23 @@ def client_context(client_id: int, current_user: User = Depends(get_current_user
         if c.home_lat is None or c.home_lon is None:
             return {"nearest_hotspot": None}
 
-        cells = db.query(HotspotCell).all()
-        if not cells:
-            return {"nearest_hotspot": None}
-
-        best = None
-        best_d = None
-        for cell in cells:
-            d = _dist2(c.home_lat, c.home_lon, cell.grid_lat, cell.grid_lon)
-            if best_d is None or d < best_d:
-                best_d = d
-                best = cell
+        home_lat = float(c.home_lat)
+        home_lon = float(c.home_lon)
+        hotspots = spatial_index.hotspots()
+        nearest = hotspots.nearest(home_lat, home_lon, k=1)
+        nearby = hotspots.within(home_lat, home_lon, radius_m)
 
         return {
-            "nearest_hotspot": {
-                "id": best.id,
-                "grid_lat": best.grid_lat,
-                "grid_lon": best.grid_lon,
-                "risk_score": best.risk_score,
-                "recent_count": best.recent_count,
-                "baseline_count": best.baseline_count,
-            }
+            "nearest_hotspot": (
+                {**nearest[0][1], "distance_m": round(nearest[0][0])} if nearest else None
+            ),
+            "nearby_hotspots": [
+                {**cell, "distance_m": round(distance)} for distance, cell in nearby[:10]
+            ],
+            "nearby_incidents": {
+                "radius_m": radius_m,
+                **spatial_index.incident_counts(home_lat, home_lon, radius_m),
+            },
         }
 
     except HTTPException:
@@ -1905,163 +2504,74 @@ _SD_CENTERS = [
 ]
 
 
-def _normalized_incident(
-    *,
-    external_id: str,
-    incident_type: str,
-    offense_category: str,
-    occurred_at: datetime,
-    block_address: object = None,
-    code_section: object = None,
-    offense_code: object = None,
-    source: str,
-    lat: float,
-    lon: float,
-) -> dict[str, object]:
-    return {
-        "external_id": external_id,
-        "incident_type": incident_type,
-        "offense_category": offense_category,
-        "occurred_at": occurred_at,
-        "block_address": str(block_address) if block_address else None,
-        "code_section": str(code_section) if code_section else None,
-        "offense_code": str(offense_code) if offense_code else None,
-        "source": source,
-        "lat": float(lat),
-        "lon": float(lon),
-    }
-
-
-def fetch_sdpd_events(days: int = 7) -> tuple[list[dict[str, object]], str | None]:
-    since = datetime.utcnow() - timedelta(days=days)
-    params: dict[str, str] = {
-        "f": "json",
-        "outFields": (
-            "NIBRS_UNIQ,OCCURED_ON,IBR_OFFENSE_DESCRIPTION,PD_OFFENSE_CATEGORY,"
-            "BLOCK_ADDR,CODE_SECTION,IBR_OFFENSE,X,Y"
-        ),
-        "returnGeometry": "true",
-        "outSR": "4326",
-        "where": f"OCCURED_ON >= TIMESTAMP '{since.strftime('%Y-%m-%d %H:%M:%S')}'",
-        "resultRecordCount": "2000",
-    }
+_UPSERT_CHUNK = 500
 
-    features: list = []
-    arcgis_error: str | None = None
-    try:
-        resp = httpx.get(_ARCGIS_URL, params=params, timeout=30)
-        resp.raise_for_status()
-        body = resp.json()
-        if "error" in body:
-            arcgis_error = str(body["error"])
-        else:
-            features = body.get("features") or []
-    except Exception as e:
-        arcgis_error = str(e)
 
-    incidents: list[dict[str, object]] = []
-    for feat in features:
-        attrs = feat.get("attributes") or {}
-        geom = feat.get("geometry") or {}
-
-        nibrs_uniq = attrs.get("NIBRS_UNIQ")
-        if not nibrs_uniq:
-            continue
-
-        lon = geom.get("x") if geom.get("x") is not None else attrs.get("X")
-        lat = geom.get("y") if geom.get("y") is not None else attrs.get("Y")
-        if lat is None or lon is None:
-            continue
-
-        ts_raw = attrs.get("OCCURED_ON")
-        if ts_raw:
-            occurred_at = datetime.utcfromtimestamp(int(ts_raw) / 1000)
-        else:
-            occurred_at = datetime.utcnow()
+def _upsert_incidents(db, incidents: Iterable[dict[str, object]]) -> tuple[int, int]:
+    """Insert new incidents and update known ones (by external_id), a chunk at a time.
 
-        incident_type = str(
-            attrs.get("IBR_OFFENSE_DESCRIPTION")
-            or attrs.get("PD_OFFENSE_CATEGORY")
-            or "unknown"
-        )
-        offense_category = str(
-            attrs.get("PD_OFFENSE_CATEGORY")
-            or attrs.get("IBR_OFFENSE_DESCRIPTION")
-            or "unknown"
-        )
-
-        incidents.append(
-            _normalized_incident(
-                external_id=f"sdpd_{nibrs_uniq}",
-                incident_type=incident_type,
-                offense_category=offense_category,
-                occurred_at=occurred_at,
-                block_address=attrs.get("BLOCK_ADDR"),
-                code_section=attrs.get("CODE_SECTION"),
-                offense_code=attrs.get("IBR_OFFENSE"),
-                source="sdpd_nibrs",
-                lat=lat,
-                lon=lon,
-            )
-        )
-
-    return incidents, arcgis_error
-
-
-def fetch_el_cajon_events(days: int = 7) -> list[dict[str, object]]:
-    # TODO: Prefer the official SANDAG/ARJIS CIBRS open-data route for El Cajon
-    # rather than city records pages. SANDAG documents that regional crime mapping
-    # includes El Cajon data, but this backend should stay stubbed until we confirm
-    # the exact public machine-readable dataset/API endpoint and field mapping.
-    logger.info("El Cajon incident source not configured yet; returning no incidents")
-    return []
-
-
-def fetch_la_mesa_events(days: int = 7) -> list[dict[str, object]]:
-    # TODO: Prefer the official SANDAG/ARJIS CIBRS open-data route for La Mesa.
-    # La Mesa's public records pages support report requests, but no clean public
-    # incident feed/API is confirmed here yet, so this remains intentionally stubbed.
-    logger.info("La Mesa incident source not configured yet; returning no incidents")
-    return []
-
-
-def fetch_sheriff_events(days: int = 7) -> list[dict[str, object]]:
-    # TODO: Spring Valley is likely best covered through the official SANDAG/ARJIS
-    # regional crime data because SANDAG says Sheriff contract-city and
-    # unincorporated-area reports feed the regional crime mapping/open-data system.
-    # The Sheriff's Calls for Service page is official, but it explicitly says it
-    # should not be relied on for statistical crime data, so do not ingest it here
-    # unless a separate official machine-readable endpoint is confirmed as suitable.
-    logger.info("Sheriff/Spring Valley incident source not configured yet; returning no incidents")
-    return []
-
-
-def _upsert_incidents(db, incidents: list[dict[str, object]]) -> tuple[int, int]:
+    `incidents` may be a generator (a source adapter's fetch); it is read
+    _UPSERT_CHUNK items at a time and only the current chunk is kept. One
+    lookup per chunk finds the existing rows; inserts and updates then go out
+    as executemany batches. A repeated external_id keeps its last item. New
+    rows are then linked to matching incidents from other sources (dedup.py).
+    """
+    table = Incident.__table__
+    items = iter(incidents)
     inserted = 0
     skipped = 0
-    for item in incidents:
-        external_id = str(item["external_id"])
-        existing = db.query(Incident).filter(Incident.external_id == external_id).first()
-        if existing:
-            existing.lat = float(item["lat"])
-            existing.lon = float(item["lon"])
-            existing.occurred_at = item["occurred_at"]
-            existing.offense_category = item["offense_category"]
-            existing.incident_type = item["incident_type"]
-            existing.block_address = item["block_address"]
-            existing.code_section = item["code_section"]
-            existing.offense_code = item["offense_code"]
-            existing.source = str(item["source"])
-            skipped += 1
-        else:
-            db.add(Incident(**item))
-            inserted += 1
+    elapsed = 0.0
+    while True:
+        chunk = {str(item["external_id"]): item for item in itertools.islice(items, _UPSERT_CHUNK)}
+        if not chunk:
+            break
+        started = time.perf_counter()
+        existing = dict(db.execute(
+            select(table.c.external_id, table.c.id).where(table.c.external_id.in_(list(chunk)))
+        ).all())
+        inserts = []
+        updates = []
+        for external_id, item in chunk.items():
+            row = {
+                "taxonomy_id": taxonomy.resolve(db, item),
+                "block_address": item["block_address"],
+                "occurred_at": item["occurred_at"],
+                "lat": float(item["lat"]),
+                "lon": float(item["lon"]),
+                "dedup_key": dedup.key(item),
+            }
+            if external_id in existing:
+                updates.append({"row_id": existing[external_id], **row})
+            else:
+                inserts.append({"external_id": external_id, **row})
+        if updates:
+            db.execute(
+                table.update().where(table.c.id == bindparam("row_id")).values(
+                    {
+                        name: bindparam(name)
+                        for name in ("taxonomy_id", "block_address", "occurred_at", "lat", "lon", "dedup_key")
+                    }
+                ),
+                updates,
+            )
+        if inserts:
+            partitions.forget_archived(db, [(row["external_id"], row["occurred_at"]) for row in inserts])
+            db.execute(table.insert(), inserts)
+            dedup.link(db, [row["external_id"] for row in inserts])
+        inserted += len(inserts)
+        skipped += len(updates)
+        elapsed += time.perf_counter() - started
+    metrics.INCIDENT_UPSERTS.inc(inserted, result="inserted")
+    metrics.INCIDENT_UPSERTS.inc(skipped, result="updated")
+    metrics.INCIDENT_UPSERT_SECONDS.observe(elapsed)
     return inserted, skipped
 
 
 def _seed_demo_events(db, days: int, n: int = 150) -> int:
     """Wipe and repopulate demo events. Returns count inserted."""
-    db.query(Incident).filter(Incident.source == "sdpd_demo_events").delete()
+    db.query(Incident).filter(
+        Incident.taxonomy_id.in_(taxonomy.source_ids("sdpd_demo_events"))
+    ).delete(synchronize_session=False)
     now = datetime.utcnow()
     for i in range(n):
         base_lat, base_lon = _SD_CENTERS[i % len(_SD_CENTERS)]
@@ -2070,9 +2580,11 @@ def _seed_demo_events(db, days: int, n: int = 150) -> int:
         days_ago = random.uniform(0, days)
         occurred_at = now - timedelta(days=days_ago, hours=random.randint(0, 23))
         db.add(Incident(
-            source="sdpd_demo_events",
-            incident_type=random.choice(_DEMO_INCIDENT_TYPES),
-            offense_category=random.choice(_DEMO_INCIDENT_TYPES).replace("_", " ").title(),
+            taxonomy_id=taxonomy.cache.resolve(db, taxonomy.entry(
+                "sdpd_demo_events",
+                random.choice(_DEMO_INCIDENT_TYPES),
+                random.choice(_DEMO_INCIDENT_TYPES).replace("_", " ").title(),
+            )),
             occurred_at=occurred_at,
             lat=lat,
             lon=lon,
@@ -2081,36 +2593,42 @@ def _seed_demo_events(db, days: int, n: int = 150) -> int:
 
 
 @app.post("/events/pull")
-def pull_events(days: int = 7, current_user: User = Depends(get_current_user)):
-    """Fetch incidents from approved sources; keep SDPD demo fallback when needed."""
-    Base.metadata.create_all(bind=engine)
-    _ensure_incident_columns()
+def pull_events(days: int = 7, background: bool = False, current_user: User = Depends(get_current_user)):
+    """Fetch incidents from approved sources; keep SDPD demo fallback when needed.
 
-    db = SessionLocal()
-    try:
-        sdpd_incidents, arcgis_error = fetch_sdpd_events(days)
-        source_payloads: dict[str, list[dict[str, object]]] = {
-            "sdpd_nibrs": sdpd_incidents,
-            "el_cajon": fetch_el_cajon_events(days),
-            "la_mesa": fetch_la_mesa_events(days),
-            "sheriff": fetch_sheriff_events(days),
-        }
+    `background=true` queues the pull as a job and returns 202 with its id.
+    """
+    Base.metadata.create_all(bind=engine)
+    if background:
+        return _enqueue_job("events.pull", {"days": days}, current_user)
 
-        total_inserted = 0
-        total_skipped = 0
-        counts_by_source: dict[str, dict[str, int]] = {}
+    # Identical concurrent pulls share one fetch/upsert pass.
+    result, shared = singleflight.group.do(("events.pull", days), lambda: _pull_events(days))
+    return {**result, "coalesced": shared}
 
-        for source_name, items in source_payloads.items():
-            inserted, skipped = _upsert_incidents(db, items)
-            counts_by_source[source_name] = {
-                "fetched": len(items),
-                "inserted": inserted,
-                "skipped": skipped,
-            }
-            total_inserted += inserted
-            total_skipped += skipped
 
+def _pull_events(days: int, job: Optional[jobs.JobContext] = None) -> dict[str, object]:
+    db = SessionLocal()
+    try:
+        adapters = sources.enabled()
+        if job:
+            job.progress(0.1, f"pulling {len(adapters)} sources")
+        # All enabled sources fetch at once, each against its own timeout; their
+        # chunks are saved and committed here as they arrive. The cursors and
+        # the change event below go out in one last short commit.
+        counts_by_source: dict[str, dict[str, object]] = sources.pull(
+            db, datetime.utcnow() - timedelta(days=days), _upsert_incidents, adapters
+        )
+        for source_id in sources.ids():
+            counts_by_source.setdefault(source_id, {"status": "disabled", "fetched": 0, "inserted": 0, "skipped": 0})
+        total_inserted = sum(counts["inserted"] for counts in counts_by_source.values())
+        total_skipped = sum(counts["skipped"] for counts in counts_by_source.values())
+        arcgis_error = counts_by_source.get("sdpd_nibrs", {}).get("error")
+
+        if job:
+            job.check_cancelled()
         if total_inserted or total_skipped:
+            change_bus.record(db, "incidents.changed", {"source": "multi", "inserted": total_inserted})
             db.commit()
             response: dict[str, object] = {
                 "inserted": total_inserted,
@@ -2123,6 +2641,7 @@ def pull_events(days: int = 7, current_user: User = Depends(get_current_user)):
             return response
 
         n = _seed_demo_events(db, days)
+        change_bus.record(db, "incidents.changed", {"source": "sdpd_demo_events", "inserted": n})
         db.commit()
         return {
             "inserted": n,
@@ -2143,39 +2662,96 @@ def pull_events(days: int = 7, current_user: User = Depends(get_current_user)):
         db.close()
 
 
-@app.get("/events")
-def get_events(days: int = 7, current_user: User = Depends(get_current_user)):
-    """Return incidents from the last `days` days for the map."""
+@app.get("/sources")
+def list_sources(current_user: User = Depends(get_current_user)):
+    """Registered incident sources with their fetch strategy and last sync."""
+    if not _is_admin(current_user):
+        raise HTTPException(403, "Admin access required")
     Base.metadata.create_all(bind=engine)
-    _ensure_incident_columns()
+    db = SessionLocal()
+    try:
+        return {"sources": sources.status(db)}
+    except Exception as e:
+        raise HTTPException(500, f"list_sources failed: {e}")
+    finally:
+        db.close()
+
+
+def _event_columns(src) -> tuple:
+    """Event fields from `src` (incidents or a partitions.incidents_since union),
+    selected with a join to IncidentTaxonomy; the taxonomy strings read back
+    exactly as they did when they were columns on incidents."""
+    return (
+        src.c.id,
+        src.c.external_id,
+        src.c.lat,
+        src.c.lon,
+        src.c.occurred_at,
+        IncidentTaxonomy.incident_type,
+        taxonomy.optional(IncidentTaxonomy.offense_category),
+        src.c.block_address,
+        taxonomy.optional(IncidentTaxonomy.code_section),
+        taxonomy.optional(IncidentTaxonomy.offense_code),
+        IncidentTaxonomy.source,
+    )
+
+
+_EVENT_COLUMNS = _event_columns(Incident.__table__)
+_EVENT_KEYS = tuple(col.key for col in _EVENT_COLUMNS)
+_EVENT_CATEGORICAL = {"items": ("incident_type", "offense_category", "source")}
+_EVENTS_DEFAULT_LIMIT = 2000
+_EVENTS_MAX_LIMIT = 50000
+
+
+def _events_query(days: int, limit: int):
+    """The newest `limit` events of the last `days` days, newest first."""
     since = datetime.utcnow() - timedelta(days=days)
+    # Only the partitions overlapping the window; short windows read the hot table alone.
+    src = partitions.incidents_since(since)
+    return (
+        select(*_event_columns(src))
+        .join_from(src, IncidentTaxonomy, src.c.taxonomy_id == IncidentTaxonomy.id)
+        .where(src.c.occurred_at >= since)
+        .order_by(src.c.occurred_at.desc())
+        .limit(limit)
+    )
+
+
+@app.get("/events")
+def get_events(
+    request: Request,
+    days: int = 7,
+    limit: int = _EVENTS_DEFAULT_LIMIT,
+    current_user: User = Depends(get_current_user),
+):
+    """Return incidents from the last `days` days for the map.
+
+    Pages beyond the default size (exports) are streamed instead of built in memory
+    when the client takes the default row JSON.
+    """
+    fmt = wire_format.choose_format(request)
+    if limit < 1 or limit > _EVENTS_MAX_LIMIT:
+        raise HTTPException(400, f"limit must be between 1 and {_EVENTS_MAX_LIMIT}.")
+    Base.metadata.create_all(bind=engine)
+    query = _events_query(days, limit)
+
+    if limit > _EVENTS_DEFAULT_LIMIT and fmt == wire_format.DEFAULT:
+        def rows():
+            db = SessionLocal()
+            try:
+                for row in db.execute(query.execution_options(yield_per=1000)):
+                    yield dict(zip(_EVENT_KEYS, row))
+            finally:
+                db.close()
+
+        return stream_list("items", rows())
+
     db = SessionLocal()
     try:
-        incidents = (
-            db.query(Incident)
-            .filter(Incident.occurred_at >= since)
-            .order_by(Incident.occurred_at.desc())
-            .limit(2000)
-            .all()
+        items = [dict(zip(_EVENT_KEYS, row)) for row in db.execute(query)]
+        return wire_format.respond(
+            request, fmt, {"items": items}, list_keys=("items",), categorical=_EVENT_CATEGORICAL
         )
-        return {
-            "items": [
-                {
-                    "id": inc.id,
-                    "external_id": inc.external_id,
-                    "lat": inc.lat,
-                    "lon": inc.lon,
-                    "occurred_at": inc.occurred_at.isoformat(),
-                    "incident_type": inc.incident_type,
-                    "offense_category": inc.offense_category,
-                    "block_address": inc.block_address,
-                    "code_section": inc.code_section,
-                    "offense_code": inc.offense_code,
-                    "source": inc.source,
-                }
-                for inc in incidents
-            ]
-        }
     except Exception as e:
         raise HTTPException(500, f"get_events failed: {e}")
     finally:
@@ -2183,16 +2759,306 @@ def get_events(days: int = 7, current_user: User = Depends(get_current_user)):
 
 
 # ---------------------------
-# SCREENING (placeholder)
+# INCIDENT STORAGE (partitions, retention)
+# ---------------------------
+def _compact_incidents(job=None) -> dict:
+    db = SessionLocal()
+    try:
+        return partitions.compact(db, job=job)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@app.get("/incidents/partitions")
+def incident_partitions(current_user: User = Depends(get_current_user)):
+    """Hot window, monthly shards with row counts, daily summaries and retention per source."""
+    if not _is_admin(current_user):
+        raise HTTPException(403, "Admin access required")
+    db = SessionLocal()
+    try:
+        return partitions.status(db)
+    except Exception as e:
+        raise HTTPException(500, f"incident_partitions failed: {e}")
+    finally:
+        db.close()
+
+
+@app.post("/incidents/compact")
+def compact_incidents(current_user: User = Depends(get_current_user)):
+    """Queue a compaction now instead of waiting for the scheduled one."""
+    if not _is_admin(current_user):
+        raise HTTPException(403, "Admin access required")
+    return _enqueue_job("incidents.compact", {}, current_user)
+
+
+# ---------------------------
+# DASHBOARD (map screen in one round trip)
+# ---------------------------
+_DASHBOARD_SECTIONS = ("hotspots", "events", "forecast")
+_DASHBOARD_CACHE_SECONDS = float(os.getenv("DASHBOARD_CACHE_SECONDS", "30"))
+_DASHBOARD_MAX_DAYS = 365
+_DASHBOARD_CATEGORICAL = {
+    "hotspots": _HOTSPOT_CATEGORICAL["cells"],
+    "events": _EVENT_CATEGORICAL["items"],
+}
+
+
+def _dashboard_cached(key: tuple, fn):
+    return singleflight.group.do(key, fn, reuse_seconds=_DASHBOARD_CACHE_SECONDS)
+
+
+def _dashboard_hotspots() -> tuple[list[dict], bool]:
+    def cells() -> list:
+        db = SessionLocal()
+        try:
+            return _top_hotspot_cells(db)
+        finally:
+            db.close()
+
+    def build() -> list[dict]:
+        top = _dashboard_cached(("dashboard.cells",), cells)[0]
+        db = SessionLocal()
+        try:
+            return _enrich_hotspot_cells(
+                top, _hotspot_incident_rows(db, top), lambda ids: taxonomy.cache.incident_types(db, ids)
+            )
+        finally:
+            db.close()
+
+    return _dashboard_cached(("dashboard.hotspots",), build)
+
+
+def _dashboard_events(days: int) -> tuple[list[dict], bool]:
+    def build() -> list[dict]:
+        db = SessionLocal()
+        try:
+            return [dict(zip(_EVENT_KEYS, row)) for row in db.execute(_events_query(days, _EVENTS_DEFAULT_LIMIT))]
+        finally:
+            db.close()
+
+    return _dashboard_cached(("dashboard.events", days), build)
+
+
+def _dashboard_forecast(source: str) -> tuple[list[dict], bool]:
+    def build() -> list[dict]:
+        db = SessionLocal()
+        try:
+            return _forecast_cells(_forecast_rows(db, source), datetime.utcnow())
+        finally:
+            db.close()
+
+    return _dashboard_cached(("dashboard.forecast", source), build)
+
+
+@app.get("/dashboard/map")
+async def dashboard_map(
+    request: Request,
+    days: int = 7,
+    source: str = "sdpd_nibrs",
+    sections: str = ",".join(_DASHBOARD_SECTIONS),
+    current_user: User = Depends(get_current_user),
+):
+    """/hotspots, /events?days= and /hotspots/forecast?source= in one response.
+
+    Sections are built concurrently, each reading only the incidents it needs
+    with the same filters as its endpoint; each is reused for
+    DASHBOARD_CACHE_SECONDS (default 30) or until incidents or hotspot cells
+    change. `cached` lists the sections served without new work. `days` and
+    `source` are part of the cache keys, so only known values are accepted.
+    """
+    fmt = wire_format.choose_format(request)
+    wanted = [name.strip() for name in sections.split(",") if name.strip()]
+    if not wanted or any(name not in _DASHBOARD_SECTIONS for name in wanted):
+        raise HTTPException(400, f"sections must be a comma-separated subset of: {', '.join(_DASHBOARD_SECTIONS)}.")
+    if days < 1 or days > _DASHBOARD_MAX_DAYS:
+        raise HTTPException(400, f"days must be between 1 and {_DASHBOARD_MAX_DAYS}.")
+    if source.strip().lower() == "demo":
+        source = _resolve_hotspot_sources(source)[0]
+    elif source not in sources.ids():
+        raise HTTPException(400, f"source must be one of: {', '.join(sources.ids() + ['demo'])}.")
+    wanted = [name for name in _DASHBOARD_SECTIONS if name in wanted]
+    builders = {
+        "hotspots": _dashboard_hotspots,
+        "events": lambda: _dashboard_events(days),
+        "forecast": lambda: _dashboard_forecast(source),
+    }
+    try:
+        results = await asyncio.gather(*(run_in_threadpool(builders[name]) for name in wanted))
+    except Exception as e:
+        raise HTTPException(500, f"dashboard_map failed: {e}")
+
+    payload: dict[str, object] = {name: rows for name, (rows, _) in zip(wanted, results)}
+    payload["cached"] = [name for name, (_, shared) in zip(wanted, results) if shared]
+    return wire_format.respond(request, fmt, payload, list_keys=wanted, categorical=_DASHBOARD_CATEGORICAL)
+
+
+# ---------------------------
+# SEARCH
+# ---------------------------
+_SEARCH_MAX_LIMIT = 100
+
+
+@app.get("/search")
+def search_documents(
+    q: str,
+    types: Optional[str] = None,
+    limit: int = 20,
+    current_user: User = Depends(get_current_user),
+):
+    """Ranked full-text hits across field reports, clients and contact log notes the caller can see."""
+    if not search.query_terms(q):
+        raise HTTPException(400, "q must contain at least one word.")
+    if limit < 1 or limit > _SEARCH_MAX_LIMIT:
+        raise HTTPException(400, f"limit must be between 1 and {_SEARCH_MAX_LIMIT}.")
+    doc_types = search.DOC_TYPES
+    if types:
+        doc_types = tuple(t.strip() for t in types.split(",") if t.strip())
+        if not doc_types or any(t not in search.DOC_TYPES for t in doc_types):
+            raise HTTPException(400, f"types must be a comma-separated subset of: {', '.join(search.DOC_TYPES)}.")
+
+    db = SessionLocal()
+    try:
+        results = search.search(db, q, current_user.id, _is_admin(current_user), doc_types, limit)
+        return {"query": q, "results": results}
+    except Exception as e:
+        raise HTTPException(500, f"search failed: {e}")
+    finally:
+        db.close()
+
+
+# ---------------------------
+# SCREENING
 # ---------------------------
 @app.post("/screening/submit")
 def screening_submit(payload: dict, current_user: User = Depends(get_current_user)):
-    notes = (payload.get("notes") or "").lower()
-    risk_words = ["weapon", "kill", "gun", "danger", "suicidal", "harm"]
-    is_escalated = any(w in notes for w in risk_words)
+    notes = payload.get("notes") or ""
+    if not isinstance(notes, str):
+        raise HTTPException(400, "notes must be a string.")
+    try:
+        return screening.screener.screen(notes)
+    except Exception as e:
+        raise HTTPException(500, f"screening_submit failed: {e}")
+
+
+_SCREENING_BATCH_MAX = 1000
+_SCREENING_FLAGS_MAX_LIMIT = 500
+
+
+@app.post("/screening/batch")
+def screening_batch(payload: dict, current_user: User = Depends(get_current_user)):
+    """Screen up to 1000 notes in one call.
+
+    `notes` items are strings or {"id", "text"} objects; results keep the
+    caller's id (or the item's index) and all use one lexicon version.
+    """
+    notes = payload.get("notes")
+    if not isinstance(notes, list) or not notes:
+        raise HTTPException(400, "notes must be a non-empty list.")
+    if len(notes) > _SCREENING_BATCH_MAX:
+        raise HTTPException(400, f"At most {_SCREENING_BATCH_MAX} notes per batch.")
+    items = []
+    for index, note in enumerate(notes):
+        if isinstance(note, str):
+            items.append((index, note))
+        elif isinstance(note, dict) and isinstance(note.get("text") or "", str):
+            items.append((note.get("id", index), note.get("text") or ""))
+        else:
+            raise HTTPException(400, f"notes[{index}] must be a string or an object with a text string.")
+    try:
+        lexicon = screening.screener.lexicon()
+        results = [{"id": key, **lexicon.screen(text)} for key, text in items]
+    except Exception as e:
+        raise HTTPException(500, f"screening_batch failed: {e}")
+    return {
+        "lexicon_version": lexicon.version,
+        "escalated": sum(1 for result in results if result["is_escalated"]),
+        "results": results,
+    }
+
+
+def _rescan_screening(full: bool, job=None) -> dict:
+    db = SessionLocal()
+    try:
+        return screening.rescan_stored_notes(db, job=job, full=full)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@app.post("/screening/rescan")
+def screening_rescan(full: bool = False, current_user: User = Depends(get_current_user)):
+    """Queue a re-screen of stored notes; only new, edited or stale-lexicon notes unless `full`."""
+    if not _is_admin(current_user):
+        raise HTTPException(403, "Admin access required")
+    return _enqueue_job("screening.rescan", {"full": full}, current_user)
+
+
+@app.get("/screening/flags")
+def screening_flags(
+    escalated_only: bool = True,
+    subject_type: Optional[str] = None,
+    client_id: Optional[int] = None,
+    limit: int = 100,
+    current_user: User = Depends(get_current_user),
+):
+    if not _is_admin(current_user):
+        raise HTTPException(403, "Admin access required")
+    subject_types = [name for name, _, _, _ in screening.SUBJECTS]
+    if subject_type is not None and subject_type not in subject_types:
+        raise HTTPException(400, f"subject_type must be one of: {', '.join(subject_types)}.")
+    limit = max(1, min(limit, _SCREENING_FLAGS_MAX_LIMIT))
+    db = SessionLocal()
+    try:
+        query = db.query(ScreeningFlag)
+        if escalated_only:
+            query = query.filter(ScreeningFlag.is_escalated.is_(True))
+        if subject_type is not None:
+            query = query.filter(ScreeningFlag.subject_type == subject_type)
+        if client_id is not None:
+            query = query.filter(ScreeningFlag.client_id == client_id)
+        flags = query.order_by(ScreeningFlag.score.desc(), ScreeningFlag.id.asc()).limit(limit).all()
+        current_version = screening.screener.lexicon().version
+        return {
+            "lexicon_version": current_version,
+            "flags": [
+                {
+                    "subject_type": flag.subject_type,
+                    "subject_id": flag.subject_id,
+                    "client_id": flag.client_id,
+                    "score": flag.score,
+                    "is_escalated": flag.is_escalated,
+                    "categories": json.loads(flag.categories),
+                    "matches": json.loads(flag.matches),
+                    "lexicon_version": flag.lexicon_version,
+                    "stale": flag.lexicon_version != current_version,
+                    "screened_at": flag.screened_at,
+                }
+                for flag in flags
+            ],
+        }
+    except Exception as e:
+        raise HTTPException(500, f"screening_flags failed: {e}")
+    finally:
+        db.close()
 
+
+@app.get("/screening/lexicon")
+def screening_lexicon(current_user: User = Depends(get_current_user)):
+    try:
+        lexicon = screening.screener.lexicon()
+    except Exception as e:
+        raise HTTPException(500, f"screening_lexicon failed: {e}")
+    categories: dict[str, int] = {}
+    for term in lexicon.terms:
+        categories[term.category] = categories.get(term.category, 0) + 1
     return {
-        "is_escalated": is_escalated,
-        "escalation_reason": "High-risk keywords detected" if is_escalated else None,
-        "next_steps": "Immediate outreach recommended" if is_escalated else "Routine follow-up",
+        "lexicon_version": lexicon.version,
+        "terms": len(lexicon.terms),
+        "categories": categories,
+        "escalate_at": lexicon.escalate_at,
     }
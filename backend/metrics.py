@@ -0,0 +1,282 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy import event
+
+# Prometheus' default buckets; fine for request and query latency in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """A settable value, or one read from `func` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, func: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation)
+        self._value = 0.0
+        self._func = func
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = float(value)
+
+    def render(self) -> list[str]:
+        value = self._func() if self._func is not None else self._value
+        return self.header() + [f"{self.name} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last)], sum, count.
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+                self._series[key] = series
+            series[0][index] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), list(totals))) for key, (counts, totals) in self._series.items())
+        lines = self.header()
+        for key, (counts, (total, count)) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {_format_value(count)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "vpsd_http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")
+))
+HTTP_LATENCY = registry.register(Histogram(
+    "vpsd_http_request_duration_seconds", "Time until the response starts, by route template.", ("method", "route")
+))
+HTTP_DB_QUERIES = registry.register(Histogram(
+    "vpsd_http_request_db_queries", "SQL statements executed per request.", ("route",), QUERY_COUNT_BUCKETS
+))
+HTTP_DB_SECONDS = registry.register(Histogram(
+    "vpsd_http_request_db_seconds", "Total SQL execution time per request.", ("route",)
+))
+DB_QUERIES = registry.register(Counter(
+    "vpsd_db_queries_total", "SQL statements executed, by leading verb.", ("operation",)
+))
+DB_QUERY_SECONDS = registry.register(Histogram(
+    "vpsd_db_query_duration_seconds", "SQL statement execution time, by leading verb.", ("operation",)
+))
+ARCGIS_FETCH_SECONDS = registry.register(Histogram(
+    "vpsd_arcgis_fetch_duration_seconds", "SDPD ArcGIS FeatureServer fetch time.", ("outcome",)
+))
+ARCGIS_FEATURES = registry.register(Counter(
+    "vpsd_arcgis_features_total", "Features returned by the SDPD ArcGIS FeatureServer."
+))
+INCIDENT_UPSERTS = registry.register(Counter(
+    "vpsd_incident_upserts_total", "Incidents written by pulls, by outcome.", ("result",)
+))
+INCIDENT_DUPLICATES = registry.register(Counter(
+    "vpsd_incident_duplicates_total", "Ingested incidents linked to a canonical incident from another source."
+))
+INCIDENT_UPSERT_SECONDS = registry.register(Histogram(
+    "vpsd_incident_upsert_duration_seconds", "Time spent upserting one source's batch of incidents."
+))
+HOTSPOT_RECOMPUTE_SECONDS = registry.register(Histogram(
+    "vpsd_hotspot_recompute_duration_seconds", "Hotspot cell recompute time.", ("status",)
+))
+HOTSPOT_CELLS = registry.register(Gauge(
+    "vpsd_hotspot_cells", "Hotspot cells written by the most recent recompute in this process."
+))
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _operation(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    return verb if verb in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def instrument_engine(engine) -> None:
+    """Time every statement on `engine` and charge it to the current request, if any."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        operation = _operation(statement)
+        DB_QUERIES.inc(operation=operation)
+        DB_QUERY_SECONDS.observe(elapsed, operation=operation)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        starts = exception_context.connection.info.get("metrics_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route counts, latency and DB work.
+
+    Routes are labelled by their template (`/jobs/{job_id}`), so label
+    cardinality stays bounded; anything unrouted is `unmatched`. Latency runs
+    until the response starts, so long-lived streams do not skew it.
+    """
+
+    def __init__(self, app, skip_paths: tuple[str, ...] = ()):
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status = {"code": 500, "elapsed": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                status["elapsed"] = time.perf_counter() - start
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            elapsed = status["elapsed"] if status["elapsed"] is not None else time.perf_counter() - start
+            HTTP_REQUESTS.inc(method=method, route=route_label, status=str(status["code"]))
+            HTTP_LATENCY.observe(elapsed, method=method, route=route_label)
+            HTTP_DB_QUERIES.observe(stats.queries, route=route_label)
+            HTTP_DB_SECONDS.observe(stats.db_seconds, route=route_label)
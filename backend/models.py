@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, Text, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from db import Base
@@ -18,20 +18,61 @@ class User(Base):
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
 
+class IncidentTaxonomy(Base):
+    """One row per distinct (source, type, category, code section, offense code).
+
+    Append-only: incidents reference it by `taxonomy_id`. Optional parts are
+    stored as "" rather than NULL so the unique constraint covers them.
+    """
+    __tablename__ = "incident_taxonomy"
+    __table_args__ = (
+        UniqueConstraint(
+            "source", "incident_type", "offense_category", "code_section", "offense_code",
+            name="uq_incident_taxonomy",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String(64), nullable=False)
+    incident_type = Column(String(64), nullable=False)
+    offense_category = Column(String(128), nullable=False, default="")
+    code_section = Column(String(255), nullable=False, default="")
+    offense_code = Column(String(64), nullable=False, default="")
+
+
 class Incident(Base):
     __tablename__ = "incidents"
+    # Ids stay unique across the monthly shards (partitions.py): SQLite would
+    # otherwise hand the ids of archived rows out again.
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     external_id = Column(String(128), unique=True, nullable=True, index=True)
-    source = Column(String(64), index=True, nullable=False, default="sdpd_demo")
-    incident_type = Column(String(64), nullable=False, default="demo")
-    offense_category = Column(String(128), nullable=True)
+    taxonomy_id = Column(Integer, ForeignKey("incident_taxonomy.id"), nullable=False, index=True)
     block_address = Column(String(255), nullable=True)
-    code_section = Column(String(255), nullable=True)
-    offense_code = Column(String(64), nullable=True)
-    occurred_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    occurred_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
     lat = Column(Float, nullable=False)
     lon = Column(Float, nullable=False)
+    # Cross-source dedup (see dedup.py): NULL canonical_id means this row is canonical.
+    canonical_id = Column(Integer, nullable=True)
+    dedup_key = Column(String(96), nullable=True, index=True)
+
+
+class IncidentDailySummary(Base):
+    """Per-day, per-cell incident counts kept after raw rows pass their retention."""
+
+    __tablename__ = "incident_daily_summaries"
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False, index=True)
+    grid_lat = Column(Float, nullable=False)  # 0.01 deg cells, as hotspot_cells
+    grid_lon = Column(Float, nullable=False)
+    taxonomy_id = Column(Integer, ForeignKey("incident_taxonomy.id"), nullable=False)
+    incident_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("day", "grid_lat", "grid_lon", "taxonomy_id", name="uq_incident_daily_summary"),
+    )
 
 
 class HotspotCell(Base):
@@ -43,6 +84,9 @@ class HotspotCell(Base):
     recent_count = Column(Integer, nullable=False, default=0)
     baseline_count = Column(Integer, nullable=False, default=0)
     risk_score = Column(Integer, nullable=False, default=0)
+    # KDE peaks (see kde.py): half the side of the square their counts cover.
+    # NULL for 0.01 deg bins.
+    radius_m = Column(Float, nullable=True)
 
 
 class Client(Base):
@@ -83,6 +127,37 @@ class ContactLog(Base):
     client = relationship("Client", back_populates="contacts")
 
 
+class ClientTriageState(Base):
+    __tablename__ = "client_triage_state"
+
+    client_id = Column(Integer, ForeignKey("clients.id"), primary_key=True)
+    last_contact_at = Column(DateTime, nullable=True)
+    misses_30d = Column(Integer, nullable=False, default=0)
+    follow_up_at = Column(DateTime, nullable=True)
+    follow_up_state = Column(String(16), nullable=False, default="none", index=True)  # none|later|upcoming|soon|overdue
+    needs_count = Column(Integer, nullable=False, default=0)
+    urgency_score = Column(Integer, nullable=False, default=0)
+    scored_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_client_triage_state_queue", urgency_score.desc(), client_id),
+    )
+
+
+class ClientExposure(Base):
+    __tablename__ = "client_exposure"
+
+    client_id = Column(Integer, ForeignKey("clients.id"), primary_key=True)
+    radius_m = Column(Integer, nullable=False)
+    incidents_24h = Column(Integer, nullable=False, default=0)
+    incidents_7d = Column(Integer, nullable=False, default=0, index=True)
+    incidents_30d = Column(Integer, nullable=False, default=0)
+    nearest_hotspot_id = Column(Integer, nullable=True)
+    nearest_hotspot_risk = Column(Integer, nullable=True)
+    nearest_hotspot_distance_m = Column(Integer, nullable=True)
+    computed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
 class ContactLogShare(Base):
     __tablename__ = "contact_log_shares"
 
@@ -137,3 +212,133 @@ class FieldReportShare(Base):
     shared_with_group_id = Column(Integer, ForeignKey("groups.id"), nullable=True, index=True)
     created_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class FieldReportVisibility(Base):
+    __tablename__ = "field_report_visibility"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    field_report_id = Column(Integer, ForeignKey("field_reports.id"), primary_key=True, index=True)
+    reason = Column(String(16), nullable=False)  # sender|direct|group|published
+    report_created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_field_report_visibility_feed",
+            user_id,
+            report_created_at.desc(),
+            field_report_id.desc(),
+        ),
+    )
+
+
+class ChangeLogEntry(Base):
+    __tablename__ = "change_log"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    topic = Column(String(64), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON object
+    audience = Column(Text, nullable=True)  # JSON list of user ids; NULL = everyone
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    # Never reuse a seq after pruning, or consumers would skip new entries.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(64), nullable=False, index=True)
+    params = Column(Text, nullable=False, default="{}")  # JSON object
+    status = Column(String(16), nullable=False, default="queued", index=True)  # queued|running|succeeded|failed|cancelled
+    progress = Column(Float, nullable=False, default=0.0)  # 0..1
+    progress_note = Column(String(200), nullable=True)
+    result = Column(Text, nullable=True)  # JSON object
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    created_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # jobs.INSTANCE_ID of the process running it.
+    owner = Column(String(64), nullable=True, index=True)
+    # Bumped by the owner's heartbeat loop and on every progress write; a stale
+    # value marks a job orphaned by a dead worker.
+    heartbeat_at = Column(DateTime, nullable=True)
+
+    # At most one queued/running job per (kind, params): concurrent identical
+    # submissions race on this index instead of both starting a run.
+    __table_args__ = (
+        Index(
+            "uq_jobs_active_kind_params",
+            kind,
+            params,
+            unique=True,
+            sqlite_where=status.in_(["queued", "running"]),
+            postgresql_where=status.in_(["queued", "running"]),
+        ),
+    )
+
+
+class SourceCursor(Base):
+    """Sync state of one incident source adapter (see sources.py)."""
+
+    __tablename__ = "source_cursors"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String(255), nullable=False, unique=True)
+    cursor = Column(String(64), nullable=True)  # adapter-defined: newest occurred_at, file mtime, ...
+    last_pulled_at = Column(DateTime, nullable=True)
+    last_status = Column(String(16), nullable=True)  # ok|error|timeout
+    last_error = Column(Text, nullable=True)
+    last_fetched = Column(Integer, nullable=True)
+
+
+class BackfillSlice(Base):
+    """Checkpoint for one slice of a historical backfill (see backfill.py).
+
+    `source` names what was read (an ArcGIS URL or a files directory) and
+    `label` the slice within it (a date range or a file name).
+    """
+
+    __tablename__ = "backfill_slices"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String(255), nullable=False)
+    label = Column(String(255), nullable=False)
+    slice_start = Column(DateTime, nullable=True)
+    slice_end = Column(DateTime, nullable=True)
+    status = Column(String(16), nullable=False, default="pending", index=True)  # pending|done|failed
+    attempts = Column(Integer, nullable=False, default=0)
+    fetched = Column(Integer, nullable=False, default=0)
+    inserted = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("source", "label", name="uq_backfill_slices_source_label"),
+    )
+
+
+class ScreeningFlag(Base):
+    """Latest screening result for one stored note (client notes, contact log notes, field reports)."""
+
+    __tablename__ = "screening_flags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    subject_type = Column(String(32), nullable=False)  # client_note|contact_log|field_report
+    subject_id = Column(Integer, nullable=False)
+    client_id = Column(Integer, ForeignKey("clients.id"), nullable=True, index=True)
+    text_hash = Column(String(64), nullable=False)  # sha256 of the screened text
+    lexicon_version = Column(String(64), nullable=False)
+    score = Column(Float, nullable=False, default=0.0)
+    is_escalated = Column(Boolean, nullable=False, default=False, index=True)
+    categories = Column(Text, nullable=False, default="[]")  # JSON list
+    matches = Column(Text, nullable=False, default="[]")  # JSON list of {term, category, severity, weight, start, end, negated}
+    screened_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("subject_type", "subject_id", name="uq_screening_flags_subject"),
+    )
@@ -0,0 +1,362 @@
+"""Monthly partitions, per-source retention and compaction for incidents.
+
+`incidents` is the hot partition: rows since the start of the month
+INCIDENT_HOT_MONTHS - 1 months back (by default this month and the two
+before it). Hotspot runs, the forecast, the dashboard's hotspot layers and
+short /events windows only ever read it. Compaction moves older rows into one
+shard table per month, `incidents_YYYYMM`. Reads reaching further back
+(`/events?days=` or the dashboard's events past the hot window) union only the
+shards whose month overlaps the window.
+
+Each source keeps raw rows for its retention period (INCIDENT_RETENTION_DAYS,
+overridden per source by INCIDENT_RETENTION="source=days,..."). Past that,
+rows are first rolled into incident_daily_summaries (count per day, 0.01
+degree cell and taxonomy id) and then deleted. A shard whose rows have all
+expired is rolled up and dropped as a whole.
+
+Postgres uses the same shard tables rather than native declarative
+partitions. Those require every unique constraint to include the partition
+key, and ingest upserts on a global unique external_id.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+import logging
+import os
+import re
+import threading
+from typing import Optional
+
+from sqlalchemy import Column, DateTime, Float, Index, Integer, MetaData, String, Table, func, inspect, select, text, union_all
+
+import change_bus
+from db import engine
+import dedup
+from models import Incident, IncidentDailySummary
+import taxonomy
+
+logger = logging.getLogger(__name__)
+
+HOT_MONTHS = max(1, int(os.getenv("INCIDENT_HOT_MONTHS", "3")))
+DEFAULT_RETENTION_DAYS = int(os.getenv("INCIDENT_RETENTION_DAYS", "730"))
+COMPACT_INTERVAL_SECONDS = int(os.getenv("INCIDENT_COMPACT_INTERVAL_SECONDS", "21600"))
+# Let startup finish before the first run contends for the database.
+COMPACT_FIRST_DELAY_SECONDS = 60
+_CHUNK = 5000
+_SHARD_RE = re.compile(r"^incidents_(\d{4})(\d{2})$")
+_COLUMNS = (
+    "id", "external_id", "taxonomy_id", "block_address", "occurred_at", "lat", "lon", "canonical_id", "dedup_key",
+)
+
+
+def _parse_retention(raw: Optional[str]) -> dict[str, int]:
+    retention = {}
+    for part in (raw or "").split(","):
+        source, _, days = part.partition("=")
+        if source.strip() and days.strip():
+            retention[source.strip()] = int(days)
+    return retention
+
+
+# Demo rows are regenerated on demand; there is no history worth keeping.
+RETENTION_DAYS = {
+    "sdpd_demo": 90,
+    "sdpd_demo_events": 30,
+    **_parse_retention(os.getenv("INCIDENT_RETENTION")),
+}
+
+
+def retention_days(source: str) -> int:
+    return RETENTION_DAYS.get(source, DEFAULT_RETENTION_DAYS)
+
+
+def month_start(value: datetime, offset: int = 0) -> datetime:
+    """First instant of `value`'s month, moved `offset` months."""
+    index = value.year * 12 + value.month - 1 + offset
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def hot_since(now: Optional[datetime] = None) -> datetime:
+    return month_start(now or datetime.utcnow(), -(HOT_MONTHS - 1))
+
+
+def shard_name(month: datetime) -> str:
+    return f"incidents_{month.year:04d}{month.month:02d}"
+
+
+_shard_metadata = MetaData()
+_shard_lock = threading.Lock()
+
+
+def shard_table(name: str) -> Table:
+    """Same columns as incidents. No primary key: ids come from incidents, which never reuses one."""
+    with _shard_lock:
+        table = _shard_metadata.tables.get(name)
+        if table is None:
+            table = Table(
+                name,
+                _shard_metadata,
+                Column("id", Integer, nullable=False),
+                Column("external_id", String(128), nullable=True),
+                Column("taxonomy_id", Integer, nullable=False),
+                Column("block_address", String(255), nullable=True),
+                Column("occurred_at", DateTime, nullable=False),
+                Column("lat", Float, nullable=False),
+                Column("lon", Float, nullable=False),
+                Column("canonical_id", Integer, nullable=True),
+                Column("dedup_key", String(96), nullable=True),
+                Index(f"ix_{name}_external_id", "external_id", unique=True),
+                Index(f"ix_{name}_occurred_at", "occurred_at"),
+            )
+        return table
+
+
+def migrate(inspector) -> None:
+    """Add columns that incidents gained after a shard was created."""
+    for name in inspector.get_table_names():
+        if not _SHARD_RE.match(name):
+            continue
+        existing = {col["name"] for col in inspector.get_columns(name)}
+        with engine.begin() as conn:
+            for column in shard_table(name).columns:
+                if column.name not in existing:
+                    conn.execute(text(
+                        f"ALTER TABLE {name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                    ))
+
+
+def ensure_unique_ids() -> bool:
+    """Rebuild a SQLite `incidents` created without AUTOINCREMENT.
+
+    Without it SQLite gives a new row max(id) + 1, so once compaction moved
+    the newest ids out (a backfill's history) they were handed out again and
+    collided with archived rows. The rebuilt table's sequence starts past
+    every id in the hot table and the shards. Postgres sequences never reuse
+    ids. Returns whether the table was rebuilt.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.begin() as conn:
+        ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'incidents'")).scalar()
+        if ddl is None or "AUTOINCREMENT" in ddl.upper():
+            return False
+        high = max(
+            [conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM incidents")).scalar()]
+            + [conn.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar() for _, table in shards(conn)]
+        )
+        columns = ", ".join(
+            name for name in (col["name"] for col in inspect(conn).get_columns("incidents"))
+            if name in Incident.__table__.c
+        )
+        # Renaming would re-point the view and the indexes at the old table.
+        conn.execute(text(f"DROP VIEW IF EXISTS {taxonomy.VIEW}"))
+        for (index,) in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'incidents' AND sql IS NOT NULL"
+        )).all():
+            conn.execute(text(f'DROP INDEX "{index}"'))
+        conn.execute(text("ALTER TABLE incidents RENAME TO incidents_rowid_legacy"))
+        Incident.__table__.create(conn)
+        conn.execute(text(f"INSERT INTO incidents ({columns}) SELECT {columns} FROM incidents_rowid_legacy"))
+        conn.execute(text("DROP TABLE incidents_rowid_legacy"))
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'incidents'"))
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('incidents', :high)"), {"high": high})
+    taxonomy.ensure_view()
+    logger.info("Rebuilt incidents with AUTOINCREMENT; new ids start after %s", high)
+    return True
+
+
+def shards(bind=None) -> list[tuple[datetime, Table]]:
+    """Existing shards, oldest first, as (month start, table)."""
+    found = []
+    for name in inspect(bind if bind is not None else engine).get_table_names():
+        match = _SHARD_RE.match(name)
+        if match:
+            found.append((datetime(int(match.group(1)), int(match.group(2)), 1), shard_table(name)))
+    return sorted(found, key=lambda item: item[0])
+
+
+def incidents_since(since: Optional[datetime]):
+    """The incidents rows a window starting at `since` can touch (None: all history).
+
+    Returns the incidents table itself when the window fits the hot
+    partition, else a UNION ALL of it and the overlapping shards, each
+    branch already filtered on occurred_at so its own index is used. Either
+    way, select from `.c` with the incidents column names.
+    """
+    hot = Incident.__table__
+    if since is not None and since >= hot_since():
+        return hot
+    tables = [hot] + [table for month, table in shards() if since is None or month_start(month, 1) > since]
+    if len(tables) == 1:
+        return hot
+    branches = []
+    for table in tables:
+        branch = select(*(table.c[name] for name in _COLUMNS))
+        if since is not None:
+            branch = branch.where(table.c.occurred_at >= since)
+        branches.append(branch)
+    return union_all(*branches).subquery("incidents")
+
+
+def forget_archived(db, incidents: list[tuple[str, datetime]]) -> None:
+    """Drop archived copies of re-pulled (external_id, occurred_at) incidents;
+    the fresh rows land in the hot table."""
+    boundary = hot_since()
+    by_shard: dict[str, list[str]] = {}
+    for external_id, occurred_at in incidents:
+        if occurred_at < boundary:
+            by_shard.setdefault(shard_name(month_start(occurred_at)), []).append(external_id)
+    if not by_shard:
+        return
+    existing = set(inspect(db.connection()).get_table_names())
+    for name, external_ids in by_shard.items():
+        if name in existing:
+            table = shard_table(name)
+            db.execute(table.delete().where(table.c.external_id.in_(external_ids)))
+
+
+# ---------------------------
+# Compaction
+# ---------------------------
+def _roll_up(db, table, condition) -> int:
+    """Add the matching rows of `table` to incident_daily_summaries and delete them."""
+    counts: Counter = Counter()
+    rows = db.execute(
+        select(table.c.occurred_at, table.c.lat, table.c.lon, table.c.taxonomy_id)
+        .where(condition)
+        .execution_options(yield_per=_CHUNK)
+    )
+    for occurred_at, lat, lon, taxonomy_id in rows:
+        counts[(occurred_at.date(), round(float(lat), 2), round(float(lon), 2), taxonomy_id)] += 1
+    if not counts:
+        return 0
+    db.execute(
+        text(
+            "INSERT INTO incident_daily_summaries (day, grid_lat, grid_lon, taxonomy_id, incident_count)"
+            " VALUES (:day, :grid_lat, :grid_lon, :taxonomy_id, :n)"
+            " ON CONFLICT (day, grid_lat, grid_lon, taxonomy_id)"
+            " DO UPDATE SET incident_count = incident_daily_summaries.incident_count + excluded.incident_count"
+        ),
+        [
+            {"day": day, "grid_lat": grid_lat, "grid_lon": grid_lon, "taxonomy_id": taxonomy_id, "n": n}
+            for (day, grid_lat, grid_lon, taxonomy_id), n in counts.items()
+        ],
+    )
+    db.execute(table.delete().where(condition))
+    return sum(counts.values())
+
+
+def _archive(db, boundary: datetime) -> int:
+    """Move hot rows older than `boundary` into their month's shard, one month per commit."""
+    hot = Incident.__table__
+    oldest = db.execute(select(func.min(hot.c.occurred_at)).where(hot.c.occurred_at < boundary)).scalar()
+    moved = 0
+    month = month_start(oldest) if oldest is not None else boundary
+    while month < boundary:
+        end = min(month_start(month, 1), boundary)
+        in_month = (hot.c.occurred_at >= month) & (hot.c.occurred_at < end)
+        shard = shard_table(shard_name(month))
+        shard.create(db.connection(), checkfirst=True)
+        # A re-pulled incident replaces its archived copy.
+        db.execute(shard.delete().where(
+            shard.c.external_id.in_(select(hot.c.external_id).where(in_month, hot.c.external_id.is_not(None)))
+        ))
+        n = db.execute(shard.insert().from_select(
+            list(_COLUMNS), select(*(hot.c[name] for name in _COLUMNS)).where(in_month)
+        )).rowcount
+        db.execute(hot.delete().where(in_month))
+        db.commit()
+        moved += n
+        month = end
+    return moved
+
+
+def _expire(db, now: datetime) -> dict[str, int]:
+    """Roll up and delete rows past their source's retention; drop shards left with nothing."""
+    sources = [row[0] for row in db.execute(text("SELECT DISTINCT source FROM incident_taxonomy"))]
+    # Whole days, so a day is never split between raw rows and its summary.
+    cutoffs = {
+        source: datetime.combine(now.date(), datetime.min.time()) - timedelta(days=retention_days(source))
+        for source in sources
+    }
+    rolled = 0
+    dropped = 0
+    for month, table in shards(db.connection()):
+        month_end = month_start(month, 1)
+        if all(cutoff >= month_end for cutoff in cutoffs.values()):
+            rolled += _roll_up(db, table, table.c.occurred_at < month_end)
+            db.commit()
+            table.drop(db.connection())
+            db.commit()
+            dropped += 1
+            continue
+        for source, cutoff in cutoffs.items():
+            if cutoff > month:
+                rolled += _roll_up(
+                    db, table, table.c.taxonomy_id.in_(taxonomy.source_ids(source)) & (table.c.occurred_at < cutoff)
+                )
+        db.commit()
+        if db.execute(select(table.c.id).limit(1)).first() is None:
+            table.drop(db.connection())
+            db.commit()
+            dropped += 1
+    hot = Incident.__table__
+    for source, cutoff in cutoffs.items():
+        rolled += _roll_up(db, hot, hot.c.taxonomy_id.in_(taxonomy.source_ids(source)) & (hot.c.occurred_at < cutoff))
+    db.commit()
+    return {"rolled_up": rolled, "shards_dropped": dropped}
+
+
+def compact(db, job=None, now: Optional[datetime] = None) -> dict:
+    """Archive rows that left the hot window, then apply retention."""
+    now = now or datetime.utcnow()
+    boundary = hot_since(now)
+    if job:
+        job.progress(0.1, f"archiving incidents before {boundary.date()}")
+    archived = _archive(db, boundary)
+    if job:
+        job.progress(0.5, f"archived {archived}; applying retention")
+    expired = _expire(db, now)
+    # A duplicate whose canonical row was archived or expired stands for the event now.
+    promoted = dedup.promote_orphans(db)
+    db.commit()
+    if archived or expired["rolled_up"] or promoted:
+        change_bus.record(db, "incidents.compacted", {"archived": archived, **expired, "promoted": promoted})
+        db.commit()
+    return {"hot_since": boundary, "archived": archived, **expired, "promoted": promoted}
+
+
+def status(db) -> dict:
+    hot = Incident.__table__
+    return {
+        "hot_since": hot_since(),
+        "hot_rows": db.execute(select(func.count()).select_from(hot)).scalar(),
+        "shards": [
+            {
+                "name": table.name,
+                "month": month.strftime("%Y-%m"),
+                "rows": db.execute(select(func.count()).select_from(table)).scalar(),
+            }
+            for month, table in shards(db.connection())
+        ],
+        "summaries": db.query(func.count(IncidentDailySummary.id)).scalar(),
+        "retention_days": {"default": DEFAULT_RETENTION_DAYS, **RETENTION_DAYS},
+    }
+
+
+def start_compaction_loop(submit, interval_seconds: int = COMPACT_INTERVAL_SECONDS) -> threading.Event:
+    """Call `submit()` (queue a compaction job) shortly after startup and then every `interval_seconds`."""
+    stop = threading.Event()
+
+    def _loop() -> None:
+        if stop.wait(min(COMPACT_FIRST_DELAY_SECONDS, interval_seconds)):
+            return
+        while True:
+            try:
+                submit()
+            except Exception:
+                logger.exception("scheduling incident compaction failed")
+            if stop.wait(interval_seconds):
+                return
+
+    threading.Thread(target=_loop, name="incident-compaction", daemon=True).start()
+    return stop
@@ -0,0 +1,195 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import json
+import os
+import threading
+from typing import AsyncIterator, Iterable, Optional
+
+HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+REPLAY_BUFFER_SIZE = int(os.getenv("STREAM_REPLAY_BUFFER_SIZE", "1000"))
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("STREAM_SUBSCRIBER_QUEUE_SIZE", "256"))
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    topic: str
+    data: dict
+    # None means every authenticated user; otherwise the user ids allowed to see it.
+    audience: Optional[frozenset[int]] = None
+
+    def visible_to(self, user_id: int, is_admin: bool) -> bool:
+        return is_admin or self.audience is None or user_id in self.audience
+
+    def encode(self) -> str:
+        return f"id: {self.id}\nevent: {self.topic}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+class Subscription:
+    """One connected stream. Events are handed over from any thread onto the subscriber's loop.
+
+    The queue is bounded: a client that stops reading is marked `overflowed`
+    and disconnected instead of letting the backlog grow; it reconnects with
+    Last-Event-ID and catches up from the hub's replay buffer.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, user_id: int, is_admin: bool, maxsize: int):
+        self.loop = loop
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def offer(self, event: Event) -> None:
+        if not event.visible_to(self.user_id, self.is_admin):
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Loop already closed; the stream's finally block will unsubscribe us.
+            pass
+
+    def _put(self, event: Event) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class EventHub:
+    """In-process pub/sub with a ring buffer for Last-Event-ID replay.
+
+    Bus-delivered ids can arrive out of order (on Postgres a change_log row
+    can commit after a later one), so the buffer and replay follow arrival
+    order: a client that last saw id N missed exactly what arrived after N,
+    late lower ids included.
+    """
+
+    def __init__(self, buffer_size: int = REPLAY_BUFFER_SIZE, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._evicted = 0  # highest id pushed out of the buffer
+        self._buffer: deque[Event] = deque(maxlen=buffer_size)
+        self._subscribers: set[Subscription] = set()
+
+    def publish(
+        self,
+        topic: str,
+        data: dict,
+        audience: Optional[set[int]] = None,
+        event_id: Optional[int] = None,
+    ) -> Event:
+        with self._lock:
+            # Bus-delivered events reuse the change_log seq so ids agree across workers;
+            # a late one must not move the sequence back.
+            if event_id is None:
+                event_id = self._seq + 1
+            self._seq = max(self._seq, event_id)
+            event = Event(
+                id=event_id,
+                topic=topic,
+                data=data,
+                audience=frozenset(audience) if audience is not None else None,
+            )
+            if self._buffer and len(self._buffer) == self._buffer.maxlen:
+                self._evicted = max(self._evicted, self._buffer[0].id)
+            self._buffer.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.offer(event)
+        return event
+
+    def subscribe(
+        self,
+        user_id: int,
+        is_admin: bool,
+        last_event_id: Optional[int] = None,
+        open_gaps: Iterable[int] = (),
+    ) -> tuple[Subscription, list[Event], bool]:
+        """Register a subscriber; returns (subscription, replay events, replay_complete).
+
+        When `last_event_id` is still buffered, the replay is everything that
+        arrived after it. Otherwise it is every buffered id above it, and
+        `replay_complete` is False (the client must refetch instead of
+        replaying) if something the client may not have seen is gone or out
+        of order: the id fell out of the ring buffer, an id at or below it
+        arrived after a higher one, or `open_gaps` (change_log seqs not yet
+        committed) holds one below it.
+        """
+        subscription = Subscription(asyncio.get_running_loop(), user_id, is_admin, self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if last_event_id is None:
+                return subscription, [], True
+            events = list(self._buffer)
+            position = next((i for i in range(len(events) - 1, -1, -1) if events[i].id == last_event_id), None)
+            if position is not None:
+                missed = events[position + 1:]
+                complete = True
+            else:
+                missed = sorted((event for event in events if event.id > last_event_id), key=lambda event: event.id)
+                oldest = min((event.id for event in events), default=self._seq + 1)
+                complete = (
+                    last_event_id >= max(oldest - 1, self._evicted)
+                    and not _arrived_late(events, last_event_id)
+                    and not any(seq < last_event_id for seq in open_gaps)
+                )
+        replay = [event for event in missed if event.visible_to(user_id, is_admin)]
+        return subscription, replay, complete
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+def _arrived_late(events: list[Event], last_event_id: int) -> bool:
+    """Whether an id at or below `last_event_id` arrived after a higher one."""
+    highest = 0
+    for event in events:
+        if event.id < highest and event.id <= last_event_id:
+            return True
+        highest = max(highest, event.id)
+    return False
+
+
+async def sse_stream(
+    hub: EventHub,
+    user_id: int,
+    is_admin: bool,
+    last_event_id: Optional[int],
+    is_disconnected,
+    open_gaps: Iterable[int] = (),
+) -> AsyncIterator[str]:
+    subscription, replay, complete = hub.subscribe(user_id, is_admin, last_event_id, open_gaps)
+    try:
+        yield "retry: 3000\n\n"
+        if not complete:
+            yield "event: reset\ndata: {}\n\n"
+        for event in replay:
+            yield event.encode()
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                yield ": heartbeat\n\n"
+                continue
+            if subscription.overflowed:
+                yield "event: overflow\ndata: {}\n\n"
+                return
+            yield event.encode()
+    finally:
+        hub.unsubscribe(subscription)
+
+
+hub = EventHub()
@@ -0,0 +1,216 @@
+import base64
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, or_, select
+
+from models import FieldReport, FieldReportShare, FieldReportVisibility, GroupMember, User
+
+# Lower rank wins when one user reaches a report through several paths.
+_REASON_RANK = {"sender": 0, "direct": 1, "group": 2, "published": 3}
+
+
+def _grant(grants: dict, key: int, reason: str, created_at: datetime) -> None:
+    current = grants.get(key)
+    if current is None or _REASON_RANK[reason] < _REASON_RANK[current[0]]:
+        grants[key] = (reason, created_at)
+
+
+def _is_police(role: Optional[str]) -> bool:
+    return (role or "").strip().lower() == "police"
+
+
+def _insert_rows(db, rows: list[dict[str, object]]) -> None:
+    if rows:
+        db.bulk_insert_mappings(FieldReportVisibility, rows)
+
+
+def sync_report(db, report_id: int) -> int:
+    """Recompute who can see one report (after create, share or publish)."""
+    db.flush()
+    remove_report(db, report_id)
+    report = db.get(FieldReport, report_id)
+    if report is None:
+        return 0
+
+    grants: dict[int, tuple[str, datetime]] = {}
+    created_at = report.created_at
+    if report.published_to_all:
+        for (user_id,) in db.query(User.id).all():
+            _grant(grants, user_id, "published", created_at)
+
+    shares = (
+        db.query(FieldReportShare.shared_with_user_id, GroupMember.user_id)
+        .outerjoin(GroupMember, GroupMember.group_id == FieldReportShare.shared_with_group_id)
+        .filter(FieldReportShare.field_report_id == report_id)
+        .all()
+    )
+    for direct_user_id, member_user_id in shares:
+        if direct_user_id is not None:
+            _grant(grants, direct_user_id, "direct", created_at)
+        if member_user_id is not None:
+            _grant(grants, member_user_id, "group", created_at)
+
+    sender = db.get(User, report.sender_user_id)
+    if sender is not None and _is_police(sender.role):
+        _grant(grants, sender.id, "sender", created_at)
+
+    _insert_rows(db, [
+        {
+            "user_id": user_id,
+            "field_report_id": report_id,
+            "reason": reason,
+            "report_created_at": report_created_at,
+        }
+        for user_id, (reason, report_created_at) in grants.items()
+    ])
+    return len(grants)
+
+
+def sync_user(db, user_id: int) -> int:
+    """Recompute one user's feed (after group membership, role or account changes)."""
+    db.flush()
+    remove_user(db, user_id)
+    user = db.get(User, user_id)
+    if user is None:
+        return 0
+
+    grants: dict[int, tuple[str, datetime]] = {}
+    for report_id, created_at in (
+        db.query(FieldReport.id, FieldReport.created_at)
+        .filter(FieldReport.published_to_all.is_(True))
+        .all()
+    ):
+        _grant(grants, report_id, "published", created_at)
+
+    group_ids = db.query(GroupMember.group_id).filter(GroupMember.user_id == user_id)
+    for report_id, created_at, direct_user_id in (
+        db.query(FieldReport.id, FieldReport.created_at, FieldReportShare.shared_with_user_id)
+        .join(FieldReportShare, FieldReportShare.field_report_id == FieldReport.id)
+        .filter(
+            or_(
+                FieldReportShare.shared_with_user_id == user_id,
+                FieldReportShare.shared_with_group_id.in_(group_ids),
+            )
+        )
+        .all()
+    ):
+        _grant(grants, report_id, "direct" if direct_user_id == user_id else "group", created_at)
+
+    if _is_police(user.role):
+        for report_id, created_at in (
+            db.query(FieldReport.id, FieldReport.created_at)
+            .filter(FieldReport.sender_user_id == user_id)
+            .all()
+        ):
+            _grant(grants, report_id, "sender", created_at)
+
+    _insert_rows(db, [
+        {
+            "user_id": user_id,
+            "field_report_id": report_id,
+            "reason": reason,
+            "report_created_at": created_at,
+        }
+        for report_id, (reason, created_at) in grants.items()
+    ])
+    return len(grants)
+
+
+def sync_users(db, user_ids: Iterable[int]) -> None:
+    for user_id in dict.fromkeys(user_ids):
+        sync_user(db, user_id)
+
+
+def remove_report(db, report_id: int) -> None:
+    db.query(FieldReportVisibility).filter(
+        FieldReportVisibility.field_report_id == report_id
+    ).delete(synchronize_session=False)
+
+
+def remove_user(db, user_id: int) -> None:
+    db.query(FieldReportVisibility).filter(
+        FieldReportVisibility.user_id == user_id
+    ).delete(synchronize_session=False)
+
+
+def rebuild_all(db) -> int:
+    """Recompute the whole table (startup backfill, /admin/init); caller commits."""
+    db.query(FieldReportVisibility).delete(synchronize_session=False)
+    return sum(sync_report(db, report_id) for (report_id,) in db.query(FieldReport.id).all())
+
+
+def needs_backfill(db) -> bool:
+    has_reports = db.query(FieldReport.id).first() is not None
+    has_rows = db.query(FieldReportVisibility.user_id).first() is not None
+    return has_reports and not has_rows
+
+
+def encode_cursor(report) -> str:
+    """`report` is a FieldReport or a feed_query row (both have created_at, id)."""
+    raw = f"{report.created_at.isoformat()}|{report.id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError on anything malformed."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        created_at, report_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii").split("|")
+        return datetime.fromisoformat(created_at), int(report_id)
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+FEED_COLUMNS = (
+    FieldReport.id,
+    FieldReport.sender_user_id,
+    FieldReport.title,
+    FieldReport.message,
+    FieldReport.location_text,
+    FieldReport.severity,
+    FieldReport.status,
+    FieldReport.published_to_all,
+    FieldReport.published_by_user_id,
+    FieldReport.created_at,
+    FieldReport.published_at,
+    User.name.label("sender_name"),
+    User.email.label("sender_email"),
+)
+
+
+def feed_query(user_id: Optional[int], *, before: Optional[tuple[datetime, int]] = None):
+    """Report rows (FEED_COLUMNS) newest first; `user_id=None` means every report (admins).
+
+    A Core select for `db.execute`, so pages come back as plain rows. Non-admin
+    feeds are a range scan of the (user_id, created_at, id) index on the
+    visibility table; `before` continues after the last row of a page.
+    """
+    query = select(*FEED_COLUMNS).join(User, User.id == FieldReport.sender_user_id)
+    if user_id is None:
+        created_col, id_col = FieldReport.created_at, FieldReport.id
+    else:
+        query = query.join(
+            FieldReportVisibility,
+            and_(
+                FieldReportVisibility.field_report_id == FieldReport.id,
+                FieldReportVisibility.user_id == user_id,
+            ),
+        )
+        created_col, id_col = FieldReportVisibility.report_created_at, FieldReportVisibility.field_report_id
+
+    if before is not None:
+        before_created, before_id = before
+        query = query.where(
+            or_(created_col < before_created, and_(created_col == before_created, id_col < before_id))
+        )
+    return query.order_by(created_col.desc(), id_col.desc())
+
+
+def visible_user_ids(db, report_id: int) -> set[int]:
+    return {
+        user_id
+        for (user_id,) in db.query(FieldReportVisibility.user_id)
+        .filter(FieldReportVisibility.field_report_id == report_id)
+        .all()
+    }
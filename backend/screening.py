@@ -0,0 +1,390 @@
+"""Risk screening of free-text notes against a versioned lexicon.
+
+The lexicon (screening_lexicon.json, or SCREENING_LEXICON_PATH) lists
+phrases with a category and severity. It is compiled into one word-level
+Aho-Corasick automaton, so a note is matched in a single pass over its tokens
+however many phrases the lexicon holds. The automaton is rebuilt only when the
+lexicon file changes on disk.
+
+Matching is on whole words, case-insensitive. Overlapping hits keep the
+longest phrase ("kill myself" over "kill"). A hit preceded by a negation cue
+("denies", "no", ...) within a few words of the same clause is reported but
+not scored; commas end a clause, and a cue that is part of an earlier hit
+("not breathing") negates nothing after it.
+"""
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from typing import Any, Optional
+
+from sqlalchemy import select
+
+import change_bus
+from models import Client, ContactLog, FieldReport, ScreeningFlag
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "screening_lexicon.json")
+LEXICON_PATH = os.getenv("SCREENING_LEXICON_PATH") or DEFAULT_LEXICON_PATH
+RESCAN_WORKERS = int(os.getenv("SCREENING_WORKERS", str(min(4, os.cpu_count() or 1))))
+RESCAN_CHUNK = 500
+# Rescans run on a job thread; forking there would copy locks other threads hold
+# (the connection pool, logging) into the children. forkserver forks from a clean
+# single-threaded server process instead, and spawn starts fresh interpreters.
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Words (allowing inner hyphens/apostrophes) plus clause punctuation, which bounds negation.
+_TOKEN_RE = re.compile(r"\w+(?:[-']\w+)*|[.,;:!?]")
+_CLAUSE_BREAKS = frozenset({".", ",", ";", ":", "!", "?", "but", "however", "although"})
+
+
+@dataclass(frozen=True)
+class Term:
+    phrase: str
+    category: str
+    severity: str
+    weight: float
+
+
+def tokenize(text: str) -> list[tuple[str, int, int]]:
+    """(lowercased token, start, end) for every word and clause break in `text`."""
+    return [(m.group().lower(), m.start(), m.end()) for m in _TOKEN_RE.finditer(text)]
+
+
+class _Automaton:
+    """Aho-Corasick over token sequences; states are list indices, state 0 is the root."""
+
+    def __init__(self, patterns: list[tuple[str, ...]]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._out: list[list[int]] = [[]]
+        for index, tokens in enumerate(patterns):
+            state = 0
+            for token in tokens:
+                nxt = self._goto[state].get(token)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][token] = nxt
+                    self._goto.append({})
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(index)
+
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def search(self, tokens: list[str]) -> list[tuple[int, int]]:
+        """(end_token_index, pattern_index) for every occurrence."""
+        hits = []
+        state = 0
+        for i, token in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for index in self._out[state]:
+                hits.append((i, index))
+        return hits
+
+
+class CompiledLexicon:
+    def __init__(self, raw: dict[str, Any], digest: str):
+        self.raw = raw
+        self.digest = digest
+        weights = {str(k): float(v) for k, v in (raw.get("severity_weights") or {}).items()}
+        self.version = f"{raw.get('version', '0')}+{digest[:8]}"
+        self.escalate_at = float(raw.get("escalate_at", 3))
+        negation = raw.get("negation") or {}
+        self.negation_window = int(negation.get("window", 4))
+        self.negation_cues = {
+            tuple(token for token, _, _ in tokenize(cue)) for cue in negation.get("cues", []) if cue.strip()
+        }
+
+        self.terms: list[Term] = []
+        patterns: list[tuple[str, ...]] = []
+        seen: set[tuple[str, ...]] = set()
+        for entry in raw.get("terms", []):
+            tokens = tuple(token for token, _, _ in tokenize(entry["phrase"]))
+            if not tokens or tokens in seen:
+                continue
+            severity = str(entry.get("severity", "medium"))
+            if "weight" in entry:
+                weight = float(entry["weight"])
+            elif severity in weights:
+                weight = weights[severity]
+            else:
+                raise ValueError(f"lexicon term {entry['phrase']!r} has unknown severity {severity!r}")
+            seen.add(tokens)
+            patterns.append(tokens)
+            self.terms.append(Term(" ".join(tokens), str(entry.get("category", "general")), severity, weight))
+        self._patterns = patterns
+        self._automaton = _Automaton(patterns)
+
+    def _negated(self, tokens: list[str], start: int, matched: set[int]) -> bool:
+        """Whether a cue precedes tokens[start] in its clause; cues inside `matched`
+        (token indexes of earlier hits, e.g. the "not" of "not breathing") don't count."""
+        words = 0
+        i = start - 1
+        while i >= 0 and words < self.negation_window:
+            if tokens[i] in _CLAUSE_BREAKS:
+                return False
+            for cue in self.negation_cues:
+                first = i - len(cue) + 1
+                if first >= 0 and tuple(tokens[first:i + 1]) == cue and matched.isdisjoint(range(first, i + 1)):
+                    return True
+            words += 1
+            i -= 1
+        return False
+
+    def screen(self, text: str) -> dict[str, Any]:
+        spans = tokenize(text or "")
+        tokens = [token for token, _, _ in spans]
+        hits = [
+            (end - len(self._patterns[index]) + 1, end, index)
+            for end, index in self._automaton.search(tokens)
+        ]
+        # Leftmost-longest, non-overlapping.
+        hits.sort(key=lambda hit: (hit[0], hit[0] - hit[1]))
+        matches = []
+        matched: set[int] = set()
+        last_end = -1
+        for start, end, index in hits:
+            if start <= last_end:
+                continue
+            last_end = end
+            term = self.terms[index]
+            matches.append({
+                "term": term.phrase,
+                "category": term.category,
+                "severity": term.severity,
+                "weight": term.weight,
+                "start": spans[start][1],
+                "end": spans[end][2],
+                "text": text[spans[start][1]:spans[end][2]],
+                "negated": self._negated(tokens, start, matched),
+            })
+            matched.update(range(start, end + 1))
+
+        scored = [m for m in matches if not m["negated"]]
+        score = sum((m["weight"] for m in scored), 0.0)
+        is_escalated = score >= self.escalate_at
+        categories = sorted({m["category"] for m in scored})
+        terms = list(dict.fromkeys(m["term"] for m in scored))
+        return {
+            "is_escalated": is_escalated,
+            "escalation_reason": f"High-risk keywords detected: {', '.join(terms)}" if is_escalated else None,
+            "next_steps": "Immediate outreach recommended" if is_escalated else "Routine follow-up",
+            "score": score,
+            "categories": categories,
+            "matches": matches,
+            "lexicon_version": self.version,
+        }
+
+
+class ScreeningEngine:
+    """Loads and compiles the lexicon, recompiling when the file's mtime or size changes.
+
+    A lexicon that fails to load keeps the last good compile in service.
+    """
+
+    def __init__(self, path: str = LEXICON_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._compiled: Optional[CompiledLexicon] = None
+        self._stamp: Optional[tuple[int, int]] = None
+
+    def lexicon(self) -> CompiledLexicon:
+        stat = os.stat(self.path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if self._compiled is not None and stamp == self._stamp:
+            return self._compiled
+        with self._lock:
+            if self._compiled is None or stamp != self._stamp:
+                try:
+                    with open(self.path, "rb") as f:
+                        content = f.read()
+                    compiled = CompiledLexicon(json.loads(content), hashlib.sha256(content).hexdigest())
+                except Exception:
+                    if self._compiled is None:
+                        raise
+                    logger.exception("screening lexicon %s failed to load; keeping %s", self.path, self._compiled.version)
+                    self._stamp = stamp
+                    return self._compiled
+                logger.info("screening lexicon %s compiled: %d terms", compiled.version, len(compiled.terms))
+                self._compiled = compiled
+                self._stamp = stamp
+            return self._compiled
+
+    def screen(self, text: str) -> dict[str, Any]:
+        return self.lexicon().screen(text)
+
+
+screener = ScreeningEngine()
+
+
+# ---------------------------
+# Stored notes
+# ---------------------------
+# (subject_type, model, text column, column linking the note to a client)
+SUBJECTS = (
+    ("client_note", Client, Client.notes, Client.id),
+    ("contact_log", ContactLog, ContactLog.note, ContactLog.client_id),
+    ("field_report", FieldReport, FieldReport.message, None),
+)
+
+_worker_lexicon: Optional[CompiledLexicon] = None
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _init_worker(raw: dict[str, Any], digest: str) -> None:
+    global _worker_lexicon
+    _worker_lexicon = CompiledLexicon(raw, digest)
+
+
+def _screen_chunk(items: list[tuple[Any, str]], lexicon: Optional[CompiledLexicon] = None) -> list[tuple[Any, dict]]:
+    """Screen (key, text) pairs; runs in a pool worker unless `lexicon` is given."""
+    lexicon = lexicon or _worker_lexicon
+    out = []
+    for key, text in items:
+        result = lexicon.screen(text)
+        for match in result["matches"]:
+            del match["text"]  # spans point back into the stored note; don't copy it
+        out.append((key, result))
+    return out
+
+
+def rescan_stored_notes(db, job=None, full: bool = False, workers: int = RESCAN_WORKERS) -> dict[str, Any]:
+    """Screen stored notes and persist one ScreeningFlag per note.
+
+    Notes whose text hash and lexicon version match their existing flag are
+    skipped unless `full`. Notes are read in id-ordered chunks and screened on
+    a process pool of `workers`; each chunk's flags are committed as it comes
+    back, so a cancelled run keeps what it finished and the next run resumes
+    incrementally. Flags for deleted or emptied notes are removed.
+    """
+    lexicon = screener.lexicon()
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(_START_METHOD),
+            initializer=_init_worker,
+            initargs=(lexicon.raw, lexicon.digest),
+        )
+
+    totals = {"scanned": 0, "screened": 0, "unchanged": 0, "removed": 0, "escalated": 0}
+    total_rows = sum(db.query(model).count() for _, model, _, _ in SUBJECTS) or 1
+    in_flight: deque[tuple[Future, dict]] = deque()
+
+    def write(results: list[tuple[Any, dict]], pending: dict) -> None:
+        now = datetime.utcnow()
+        for (subject_type, subject_id), result in results:
+            client_id, digest, flag = pending[(subject_type, subject_id)]
+            if flag is None:
+                flag = ScreeningFlag(subject_type=subject_type, subject_id=subject_id)
+                db.add(flag)
+            flag.client_id = client_id
+            flag.text_hash = digest
+            flag.lexicon_version = lexicon.version
+            flag.score = result["score"]
+            flag.is_escalated = result["is_escalated"]
+            flag.categories = json.dumps(result["categories"])
+            flag.matches = json.dumps(result["matches"])
+            flag.screened_at = now
+            totals["screened"] += 1
+            totals["escalated"] += int(result["is_escalated"])
+        db.commit()
+
+    def drain(limit: int) -> None:
+        while len(in_flight) > limit:
+            future, pending = in_flight.popleft()
+            write(future.result(), pending)
+
+    try:
+        for subject_type, model, text_column, client_column in SUBJECTS:
+            client_expr = client_column if client_column is not None else model.id
+            last_id = 0
+            while True:
+                rows = db.execute(
+                    select(model.id, client_expr, text_column)
+                    .where(model.id > last_id)
+                    .order_by(model.id)
+                    .limit(RESCAN_CHUNK)
+                ).all()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                existing = {
+                    flag.subject_id: flag
+                    for flag in db.query(ScreeningFlag).filter(
+                        ScreeningFlag.subject_type == subject_type,
+                        ScreeningFlag.subject_id.in_([row[0] for row in rows]),
+                    )
+                }
+
+                items: list[tuple[Any, str]] = []
+                pending: dict = {}
+                for subject_id, client_id, text in rows:
+                    totals["scanned"] += 1
+                    flag = existing.get(subject_id)
+                    if not (text or "").strip():
+                        if flag is not None:
+                            db.delete(flag)
+                            totals["removed"] += 1
+                        continue
+                    digest = text_hash(text)
+                    if not full and flag is not None and flag.text_hash == digest and flag.lexicon_version == lexicon.version:
+                        totals["unchanged"] += 1
+                        continue
+                    key = (subject_type, subject_id)
+                    items.append((key, text))
+                    pending[key] = (client_id if client_column is not None else None, digest, flag)
+
+                db.commit()  # removals; also ends the read so job.progress can write
+                if pool is not None and items:
+                    in_flight.append((pool.submit(_screen_chunk, items), pending))
+                    drain(workers * 2)
+                elif items:
+                    write(_screen_chunk(items, lexicon), pending)
+                if job is not None:
+                    job.progress(0.95 * totals["scanned"] / total_rows, f"{subject_type}: {totals['scanned']} notes read")
+            drain(0)
+
+            # Notes deleted since their flag was written.
+            orphans = db.query(ScreeningFlag).filter(
+                ScreeningFlag.subject_type == subject_type,
+                ScreeningFlag.subject_id.not_in(select(model.id)),
+            )
+            totals["removed"] += orphans.delete(synchronize_session=False)
+            db.commit()
+
+        change_bus.record(
+            db,
+            "screening.flags_updated",
+            {"lexicon_version": lexicon.version, "screened": totals["screened"], "escalated": totals["escalated"]},
+        )
+        db.commit()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    return {"lexicon_version": lexicon.version, "full": full, "workers": workers if pool else 1, **totals}
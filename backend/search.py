@@ -0,0 +1,249 @@
+"""Full-text search over field reports, clients and contact log notes.
+
+One `search_index` table holds a row per document: (doc_type, doc_id,
+client_id, title, body). On SQLite it is an FTS5 virtual table ranked with
+bm25; on Postgres it is a plain table with a generated, weighted tsvector
+behind a GIN index, ranked with ts_rank_cd. Callers keep it in sync inside
+their own transaction (index_* / remove_* next to the write), and startup
+rebuilds it if it is empty while documents exist.
+
+Visibility is applied in SQL against the live tables, the same rules as the
+read endpoints: admins see everything; otherwise clients by owner, contact
+logs by author or share, and field reports through field_report_visibility.
+"""
+import re
+from typing import Iterable, Optional
+
+from sqlalchemy import text
+
+from db import engine
+from models import Client, ContactLog, FieldReport
+
+DOC_TYPES = ("field_report", "client", "contact_log")
+_IS_POSTGRES = engine.dialect.name == "postgresql"
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+_MAX_TERMS = 8
+
+
+def ensure_schema() -> None:
+    with engine.begin() as conn:
+        if _IS_POSTGRES:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS search_index ("
+                " doc_type VARCHAR(16) NOT NULL,"
+                " doc_id INTEGER NOT NULL,"
+                " client_id INTEGER,"
+                " title TEXT NOT NULL DEFAULT '',"
+                " body TEXT NOT NULL DEFAULT '',"
+                " tsv tsvector GENERATED ALWAYS AS ("
+                "  setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', body), 'B')"
+                " ) STORED,"
+                " PRIMARY KEY (doc_type, doc_id))"
+            ))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_search_index_tsv ON search_index USING GIN (tsv)"))
+        else:
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+                " doc_type UNINDEXED, doc_id UNINDEXED, client_id UNINDEXED, title, body,"
+                " tokenize = 'porter unicode61 remove_diacritics 2')"
+            ))
+
+
+def _join(*parts: Optional[str]) -> str:
+    return "\n".join(part for part in parts if part)
+
+
+def _client_doc(client) -> dict:
+    return {
+        "doc_type": "client",
+        "doc_id": client.id,
+        "client_id": client.id,
+        "title": client.display_name or "",
+        "body": _join(client.neighborhood, client.notes),
+    }
+
+
+def _contact_log_doc(log) -> dict:
+    return {"doc_type": "contact_log", "doc_id": log.id, "client_id": log.client_id, "title": "", "body": log.note or ""}
+
+
+def _field_report_doc(report) -> dict:
+    return {
+        "doc_type": "field_report",
+        "doc_id": report.id,
+        "client_id": None,
+        "title": report.title or "",
+        "body": _join(report.location_text, report.message),
+    }
+
+
+def remove(db, doc_type: str, doc_ids: Iterable[int]) -> None:
+    for doc_id in doc_ids:
+        db.execute(
+            text("DELETE FROM search_index WHERE doc_type = :doc_type AND doc_id = :doc_id"),
+            {"doc_type": doc_type, "doc_id": doc_id},
+        )
+
+
+def _put(db, docs: list[dict]) -> None:
+    for doc in docs:
+        remove(db, doc["doc_type"], [doc["doc_id"]])
+    if docs:
+        db.execute(
+            text(
+                "INSERT INTO search_index (doc_type, doc_id, client_id, title, body)"
+                " VALUES (:doc_type, :doc_id, :client_id, :title, :body)"
+            ),
+            docs,
+        )
+
+
+def index_client(db, client) -> None:
+    db.flush()
+    _put(db, [_client_doc(client)])
+
+
+def index_contact_log(db, log) -> None:
+    db.flush()
+    if log.note:
+        _put(db, [_contact_log_doc(log)])
+    else:
+        remove(db, "contact_log", [log.id])
+
+
+def index_field_report(db, report) -> None:
+    db.flush()
+    _put(db, [_field_report_doc(report)])
+
+
+def remove_client(db, client_id: int) -> None:
+    """Drop a client and all of its contact log notes."""
+    remove(db, "client", [client_id])
+    db.execute(
+        text("DELETE FROM search_index WHERE doc_type = 'contact_log' AND client_id = :client_id"),
+        {"client_id": client_id},
+    )
+
+
+def needs_backfill(db) -> bool:
+    has_docs = (
+        db.query(Client.id).first() is not None
+        or db.query(FieldReport.id).first() is not None
+    )
+    return has_docs and db.execute(text("SELECT 1 FROM search_index LIMIT 1")).first() is None
+
+
+def rebuild_all(db, chunk: int = 2000) -> int:
+    db.execute(text("DELETE FROM search_index"))
+    total = 0
+    for model, to_doc in ((Client, _client_doc), (ContactLog, _contact_log_doc), (FieldReport, _field_report_doc)):
+        last_id = 0
+        while True:
+            rows = db.query(model).filter(model.id > last_id).order_by(model.id).limit(chunk).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            docs = [to_doc(row) for row in rows if model is not ContactLog or row.note]
+            if docs:
+                db.execute(
+                    text(
+                        "INSERT INTO search_index (doc_type, doc_id, client_id, title, body)"
+                        " VALUES (:doc_type, :doc_id, :client_id, :title, :body)"
+                    ),
+                    docs,
+                )
+            total += len(docs)
+            db.expunge_all()
+    return total
+
+
+def query_terms(q: str) -> list[str]:
+    """Plain words from user input; search syntax is never passed through."""
+    return _TERM_RE.findall(q.lower())[:_MAX_TERMS]
+
+
+def _match_expression(terms: list[str]) -> str:
+    """All terms must match; the last one as a prefix so results follow typing."""
+    if _IS_POSTGRES:
+        return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+    return " ".join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+
+
+_VISIBLE = """
+(
+  (:is_admin AND (s.doc_type <> 'contact_log' OR EXISTS (
+      SELECT 1 FROM contact_logs cl WHERE cl.id = s.doc_id AND cl.created_by_user_id IS NOT NULL)))
+  OR (s.doc_type = 'field_report' AND EXISTS (
+      SELECT 1 FROM field_report_visibility v WHERE v.field_report_id = s.doc_id AND v.user_id = :user_id))
+  OR (s.doc_type = 'client' AND EXISTS (
+      SELECT 1 FROM clients c WHERE c.id = s.doc_id AND c.created_by_user_id = :user_id))
+  OR (s.doc_type = 'contact_log' AND (
+      EXISTS (SELECT 1 FROM contact_logs cl WHERE cl.id = s.doc_id AND cl.created_by_user_id = :user_id)
+      OR EXISTS (SELECT 1 FROM contact_log_shares sh
+                 WHERE sh.contact_log_id = s.doc_id AND sh.shared_with_user_id = :user_id)))
+)
+"""
+
+
+def search(db, q: str, user_id: int, is_admin: bool, doc_types: Iterable[str] = DOC_TYPES, limit: int = 20) -> list[dict]:
+    """Ranked hits visible to the user: {type, id, client_id, title, snippet, rank}."""
+    terms = query_terms(q)
+    doc_types = [t for t in DOC_TYPES if t in set(doc_types)]
+    if not terms or not doc_types:
+        return []
+    params = {
+        "match": _match_expression(terms),
+        "user_id": user_id,
+        "is_admin": is_admin,
+        "limit": limit,
+        **{f"type_{i}": t for i, t in enumerate(doc_types)},
+    }
+    type_list = ", ".join(f":type_{i}" for i in range(len(doc_types)))
+    if _IS_POSTGRES:
+        # Rank and filter first; ts_headline re-parses the body, so only run it on the page.
+        sql = f"""
+            WITH hits AS (
+                SELECT s.doc_type, s.doc_id, ts_rank_cd(s.tsv, to_tsquery('english', :match)) AS rank
+                FROM search_index s
+                WHERE s.tsv @@ to_tsquery('english', :match)
+                  AND s.doc_type IN ({type_list})
+                  AND {_VISIBLE}
+                ORDER BY rank DESC, s.doc_id DESC
+                LIMIT :limit
+            )
+            SELECT s.doc_type, s.doc_id, s.client_id, s.title, hits.rank,
+                   ts_headline('english', s.body, to_tsquery('english', :match),
+                               'StartSel=[, StopSel=], MaxWords=24, MinWords=8') AS snippet
+            FROM hits JOIN search_index s ON s.doc_type = hits.doc_type AND s.doc_id = hits.doc_id
+            ORDER BY hits.rank DESC, s.doc_id DESC
+        """
+    else:
+        # bm25 is lower-is-better; title hits weigh 4x body hits. Snippets are
+        # built only for the page, not for every match the sort has to see.
+        sql = f"""
+            WITH hits AS (
+                SELECT s.rowid AS rid, -bm25(search_index, 0, 0, 0, 4.0, 1.0) AS rank
+                FROM search_index s
+                WHERE search_index MATCH :match
+                  AND s.doc_type IN ({type_list})
+                  AND {_VISIBLE}
+                ORDER BY rank DESC, s.doc_id DESC
+                LIMIT :limit
+            )
+            SELECT s.doc_type, s.doc_id, s.client_id, s.title, hits.rank,
+                   snippet(search_index, 4, '[', ']', '...', 16) AS snippet
+            FROM search_index s JOIN hits ON s.rowid = hits.rid
+            WHERE search_index MATCH :match
+            ORDER BY hits.rank DESC, s.doc_id DESC
+        """
+    return [
+        {
+            "type": row.doc_type,
+            "id": int(row.doc_id),
+            "client_id": int(row.client_id) if row.client_id is not None else None,
+            "title": row.title or None,
+            "snippet": row.snippet,
+            "rank": float(row.rank),
+        }
+        for row in db.execute(text(sql), params)
+    ]
@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+DEFAULT_REUSE_SECONDS = float(os.getenv("SINGLEFLIGHT_REUSE_SECONDS", "5"))
+# Finished results kept for reuse at most; keys carry request parameters.
+MAX_KEYS = int(os.getenv("SINGLEFLIGHT_MAX_KEYS", "256"))
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.finished_at = 0.0
+        self.expires_at = 0.0
+
+
+class SingleFlight:
+    """Collapse concurrent identical calls into one execution.
+
+    The first caller for a key runs `fn`; callers arriving while it is in
+    flight block and receive the same result (or exception). A successful
+    result is also handed to callers within `reuse_seconds` of completion.
+    Coalescing is per process; the change bus keeps workers' caches coherent.
+
+    Expired results are swept whenever the lock is taken, and at most
+    `max_keys` finished results are kept (oldest dropped first), so varied
+    request parameters cannot grow the table without bound.
+    """
+
+    def __init__(self, max_keys: int = MAX_KEYS) -> None:
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    def _sweep(self, now: float) -> None:
+        """Drop expired finished calls, then the oldest finished ones past max_keys. Hold the lock."""
+        finished = [key for key, call in self._calls.items() if call.done.is_set()]
+        excess = len(finished) - self.max_keys
+        for key in finished:
+            if excess > 0 or self._calls[key].expires_at < now:
+                del self._calls[key]
+                excess -= 1
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        reuse_seconds: float = DEFAULT_REUSE_SECONDS,
+    ) -> tuple[Any, bool]:
+        """Returns (result, shared) where `shared` is True if another caller did the work."""
+        with self._lock:
+            now = time.monotonic()
+            self._sweep(now)
+            call = self._calls.get(key)
+            # A failed call is dropped right after it finishes; don't join it in between.
+            if call is not None and call.done.is_set() and call.error is not None:
+                call = None
+            owner = call is None
+            if owner:
+                call = _Call()
+                self._calls[key] = call
+
+        if not owner:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            call.finished_at = time.monotonic()
+            call.expires_at = call.finished_at + reuse_seconds
+            call.done.set()
+            with self._lock:
+                if call.error is not None or reuse_seconds <= 0:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+                else:
+                    self._sweep(call.finished_at)
+        return call.result, False
+
+    def forget_namespace(self, namespace: str) -> None:
+        """Drop reusable results for keys shaped (namespace, ...) once their inputs change."""
+        with self._lock:
+            for key in [
+                key for key, call in self._calls.items()
+                if call.done.is_set() and isinstance(key, tuple) and key[:1] == (namespace,)
+            ]:
+                del self._calls[key]
+
+
+group = SingleFlight()
@@ -0,0 +1,629 @@
+"""Incident source adapters and concurrent multi-source pulls.
+
+Every incident source is an adapter in REGISTRY. An adapter declares:
+
+- its id, which is also the taxonomy source;
+- a fetch strategy: an ArcGIS FeatureServer, a CSV file drop directory or
+  a JSON endpoint;
+- a FieldMap saying where each incident field sits in a source record;
+- how its sync cursor is used. The cursor is kept in source_cursors.
+
+pull() runs every enabled adapter in its own thread, each with its own
+deadline. The calling thread saves their chunks as they arrive, so a slow
+source does not hold up the others and a failing one is reported on its
+own. Chunks already saved from a source that later fails or times out are
+kept; its cursor does not move.
+
+Sources without a confirmed feed are registered disabled. Point one (or a
+new id) at a feed with INCIDENT_SOURCE_<ID>="csv:/drop/dir" or
+INCIDENT_SOURCE_<ID>="json:https://host/path". Both read GENERIC_FIELDS.
+"""
+import csv
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+import glob
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+import httpx
+
+import jsonstream
+import metrics
+from models import SourceCursor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("INCIDENT_SOURCE_TIMEOUT_SECONDS", "60"))
+CHUNK = 500
+# Chunks waiting to be saved, across all sources; producers block beyond this.
+_QUEUE_SIZE = 8
+_ENV_PREFIX = "INCIDENT_SOURCE_"
+
+
+@dataclass(frozen=True)
+class FieldMap:
+    """Where each normalized incident field is read from in a source record.
+
+    Every field lists candidate paths, and the first non-empty one wins.
+    Dots step into nested objects ("attributes.NIBRS_UNIQ"). A missing type
+    or category reads as "unknown". A missing time reads as now. Records
+    without an id or coordinates are skipped.
+    """
+
+    external_id: tuple[str, ...]
+    occurred_at: tuple[str, ...]
+    lat: tuple[str, ...]
+    lon: tuple[str, ...]
+    incident_type: tuple[str, ...]
+    offense_category: tuple[str, ...] = ()
+    block_address: tuple[str, ...] = ()
+    code_section: tuple[str, ...] = ()
+    offense_code: tuple[str, ...] = ()
+    id_prefix: str = ""
+    time_format: str = "iso"  # "epoch_ms", "iso" or a strptime format
+
+
+GENERIC_FIELDS = FieldMap(
+    external_id=("id", "incident_id", "case_number"),
+    occurred_at=("occurred_at", "date", "datetime"),
+    lat=("lat", "latitude", "geometry.y"),
+    lon=("lon", "lng", "longitude", "geometry.x"),
+    incident_type=("incident_type", "offense", "type"),
+    offense_category=("offense_category", "category"),
+    block_address=("block_address", "address"),
+    code_section=("code_section",),
+    offense_code=("offense_code",),
+)
+
+
+def normalized_incident(
+    *,
+    external_id: str,
+    incident_type: str,
+    offense_category: str,
+    occurred_at: datetime,
+    block_address: object = None,
+    code_section: object = None,
+    offense_code: object = None,
+    source: str,
+    lat: float,
+    lon: float,
+) -> dict[str, object]:
+    return {
+        "external_id": external_id,
+        "incident_type": incident_type,
+        "offense_category": offense_category,
+        "occurred_at": occurred_at,
+        "block_address": str(block_address) if block_address else None,
+        "code_section": str(code_section) if code_section else None,
+        "offense_code": str(offense_code) if offense_code else None,
+        "source": source,
+        "lat": float(lat),
+        "lon": float(lon),
+    }
+
+
+def _getter(paths: tuple[str, ...]) -> Callable[[dict], object]:
+    """Reads the first non-empty of `paths` from a record."""
+    steps = [(path.split(".")[0], tuple(path.split(".")[1:])) for path in paths]
+
+    def get(record: dict) -> object:
+        for head, rest in steps:
+            value = record.get(head)
+            for part in rest:
+                if not isinstance(value, dict):
+                    value = None
+                    break
+                value = value.get(part)
+            if value is not None and value != "":
+                return value
+        return None
+
+    return get
+
+
+def _parse_time(value: object, time_format: str) -> datetime:
+    if time_format == "epoch_ms":
+        return datetime.utcfromtimestamp(int(value) / 1000)
+    if time_format == "iso":
+        parsed = datetime.fromisoformat(str(value))
+    else:
+        parsed = datetime.strptime(str(value), time_format)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+@dataclass
+class Window:
+    since: datetime
+    until: Optional[datetime] = None
+    cursor: Optional[str] = None  # the source's last stored cursor
+
+
+class SourceAdapter:
+    """One incident source. Subclasses implement `records` for their fetch strategy."""
+
+    kind = ""
+
+    def __init__(
+        self,
+        id: str,
+        fields: FieldMap,
+        *,
+        enabled: bool = True,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        incremental: bool = False,
+        cursor_lookback: timedelta = timedelta(days=1),
+        note: str = "",
+    ):
+        self.id = id
+        self.fields = fields
+        self.enabled = enabled
+        self.timeout = timeout
+        # Incremental sources only fetch from their cursor (less the lookback)
+        # when that is later than the requested window start.
+        self.incremental = incremental
+        self.cursor_lookback = cursor_lookback
+        self.note = note
+        self._getters = {
+            name: _getter(getattr(fields, name))
+            for name in ("external_id", "occurred_at", "lat", "lon", "incident_type", "offense_category",
+                         "block_address", "code_section", "offense_code")
+        }
+
+    def parse(self, records: Iterable[dict]) -> Iterator[dict[str, object]]:
+        """Normalized incidents from raw source records."""
+        fields = self.fields
+        get = self._getters
+        for record in records:
+            raw_id = get["external_id"](record)
+            lat = get["lat"](record)
+            lon = get["lon"](record)
+            if not raw_id or lat is None or lon is None:
+                continue
+            raw_time = get["occurred_at"](record)
+            try:
+                occurred_at = _parse_time(raw_time, fields.time_format) if raw_time else datetime.utcnow()
+            except (TypeError, ValueError):
+                continue
+            yield normalized_incident(
+                external_id=f"{fields.id_prefix}{raw_id}",
+                incident_type=str(get["incident_type"](record) or "unknown"),
+                offense_category=str(get["offense_category"](record) or "unknown"),
+                occurred_at=occurred_at,
+                block_address=get["block_address"](record),
+                code_section=get["code_section"](record),
+                offense_code=get["offense_code"](record),
+                source=self.id,
+                lat=lat,
+                lon=lon,
+            )
+
+    def window(self, since: datetime, cursor: Optional[str]) -> Window:
+        if self.incremental and cursor:
+            since = max(since, datetime.fromisoformat(cursor) - self.cursor_lookback)
+        return Window(since=since, cursor=cursor)
+
+    def fetch(self, window: Window, deadline: float, state: dict) -> Iterator[dict[str, object]]:
+        """Normalized incidents for `window`. Sets state["cursor"] to the cursor to
+        store once every incident has been saved."""
+        newest = None
+        for incident in self.parse(self.records(window, deadline, state)):
+            if newest is None or incident["occurred_at"] > newest:
+                newest = incident["occurred_at"]
+            yield incident
+        if newest is not None:
+            state["cursor"] = max(newest.isoformat(), window.cursor or "")
+        else:
+            state["cursor"] = window.cursor
+
+    def records(self, window: Window, deadline: float, state: dict) -> Iterator[dict]:
+        raise NotImplementedError
+
+    def describe(self) -> dict[str, object]:
+        return {"id": self.id, "kind": self.kind, "enabled": self.enabled, "timeout_seconds": self.timeout,
+                "incremental": self.incremental, "note": self.note or None}
+
+
+def _remaining(deadline: float, cap: float = 60.0) -> float:
+    """Seconds left before `deadline`, for an HTTP timeout."""
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise TimeoutError("source deadline passed")
+    return min(left, cap)
+
+
+def _timed_chunks(chunks: Iterator[str], page: dict) -> Iterator[str]:
+    while True:
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        page["seconds"] += time.perf_counter() - started
+        if chunk is None:
+            return
+        yield chunk
+
+
+class ArcGISAdapter(SourceAdapter):
+    """A FeatureServer layer queried on a timestamp field and paged with resultOffset."""
+
+    kind = "arcgis"
+
+    def __init__(self, id: str, url: str, fields: FieldMap, *, time_field: str, order_by: str,
+                 out_fields: str = "*", page_size: int = 2000, **options):
+        super().__init__(id, fields, **options)
+        self.url = url
+        self.time_field = time_field
+        self.order_by = order_by
+        self.out_fields = out_fields
+        self.page_size = page_size
+
+    def params(self, since: datetime, until: Optional[datetime] = None,
+               page_size: Optional[int] = None) -> dict[str, str]:
+        where = f"{self.time_field} >= TIMESTAMP '{since.strftime('%Y-%m-%d %H:%M:%S')}'"
+        if until is not None:
+            where += f" AND {self.time_field} < TIMESTAMP '{until.strftime('%Y-%m-%d %H:%M:%S')}'"
+        return {
+            "f": "json",
+            "outFields": self.out_fields,
+            "returnGeometry": "true",
+            "outSR": "4326",
+            "where": where,
+            "resultRecordCount": str(page_size or self.page_size),
+            "orderByFields": self.order_by,
+        }
+
+    def features(
+        self,
+        since: datetime,
+        until: Optional[datetime] = None,
+        *,
+        url: Optional[str] = None,
+        page_size: Optional[int] = None,
+        client: Optional[httpx.Client] = None,
+        stats: Optional[dict[str, int]] = None,
+        deadline: Optional[float] = None,
+    ) -> Iterator[dict]:
+        """Raw features with since <= time_field (< until), following resultOffset pages.
+
+        Features are decoded one at a time from the response body as it
+        arrives, so nothing holds a whole page. Errors raise, possibly after
+        some features have already been yielded. `stats` receives the page
+        and feature counts.
+        """
+        page_size = page_size or self.page_size
+        params = self.params(since, until, page_size)
+        stream = client.stream if client is not None else httpx.stream
+        stats = stats if stats is not None else {}
+        stats.setdefault("pages", 0)
+        stats.setdefault("features", 0)
+        offset = 0
+        while True:
+            page = {"seconds": 0.0, "features": 0}
+            meta: dict[str, object] = {}
+            outcome = "error"
+            started = time.perf_counter()
+            timeout = _remaining(deadline) if deadline is not None else 60
+            try:
+                with stream("GET", url or self.url, params={**params, "resultOffset": str(offset)},
+                            timeout=timeout) as resp:
+                    resp.raise_for_status()
+                    page["seconds"] = time.perf_counter() - started
+                    for feature in jsonstream.iter_items(_timed_chunks(resp.iter_text(), page), "features", meta):
+                        page["features"] += 1
+                        yield feature
+                if "error" in meta:
+                    raise RuntimeError(f"ArcGIS error: {meta['error']}")
+                outcome = "ok"
+            finally:
+                # Time spent waiting on ArcGIS only, not on whoever consumes the features.
+                metrics.ARCGIS_FETCH_SECONDS.observe(page["seconds"] or time.perf_counter() - started, outcome=outcome)
+                metrics.ARCGIS_FEATURES.inc(page["features"])
+                stats["pages"] += 1
+                stats["features"] += page["features"]
+            offset += page["features"]
+            if not page["features"] or not (meta.get("exceededTransferLimit") or page["features"] >= page_size):
+                return
+
+    def records(self, window: Window, deadline: float, state: dict) -> Iterator[dict]:
+        return self.features(window.since, window.until, stats=state, deadline=deadline)
+
+    def describe(self) -> dict[str, object]:
+        return {**super().describe(), "url": self.url}
+
+
+class JSONAdapter(SourceAdapter):
+    """A JSON endpoint returning {records_key: [record, ...]}, filtered by a `since` query parameter."""
+
+    kind = "json"
+
+    def __init__(self, id: str, url: str, fields: FieldMap, *, records_key: str = "records",
+                 since_param: str = "since", params: Optional[dict[str, str]] = None, **options):
+        options.setdefault("incremental", True)
+        super().__init__(id, fields, **options)
+        self.url = url
+        self.records_key = records_key
+        self.since_param = since_param
+        self.params = params or {}
+
+    def records(self, window: Window, deadline: float, state: dict) -> Iterator[dict]:
+        params = {**self.params, self.since_param: window.since.isoformat()}
+        with httpx.stream("GET", self.url, params=params, timeout=_remaining(deadline)) as resp:
+            resp.raise_for_status()
+            yield from jsonstream.iter_items(resp.iter_text(), self.records_key)
+
+    def describe(self) -> dict[str, object]:
+        return {**super().describe(), "url": self.url}
+
+
+class CSVDropAdapter(SourceAdapter):
+    """*.csv files dropped in a directory. The cursor is the newest modification
+    time read, so each file is loaded once; the requested window is not applied."""
+
+    kind = "csv"
+
+    def __init__(self, id: str, directory: str, fields: FieldMap, **options):
+        super().__init__(id, fields, **options)
+        self.directory = directory
+
+    def _new_files(self, cursor: Optional[str]) -> list[tuple[float, str]]:
+        after = float(cursor) if cursor else 0.0
+        files = ((os.path.getmtime(path), path) for path in glob.glob(os.path.join(self.directory, "*.csv")))
+        return sorted(item for item in files if item[0] > after)
+
+    def fetch(self, window: Window, deadline: float, state: dict) -> Iterator[dict[str, object]]:
+        state["cursor"] = window.cursor
+        newest = None
+        for mtime, path in self._new_files(window.cursor):
+            with open(path, newline="", encoding="utf-8-sig") as f:
+                yield from self.parse(csv.DictReader(f))
+            newest = mtime
+            state["files"] = state.get("files", 0) + 1
+        if newest is not None:
+            state["cursor"] = repr(newest)
+
+    def describe(self) -> dict[str, object]:
+        return {**super().describe(), "directory": self.directory}
+
+
+# ---------------------------
+# Registry
+# ---------------------------
+REGISTRY: dict[str, SourceAdapter] = {}
+
+
+def register(adapter: SourceAdapter) -> SourceAdapter:
+    REGISTRY[adapter.id] = adapter
+    return adapter
+
+
+def get(source_id: str) -> SourceAdapter:
+    return REGISTRY[source_id]
+
+
+def ids() -> list[str]:
+    """Every registered source, enabled or not (their stored incidents still count)."""
+    return list(REGISTRY)
+
+
+def enabled() -> list[SourceAdapter]:
+    return [adapter for adapter in REGISTRY.values() if adapter.enabled]
+
+
+class _Placeholder(SourceAdapter):
+    kind = "none"
+
+    def records(self, window: Window, deadline: float, state: dict) -> Iterator[dict]:
+        return iter(())
+
+
+def _from_env(source_id: str, spec: str) -> SourceAdapter:
+    kind, _, target = spec.partition(":")
+    fields = replace(GENERIC_FIELDS, id_prefix=f"{source_id}_")
+    if kind == "csv":
+        return CSVDropAdapter(source_id, target, fields)
+    if kind == "json":
+        return JSONAdapter(source_id, target, fields)
+    raise ValueError(f"{_ENV_PREFIX}{source_id.upper()}: expected csv:<dir> or json:<url>, got {spec!r}")
+
+
+register(ArcGISAdapter(
+    "sdpd_nibrs",
+    # SDPD_ARCGIS_URL points pulls at a stand-in (see bench/arcgis_stub.py).
+    os.getenv("SDPD_ARCGIS_URL") or (
+        "https://webmaps.sandiego.gov/arcgis/rest/services"
+        "/SDPD/SDPD_NIBRS_Crime_Offenses_Geo/FeatureServer/0/query"
+    ),
+    FieldMap(
+        external_id=("attributes.NIBRS_UNIQ",),
+        occurred_at=("attributes.OCCURED_ON",),
+        lat=("geometry.y", "attributes.Y"),
+        lon=("geometry.x", "attributes.X"),
+        incident_type=("attributes.IBR_OFFENSE_DESCRIPTION", "attributes.PD_OFFENSE_CATEGORY"),
+        offense_category=("attributes.PD_OFFENSE_CATEGORY", "attributes.IBR_OFFENSE_DESCRIPTION"),
+        block_address=("attributes.BLOCK_ADDR",),
+        code_section=("attributes.CODE_SECTION",),
+        offense_code=("attributes.IBR_OFFENSE",),
+        id_prefix="sdpd_",
+        time_format="epoch_ms",
+    ),
+    time_field="OCCURED_ON",
+    order_by="NIBRS_UNIQ",
+    out_fields="NIBRS_UNIQ,OCCURED_ON,IBR_OFFENSE_DESCRIPTION,PD_OFFENSE_CATEGORY,BLOCK_ADDR,CODE_SECTION,IBR_OFFENSE,X,Y",
+    # Not incremental: rows are published days after OCCURED_ON, so a cursor
+    # on occurrence time would skip late arrivals. Each pull re-reads its window.
+))
+
+# Prefer the official SANDAG/ARJIS CIBRS open-data route for these once the
+# exact machine-readable dataset and field mapping are confirmed. SANDAG's
+# regional crime mapping includes El Cajon, La Mesa and the Sheriff's
+# contract-city and unincorporated areas (Spring Valley). The Sheriff's Calls
+# for Service page says it should not be relied on for statistical crime
+# data, so it is not a candidate.
+for _source_id, _note in (
+    ("el_cajon", "awaiting a SANDAG/ARJIS CIBRS feed"),
+    ("la_mesa", "awaiting a SANDAG/ARJIS CIBRS feed; city records pages have no incident API"),
+    ("sheriff", "awaiting a SANDAG/ARJIS CIBRS feed for Spring Valley; not Calls for Service"),
+):
+    register(_Placeholder(_source_id, GENERIC_FIELDS, enabled=False, note=_note))
+
+for _name, _spec in sorted(os.environ.items()):
+    if _name.startswith(_ENV_PREFIX) and _name != "INCIDENT_SOURCE_TIMEOUT_SECONDS" and _spec:
+        register(_from_env(_name[len(_ENV_PREFIX):].lower(), _spec))
+
+
+# ---------------------------
+# Pulls
+# ---------------------------
+_DONE = object()
+
+
+def _produce(adapter: SourceAdapter, window: Window, deadline: float, state: dict,
+             out: queue.Queue, stop: threading.Event) -> None:
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                out.put((adapter.id, item), timeout=0.25)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        chunk = []
+        for incident in adapter.fetch(window, deadline, state):
+            if stop.is_set():
+                return
+            chunk.append(incident)
+            if len(chunk) >= CHUNK:
+                if not put(chunk):
+                    return
+                chunk = []
+        if chunk and not put(chunk):
+            return
+        put(_DONE)
+    except Exception as e:
+        put(e)
+
+
+def pull(
+    db,
+    since: datetime,
+    save: Callable[[object, list[dict[str, object]]], tuple[int, int]],
+    adapters: Optional[list[SourceAdapter]] = None,
+) -> dict[str, dict[str, object]]:
+    """Fetch every adapter (default: the enabled ones) concurrently and save the
+    incidents with `save(db, chunk) -> (inserted, updated)` on this thread.
+
+    Each chunk is saved and committed in its own short transaction as it
+    arrives, so no write transaction (on SQLite, the database write lock)
+    stays open while a source is still on the network. A chunk that fails to
+    save fails its source only.
+
+    Returns per-source counts and status: "ok", "error" or "timeout", with an
+    "error" message for the last two. Cursors are updated in `db` once every
+    source is done; the caller commits them.
+    """
+    adapters = enabled() if adapters is None else adapters
+    cursors = {row.source: row.cursor for row in db.query(SourceCursor).filter(SourceCursor.source.in_([a.id for a in adapters]))}
+    db.rollback()  # end the read before the fetches start
+    out: queue.Queue = queue.Queue(maxsize=_QUEUE_SIZE)
+    started = time.monotonic()
+    deadlines: dict[str, float] = {}
+    states: dict[str, dict] = {}
+    stops: dict[str, threading.Event] = {}
+    results: dict[str, dict[str, object]] = {}
+    for adapter in adapters:
+        cursor = cursors.get(adapter.id)
+        deadlines[adapter.id] = started + adapter.timeout
+        states[adapter.id] = {}
+        stops[adapter.id] = threading.Event()
+        results[adapter.id] = {"status": "running", "fetched": 0, "inserted": 0, "skipped": 0}
+        threading.Thread(
+            target=_produce,
+            args=(adapter, adapter.window(since, cursor), deadlines[adapter.id], states[adapter.id],
+                  out, stops[adapter.id]),
+            name=f"source-{adapter.id}",
+            daemon=True,
+        ).start()
+
+    def finish(source_id: str, status: str, error: Optional[str] = None) -> None:
+        stops[source_id].set()
+        result = results[source_id]
+        result["status"] = status
+        result["seconds"] = round(time.monotonic() - started, 3)
+        if error:
+            result["error"] = error
+            logger.warning("incident source %s %s: %s", source_id, status, error)
+
+    pending = set(results)
+    try:
+        while pending:
+            wait = min(deadlines[source_id] for source_id in pending) - time.monotonic()
+            try:
+                source_id, item = out.get(timeout=max(wait, 0))
+            except queue.Empty:
+                now = time.monotonic()
+                for source_id in [s for s in pending if deadlines[s] <= now]:
+                    finish(source_id, "timeout", f"no complete response within {REGISTRY[source_id].timeout:g}s")
+                    pending.discard(source_id)
+                continue
+            if source_id not in pending:
+                continue  # late chunk from a source that already timed out
+            if item is _DONE:
+                finish(source_id, "ok")
+                pending.discard(source_id)
+            elif isinstance(item, Exception):
+                finish(source_id, "timeout" if isinstance(item, TimeoutError) else "error", str(item) or repr(item))
+                pending.discard(source_id)
+            else:
+                try:
+                    inserted, updated = save(db, item)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    finish(source_id, "error", f"save failed: {e}")
+                    pending.discard(source_id)
+                    continue
+                result = results[source_id]
+                result["fetched"] += len(item)
+                result["inserted"] += inserted
+                result["skipped"] += updated
+    finally:
+        for stop in stops.values():
+            stop.set()
+
+    now = datetime.utcnow()
+    rows = {row.source: row for row in db.query(SourceCursor).filter(SourceCursor.source.in_(list(results)))}
+    for source_id, result in results.items():
+        row = rows.get(source_id)
+        if row is None:
+            row = SourceCursor(source=source_id)
+            db.add(row)
+        if result["status"] == "ok":
+            row.cursor = states[source_id].get("cursor")
+        row.last_pulled_at = now
+        row.last_status = result["status"]
+        row.last_error = result.get("error")
+        row.last_fetched = result["fetched"]
+    return results
+
+
+def status(db) -> list[dict[str, object]]:
+    cursors = {row.source: row for row in db.query(SourceCursor)}
+    listed = []
+    for adapter in REGISTRY.values():
+        row = cursors.get(adapter.id)
+        listed.append({
+            **adapter.describe(),
+            "cursor": row.cursor if row else None,
+            "last_pulled_at": row.last_pulled_at if row else None,
+            "last_status": row.last_status if row else None,
+            "last_error": row.last_error if row else None,
+            "last_fetched": row.last_fetched if row else None,
+        })
+    return listed
@@ -0,0 +1,217 @@
+from datetime import datetime, timedelta
+import heapq
+from math import asin, cos, floor, radians, sin, sqrt
+import threading
+import time
+from typing import Generic, Iterable, Optional, TypeVar
+
+from sqlalchemy import select
+
+from db import SessionLocal
+import dedup
+from models import HotspotCell, Incident
+
+EARTH_RADIUS_M = 6371008.8
+_M_PER_DEG_LAT = 111_320.0
+
+T = TypeVar("T")
+
+
+def haversine_m(a_lat: float, a_lon: float, b_lat: float, b_lon: float) -> float:
+    d_lat = radians(b_lat - a_lat)
+    d_lon = radians(b_lon - a_lon)
+    h = sin(d_lat / 2) ** 2 + cos(radians(a_lat)) * cos(radians(b_lat)) * sin(d_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * asin(min(1.0, sqrt(h)))
+
+
+class GridIndex(Generic[T]):
+    """Uniform lat/lon bucket grid answering radius and k-nearest queries.
+
+    Each point lands in one `cell_deg` bucket; queries only touch the buckets
+    whose bounding box can intersect the search radius, so cost tracks local
+    density rather than the total number of points.
+    """
+
+    def __init__(self, points: Iterable[tuple[float, float, T]], cell_deg: float = 0.01):
+        self.cell_deg = cell_deg
+        self._buckets: dict[tuple[int, int], list[tuple[float, float, T]]] = {}
+        self._size = 0
+        rows = cols = None
+        for lat, lon, item in points:
+            key = self._key(lat, lon)
+            self._buckets.setdefault(key, []).append((lat, lon, item))
+            self._size += 1
+            rows = (key[0], key[0]) if rows is None else (min(rows[0], key[0]), max(rows[1], key[0]))
+            cols = (key[1], key[1]) if cols is None else (min(cols[0], key[1]), max(cols[1], key[1]))
+        self._rows = rows
+        self._cols = cols
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _key(self, lat: float, lon: float) -> tuple[int, int]:
+        return floor(lat / self.cell_deg), floor(lon / self.cell_deg)
+
+    def _ring(self, center: tuple[int, int], r: int):
+        ci, cj = center
+        if r == 0:
+            yield ci, cj
+            return
+        for j in range(cj - r, cj + r + 1):
+            yield ci - r, j
+            yield ci + r, j
+        for i in range(ci - r + 1, ci + r):
+            yield i, cj - r
+            yield i, cj + r
+
+    def _max_ring(self, center: tuple[int, int]) -> int:
+        if self._rows is None or self._cols is None:
+            return -1
+        ci, cj = center
+        return max(
+            abs(ci - self._rows[0]), abs(ci - self._rows[1]),
+            abs(cj - self._cols[0]), abs(cj - self._cols[1]),
+        )
+
+    def _ring_gap_m(self, lat: float, r: int) -> float:
+        """Lower bound on the distance from the query point to anything in ring `r` or beyond."""
+        m_per_deg_lon = _M_PER_DEG_LAT * max(cos(radians(lat)), 1e-6)
+        return max(0, r - 1) * self.cell_deg * min(_M_PER_DEG_LAT, m_per_deg_lon)
+
+    def within(self, lat: float, lon: float, radius_m: float) -> list[tuple[float, T]]:
+        """All points within `radius_m`, nearest first, as (distance_m, item)."""
+        lat_span = radius_m / _M_PER_DEG_LAT
+        lon_span = radius_m / (_M_PER_DEG_LAT * max(cos(radians(lat)), 1e-6))
+        i0, j0 = self._key(lat - lat_span, lon - lon_span)
+        i1, j1 = self._key(lat + lat_span, lon + lon_span)
+
+        hits: list[tuple[float, T]] = []
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                for p_lat, p_lon, item in self._buckets.get((i, j), ()):
+                    d = haversine_m(lat, lon, p_lat, p_lon)
+                    if d <= radius_m:
+                        hits.append((d, item))
+        hits.sort(key=lambda hit: hit[0])
+        return hits
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> list[tuple[float, T]]:
+        """The `k` nearest points as (distance_m, item), searched ring by ring outward."""
+        if k < 1 or not self._size:
+            return []
+        center = self._key(lat, lon)
+        max_ring = self._max_ring(center)
+        best: list[tuple[float, int, T]] = []  # max-heap via negated distance
+        seq = 0
+        r = 0
+        while r <= max_ring:
+            if len(best) == k and -best[0][0] <= self._ring_gap_m(lat, r):
+                break
+            for key in self._ring(center, r):
+                for p_lat, p_lon, item in self._buckets.get(key, ()):
+                    d = haversine_m(lat, lon, p_lat, p_lon)
+                    seq += 1
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, seq, item))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, seq, item))
+            r += 1
+        return sorted(((-neg_d, item) for neg_d, _, item in best), key=lambda hit: hit[0])
+
+
+class SpatialIndexService:
+    """Process-local indexes over hotspot cells and recent incidents.
+
+    Hotspot cells are rebuilt whenever /hotspots/run rewrites them; the
+    incident index covers the last `incident_window_days` and is rebuilt on
+    invalidation (pulls, seeds) or after `incident_ttl_seconds`.
+    """
+
+    def __init__(self, incident_window_days: int = 30, incident_ttl_seconds: int = 300):
+        self.incident_window_days = incident_window_days
+        self.incident_ttl_seconds = incident_ttl_seconds
+        self._lock = threading.Lock()
+        self._hotspots: Optional[GridIndex[dict[str, object]]] = None
+        self._incidents: Optional[GridIndex[datetime]] = None
+        self._incidents_built_at = 0.0
+
+    def invalidate_hotspots(self) -> None:
+        with self._lock:
+            self._hotspots = None
+
+    def invalidate_incidents(self) -> None:
+        with self._lock:
+            self._incidents = None
+
+    def hotspots(self) -> GridIndex[dict[str, object]]:
+        with self._lock:
+            if self._hotspots is None:
+                self._hotspots = self._build_hotspots()
+            return self._hotspots
+
+    def incidents(self) -> GridIndex[datetime]:
+        with self._lock:
+            stale = time.monotonic() - self._incidents_built_at > self.incident_ttl_seconds
+            if self._incidents is None or stale:
+                self._incidents = self._build_incidents()
+                self._incidents_built_at = time.monotonic()
+            return self._incidents
+
+    def _build_hotspots(self) -> GridIndex[dict[str, object]]:
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(
+                    HotspotCell.id,
+                    HotspotCell.grid_lat,
+                    HotspotCell.grid_lon,
+                    HotspotCell.risk_score,
+                    HotspotCell.recent_count,
+                    HotspotCell.baseline_count,
+                )
+            ).all()
+        finally:
+            db.close()
+        return GridIndex(
+            (
+                float(row.grid_lat),
+                float(row.grid_lon),
+                {
+                    "id": row.id,
+                    "grid_lat": row.grid_lat,
+                    "grid_lon": row.grid_lon,
+                    "risk_score": row.risk_score,
+                    "recent_count": row.recent_count,
+                    "baseline_count": row.baseline_count,
+                },
+            )
+            for row in rows
+        )
+
+    def _build_incidents(self) -> GridIndex[datetime]:
+        since = datetime.utcnow() - timedelta(days=self.incident_window_days)
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(Incident.lat, Incident.lon, Incident.occurred_at)
+                .where(Incident.occurred_at >= since, dedup.counted())
+            ).all()
+        finally:
+            db.close()
+        return GridIndex((float(lat), float(lon), occurred_at) for lat, lon, occurred_at in rows)
+
+    def incident_counts(self, lat: float, lon: float, radius_m: float, now: Optional[datetime] = None) -> dict[str, int]:
+        now = now or datetime.utcnow()
+        cut_24h = now - timedelta(hours=24)
+        cut_7d = now - timedelta(days=7)
+        counts = {"last_24h": 0, "last_7d": 0, f"last_{self.incident_window_days}d": 0}
+        for _, occurred_at in self.incidents().within(lat, lon, radius_m):
+            counts[f"last_{self.incident_window_days}d"] += 1
+            if occurred_at >= cut_7d:
+                counts["last_7d"] += 1
+            if occurred_at >= cut_24h:
+                counts["last_24h"] += 1
+        return counts
+
+
+spatial_index = SpatialIndexService()
@@ -0,0 +1,250 @@
+from collections import Counter as _Tally
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import logging
+import os
+import re
+import threading
+import time
+from typing import Iterator, Optional
+
+from sqlalchemy import event, text
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("SQL_PROFILE", "").strip().lower() in ("1", "true", "yes", "on")
+# The same statement shape this many times in one request is reported as N+1.
+REPEAT_THRESHOLD = int(os.getenv("SQL_PROFILE_REPEAT_THRESHOLD", "5"))
+# Full scans are only reported for tables at least this big.
+LARGE_TABLE_ROWS = int(os.getenv("SQL_PROFILE_LARGE_TABLE_ROWS", "1000"))
+HEADER = "x-sql-profile"
+_ROW_COUNT_TTL_SECONDS = 60
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)$")
+_POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def fingerprint(statement: str) -> str:
+    """Statement shape with literals and IN-list lengths erased."""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER.sub("?", shape)
+    shape = _PARAM_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+@dataclass
+class Profile:
+    queries: int = 0
+    db_seconds: float = 0.0
+    shapes: _Tally = field(default_factory=_Tally)
+    # First sighting of each SELECT shape, kept for EXPLAIN.
+    samples: dict[str, tuple[str, object]] = field(default_factory=dict)
+    scans: set[str] = field(default_factory=set)
+
+    def repeated(self, threshold: int = REPEAT_THRESHOLD) -> list[tuple[str, int]]:
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    def summary(self) -> str:
+        parts = [
+            f"queries={self.queries}",
+            f"db_ms={self.db_seconds * 1000:.1f}",
+            f"repeated={len(self.repeated())}",
+        ]
+        if self.scans:
+            parts.append(f"scans={','.join(sorted(self.scans))}")
+        return " ".join(parts)
+
+
+_profile: ContextVar[Optional[Profile]] = ContextVar("sql_profile", default=None)
+
+
+class _ThreadCapture:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.by_thread: dict[int, Profile] = {}
+
+
+_captures = _ThreadCapture()
+
+
+def _record(statement: str, parameters, elapsed: float) -> None:
+    targets = []
+    profile = _profile.get()
+    if profile is not None:
+        targets.append(profile)
+    if _captures.by_thread:
+        with _captures.lock:
+            captured = _captures.by_thread.get(threading.get_ident())
+        if captured is not None and captured is not profile:
+            targets.append(captured)
+    if not targets:
+        return
+    shape = fingerprint(statement)
+    for target in targets:
+        target.queries += 1
+        target.db_seconds += elapsed
+        target.shapes[shape] += 1
+        if shape.upper().startswith(("SELECT", "WITH")) and shape not in target.samples:
+            target.samples[shape] = (statement, parameters)
+
+
+def instrument_engine(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_profile_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("sql_profile_start")
+        if starts:
+            _record(statement, parameters, time.perf_counter() - starts.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        starts = exception_context.connection.info.get("sql_profile_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+
+
+class ScanDetector:
+    """Finds full scans of large tables via EXPLAIN, cached per statement shape."""
+
+    def __init__(self, engine, large_table_rows: int = LARGE_TABLE_ROWS):
+        self.engine = engine
+        self.large_table_rows = large_table_rows
+        self._postgres = engine.dialect.name == "postgresql"
+        self._plans: dict[str, set[str]] = {}
+        self._row_counts: dict[str, tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def scanned_tables(self, samples: dict[str, tuple[str, object]]) -> set[str]:
+        tables: set[str] = set()
+        for shape, (statement, parameters) in samples.items():
+            with self._lock:
+                cached = self._plans.get(shape)
+            if cached is None:
+                cached = self._explain(statement, parameters)
+                with self._lock:
+                    self._plans[shape] = cached
+            tables |= cached
+        # Catalog reads (inspector calls from the _ensure_* helpers) are not app scans.
+        tables = {table for table in tables if not table.startswith(("sqlite_", "pg_"))}
+        return {table for table in tables if self._row_count(table) >= self.large_table_rows}
+
+    def _explain(self, statement: str, parameters) -> set[str]:
+        prefix = "EXPLAIN " if self._postgres else "EXPLAIN QUERY PLAN "
+        token = _profile.set(None)  # keep our own EXPLAINs out of the request's tally
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+        except Exception:
+            logger.debug("EXPLAIN failed for %s", statement, exc_info=True)
+            return set()
+        finally:
+            _profile.reset(token)
+        if self._postgres:
+            return {match.group(1) for (line,) in rows for match in [_POSTGRES_SCAN.search(line)] if match}
+        return {match.group(1) for row in rows for match in [_SQLITE_SCAN.match(str(row[-1]))] if match}
+
+    def _row_count(self, table: str) -> int:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._row_counts.get(table)
+        if cached is not None and now - cached[0] < _ROW_COUNT_TTL_SECONDS:
+            return cached[1]
+        token = _profile.set(None)
+        try:
+            with self.engine.connect() as conn:
+                count = conn.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar() or 0
+        except Exception:
+            count = 0
+        finally:
+            _profile.reset(token)
+        with self._lock:
+            self._row_counts[table] = (now, count)
+        return count
+
+
+class SQLProfileMiddleware:
+    """Debug-mode ASGI middleware: per-request SQL count, N+1 shapes and large-table scans.
+
+    The summary goes out as an `X-SQL-Profile` response header; requests with
+    repeated statement shapes or scans also get a warning log line listing them.
+    """
+
+    def __init__(self, app, engine, skip_paths: tuple[str, ...] = ()):
+        self.app = app
+        self.skip_paths = skip_paths
+        self.scans = ScanDetector(engine)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile()
+        token = _profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.scans = await run_in_threadpool(self.scans.scanned_tables, dict(profile.samples))
+                headers = list(message.get("headers", []))
+                headers.append((HEADER.encode("latin-1"), profile.summary().encode("latin-1")))
+                message = {**message, "headers": headers}
+                _log(scope, profile)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _profile.reset(token)
+
+
+def _log(scope, profile: Profile) -> None:
+    repeated = profile.repeated()
+    if not repeated and not profile.scans:
+        return
+    route = getattr(scope.get("route"), "path", None) or scope["path"]
+    details = "; ".join(f"{n}x {shape[:160]}" for shape, n in repeated[:5])
+    logger.warning("sql profile %s %s: %s%s", scope["method"], route, profile.summary(), f" | {details}" if details else "")
+
+
+def parse_header(value: str) -> dict[str, str]:
+    return dict(part.split("=", 1) for part in value.split() if "=" in part)
+
+
+def assert_max_queries(response, limit: int) -> None:
+    """Fail if a profiled response ran more than `limit` statements.
+
+    Needs SQL_PROFILE=1 so the server attaches the header, e.g.
+    `assert_max_queries(client.get("/hotspots", headers=H), 5)`.
+    """
+    value = response.headers.get(HEADER)
+    if value is None:
+        raise AssertionError(f"{HEADER} header missing; start the app with SQL_PROFILE=1")
+    queries = int(parse_header(value)["queries"])
+    if queries > limit:
+        raise AssertionError(f"{response.request.method} {response.request.url.path} ran {queries} queries (limit {limit}): {value}")
+
+
+@contextmanager
+def max_queries(limit: int) -> Iterator[Profile]:
+    """Fail if code run directly on this thread (not via HTTP) executes more than `limit` statements."""
+    profile = Profile()
+    ident = threading.get_ident()
+    with _captures.lock:
+        _captures.by_thread[ident] = profile
+    try:
+        yield profile
+    finally:
+        with _captures.lock:
+            _captures.by_thread.pop(ident, None)
+    if profile.queries > limit:
+        worst = "; ".join(f"{n}x {shape[:120]}" for shape, n in profile.shapes.most_common(3))
+        raise AssertionError(f"ran {profile.queries} queries (limit {limit}): {worst}")
@@ -0,0 +1,215 @@
+"""Dictionary encoding for the incident taxonomy.
+
+Incidents used to repeat source, incident_type, offense_category,
+code_section and offense_code as strings on every row, although feeds only
+ever produce a few hundred combinations. Each combination now lives once in
+`incident_taxonomy` and incidents carry its integer id. `cache` maps both
+ways in process; the table is append-only, so a committed mapping never
+goes stale.
+
+Ids created by a session that has not committed yet stay in that session's
+`info` until commit, so a rollback cannot leave a dangling id in the cache.
+"""
+import threading
+from typing import NamedTuple
+
+from sqlalchemy import event, func, select, text
+
+from db import SessionLocal, engine
+from models import IncidentTaxonomy
+
+VIEW = "incidents_expanded"
+_PENDING = "taxonomy_pending"
+
+
+class Entry(NamedTuple):
+    source: str
+    incident_type: str
+    offense_category: str
+    code_section: str
+    offense_code: str
+
+
+def entry(
+    source: object,
+    incident_type: object,
+    offense_category: object = None,
+    code_section: object = None,
+    offense_code: object = None,
+) -> Entry:
+    """The normalized lookup key; missing optional parts become ""."""
+    return Entry(
+        str(source or "sdpd_demo"),
+        str(incident_type or "demo"),
+        str(offense_category or ""),
+        str(code_section or ""),
+        str(offense_code or ""),
+    )
+
+
+def optional(column):
+    """Select an optional taxonomy part as it used to read on Incident: NULL when empty."""
+    return func.nullif(column, "").label(column.key)
+
+
+def source_ids(*sources: str):
+    """Subquery of taxonomy ids for `sources`, for `Incident.taxonomy_id.in_(...)`."""
+    return select(IncidentTaxonomy.id).where(IncidentTaxonomy.source.in_(sources))
+
+
+class TaxonomyCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ids: dict[Entry, int] = {}
+        self._entries: dict[int, Entry] = {}
+
+    def _remember(self, taxonomy_id: int, key: Entry) -> None:
+        with self._lock:
+            self._ids[key] = taxonomy_id
+            self._entries[taxonomy_id] = key
+
+    def resolve(self, db, key: Entry) -> int:
+        """Id for `key`, inserting it inside the caller's transaction if it is new."""
+        with self._lock:
+            taxonomy_id = self._ids.get(key)
+        if taxonomy_id is not None:
+            return taxonomy_id
+        pending = db.info.setdefault(_PENDING, {})
+        if key in pending:
+            return pending[key]
+
+        lookup = select(IncidentTaxonomy.id).filter_by(**key._asdict())
+        taxonomy_id = db.execute(lookup).scalar()
+        if taxonomy_id is not None:
+            self._remember(taxonomy_id, key)
+            return taxonomy_id
+        inserted = db.execute(text(
+            "INSERT INTO incident_taxonomy (source, incident_type, offense_category, code_section, offense_code)"
+            " VALUES (:source, :incident_type, :offense_category, :code_section, :offense_code)"
+            " ON CONFLICT DO NOTHING"
+        ), key._asdict()).rowcount
+        taxonomy_id = db.execute(lookup).scalar_one()
+        if inserted:
+            pending[key] = taxonomy_id
+        else:
+            # Another writer committed the same combination first.
+            self._remember(taxonomy_id, key)
+        return taxonomy_id
+
+    def entries(self, db, taxonomy_ids) -> dict[int, Entry]:
+        """Id -> Entry for `taxonomy_ids`, loading the table again if any are unknown."""
+        taxonomy_ids = set(taxonomy_ids)
+        uncommitted = {taxonomy_id: key for key, taxonomy_id in db.info.get(_PENDING, {}).items()}
+        with self._lock:
+            missing = taxonomy_ids - self._entries.keys() - uncommitted.keys()
+        if missing:
+            for row in db.execute(select(IncidentTaxonomy)).scalars():
+                if row.id not in uncommitted:
+                    self._remember(row.id, entry(
+                        row.source, row.incident_type, row.offense_category, row.code_section, row.offense_code,
+                    ))
+        with self._lock:
+            found = {taxonomy_id: self._entries[taxonomy_id] for taxonomy_id in taxonomy_ids if taxonomy_id in self._entries}
+        found.update({taxonomy_id: key for taxonomy_id, key in uncommitted.items() if taxonomy_id in taxonomy_ids})
+        return found
+
+    def incident_types(self, db, taxonomy_ids) -> dict[int, str]:
+        return {taxonomy_id: key.incident_type for taxonomy_id, key in self.entries(db, taxonomy_ids).items()}
+
+    def commit(self, session) -> None:
+        for key, taxonomy_id in session.info.pop(_PENDING, {}).items():
+            self._remember(taxonomy_id, key)
+
+
+cache = TaxonomyCache()
+
+
+def resolve(db, item: dict) -> int:
+    """Taxonomy id for a normalized incident dict (see sources.normalized_incident)."""
+    return cache.resolve(db, entry(
+        item.get("source"),
+        item.get("incident_type"),
+        item.get("offense_category"),
+        item.get("code_section"),
+        item.get("offense_code"),
+    ))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _promote_pending(session) -> None:
+    cache.commit(session)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _drop_pending(session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+# ---------------------------
+# Schema migration
+# ---------------------------
+_LEGACY_COLUMNS = {
+    "source": "'sdpd_demo'",
+    "incident_type": "'demo'",
+    "offense_category": "''",
+    "code_section": "''",
+    "offense_code": "''",
+}
+
+
+def migrate(inspector) -> int:
+    """Fold the legacy per-row string columns of `incidents` into the taxonomy.
+
+    Adds `taxonomy_id` where missing, inserts every distinct combination,
+    points each incident at its row, then drops the string columns and
+    their index. Returns how many incidents were re-pointed. Safe to run on
+    every startup; it is a no-op once the columns are gone.
+    """
+    existing = {col["name"] for col in inspector.get_columns("incidents")}
+    legacy = [name for name in _LEGACY_COLUMNS if name in existing]
+    if "taxonomy_id" in existing and not legacy:
+        return 0
+    with engine.begin() as conn:
+        if "taxonomy_id" not in existing:
+            conn.execute(text("ALTER TABLE incidents ADD COLUMN taxonomy_id INTEGER REFERENCES incident_taxonomy(id)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_incidents_taxonomy_id ON incidents (taxonomy_id)"))
+        if not legacy:
+            return 0
+
+        # Legacy trees may predate code_section/offense_code; those read as "".
+        parts = {
+            name: f"COALESCE(NULLIF(incidents.{name}, ''), {default})" if name in legacy else default
+            for name, default in _LEGACY_COLUMNS.items()
+        }
+        names = ", ".join(_LEGACY_COLUMNS)
+        conn.execute(text(
+            f"INSERT INTO incident_taxonomy ({names})"
+            f" SELECT DISTINCT {', '.join(parts.values())} FROM incidents WHERE taxonomy_id IS NULL"
+            " ON CONFLICT DO NOTHING"
+        ))
+        match = " AND ".join(f"t.{name} = {expr}" for name, expr in parts.items())
+        moved = conn.execute(text(
+            f"UPDATE incidents SET taxonomy_id = (SELECT t.id FROM incident_taxonomy t WHERE {match})"
+            " WHERE taxonomy_id IS NULL"
+        )).rowcount
+        # SQLite refuses to drop an indexed column; Postgres drops the index with it.
+        conn.execute(text("DROP INDEX IF EXISTS ix_incidents_source"))
+        conn.execute(text(f"DROP VIEW IF EXISTS {VIEW}"))
+        for name in legacy:
+            conn.execute(text(f"ALTER TABLE incidents DROP COLUMN {name}"))
+    return moved
+
+
+def ensure_view() -> None:
+    """`incidents_expanded`: incidents with the taxonomy strings joined back in,
+    column for column what the table used to hold, for ad hoc SQL and exports."""
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP VIEW IF EXISTS {VIEW}"))
+        conn.execute(text(
+            f"CREATE VIEW {VIEW} AS"
+            " SELECT i.id, i.external_id, t.source, t.incident_type,"
+            " NULLIF(t.offense_category, '') AS offense_category, i.block_address,"
+            " NULLIF(t.code_section, '') AS code_section, NULLIF(t.offense_code, '') AS offense_code,"
+            " i.occurred_at, i.lat, i.lon, i.taxonomy_id"
+            " FROM incidents i JOIN incident_taxonomy t ON t.id = i.taxonomy_id"
+        ))
@@ -0,0 +1,299 @@
+import base64
+from datetime import datetime, timedelta
+import logging
+import os
+import threading
+from typing import Optional
+
+from sqlalchemy import and_, func, or_, select
+
+from db import SessionLocal
+import exposure
+from models import Client, ClientExposure, ClientTriageState, ContactLog
+
+logger = logging.getLogger(__name__)
+
+MISS_WINDOW_DAYS = 30
+DECAY_INTERVAL_SECONDS = int(os.getenv("TRIAGE_DECAY_INTERVAL_SECONDS", "900"))
+# Max points added for incidents near the client's home in the last 7 days (0 disables).
+EXPOSURE_URGENCY_CAP = int(os.getenv("TRIAGE_EXPOSURE_URGENCY_CAP", "10"))
+
+_NEED_FIELDS = ("need_housing", "need_food", "need_therapy", "need_job", "need_transport")
+NEED_NAMES = tuple(key.removeprefix("need_") for key in _NEED_FIELDS)
+
+
+def follow_up_state(now: datetime, follow_up_at: Optional[datetime]) -> str:
+    if not follow_up_at:
+        return "none"
+    diff_days = (now - follow_up_at).days
+    if diff_days >= 0:
+        return "overdue"
+    soon = abs(diff_days)
+    if soon <= 2:
+        return "soon"
+    if soon <= 7:
+        return "upcoming"
+    return "later"
+
+
+def days_since(now: datetime, last_contact_at: Optional[datetime]) -> int:
+    return 9999 if not last_contact_at else max(0, (now - last_contact_at).days)
+
+
+def compute_urgency(
+    now: datetime,
+    last_contact_at: Optional[datetime],
+    misses_30d: int,
+    follow_up_at: Optional[datetime],
+    incidents_7d: int = 0,
+) -> int:
+    base_urgency = (misses_30d * 5) + min(days_since(now, last_contact_at), 60)
+
+    state = follow_up_state(now, follow_up_at)
+    follow_up_urgency = 0
+    if state == "overdue":
+        follow_up_urgency = 50 + min((now - follow_up_at).days, 30)
+    elif state == "soon":
+        follow_up_urgency = 15
+    elif state == "upcoming":
+        follow_up_urgency = 8
+
+    exposure_urgency = min(incidents_7d // 2, EXPOSURE_URGENCY_CAP)
+
+    return base_urgency + follow_up_urgency + exposure_urgency
+
+
+def _apply_state(
+    state: ClientTriageState,
+    client: Client,
+    now: datetime,
+    last_contact_at: Optional[datetime],
+    misses_30d: int,
+    incidents_7d: int = 0,
+) -> bool:
+    """Write derived fields onto `state`; returns True when anything changed."""
+    values = {
+        "last_contact_at": last_contact_at,
+        "misses_30d": misses_30d,
+        "follow_up_at": client.follow_up_at,
+        "follow_up_state": follow_up_state(now, client.follow_up_at),
+        "needs_count": sum(int(bool(getattr(client, key))) for key in _NEED_FIELDS),
+        "urgency_score": compute_urgency(
+            now, last_contact_at, misses_30d, client.follow_up_at, incidents_7d
+        ),
+    }
+    changed = False
+    for key, value in values.items():
+        if getattr(state, key) != value:
+            setattr(state, key, value)
+            changed = True
+    state.scored_at = now
+    return changed
+
+
+def refresh_client_state(db, client: Client, now: Optional[datetime] = None) -> ClientTriageState:
+    """Recompute one client's triage row inside the caller's transaction.
+
+    Callers flush first so pending contact logs and client edits are visible;
+    the caller's commit makes the state change atomic with the write itself.
+    """
+    now = now or datetime.utcnow()
+    db.flush()
+
+    last_contact_at = (
+        db.query(func.max(ContactLog.contacted_at))
+        .filter(ContactLog.client_id == client.id)
+        .scalar()
+    )
+    misses_30d = (
+        db.query(func.count(ContactLog.id))
+        .filter(
+            ContactLog.client_id == client.id,
+            ContactLog.outcome == "no_answer",
+            ContactLog.contacted_at >= now - timedelta(days=MISS_WINDOW_DAYS),
+        )
+        .scalar()
+    ) or 0
+    incidents_7d = (
+        db.query(ClientExposure.incidents_7d)
+        .filter(ClientExposure.client_id == client.id)
+        .scalar()
+    ) or 0
+
+    state = db.get(ClientTriageState, client.id)
+    if state is None:
+        state = ClientTriageState(client_id=client.id)
+        db.add(state)
+    _apply_state(state, client, now, last_contact_at, int(misses_30d), int(incidents_7d))
+    return state
+
+
+def delete_client_state(db, client_id: int) -> None:
+    db.query(ClientTriageState).filter(ClientTriageState.client_id == client_id).delete(
+        synchronize_session=False
+    )
+    db.query(ClientExposure).filter(ClientExposure.client_id == client_id).delete(
+        synchronize_session=False
+    )
+
+
+def refresh_all_states(db, now: Optional[datetime] = None) -> dict[str, int]:
+    """Time-decay pass: age out 30-day misses, roll follow-up windows, backfill missing rows."""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=MISS_WINDOW_DAYS)
+
+    last_contact = dict(
+        db.query(ContactLog.client_id, func.max(ContactLog.contacted_at))
+        .group_by(ContactLog.client_id)
+        .all()
+    )
+    misses = dict(
+        db.query(ContactLog.client_id, func.count(ContactLog.id))
+        .filter(ContactLog.outcome == "no_answer", ContactLog.contacted_at >= cutoff)
+        .group_by(ContactLog.client_id)
+        .all()
+    )
+    exposure_7d = dict(db.query(ClientExposure.client_id, ClientExposure.incidents_7d).all())
+    states = {state.client_id: state for state in db.query(ClientTriageState).all()}
+
+    created = 0
+    updated = 0
+    for client in db.query(Client).all():
+        state = states.pop(client.id, None)
+        if state is None:
+            state = ClientTriageState(client_id=client.id)
+            db.add(state)
+            created += 1
+        if _apply_state(
+            state,
+            client,
+            now,
+            last_contact.get(client.id),
+            int(misses.get(client.id) or 0),
+            int(exposure_7d.get(client.id) or 0),
+        ):
+            updated += 1
+
+    # Rows whose client vanished outside the API (manual deletes, old DBs).
+    for orphan in states.values():
+        db.delete(orphan)
+
+    db.commit()
+    return {"created": created, "updated": updated, "removed": len(states)}
+
+
+def encode_cursor(state) -> str:
+    """`state` is a ClientTriageState or a queue_query row (both have urgency_score, client_id)."""
+    raw = f"{state.urgency_score}:{state.client_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    """Inverse of encode_cursor; raises ValueError on anything malformed."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        score, client_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii").split(":")
+        return int(score), int(client_id)
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def queue_query(
+    *,
+    after: Optional[tuple[int, int]] = None,
+    limit: Optional[int] = None,
+    neighborhood: Optional[str] = None,
+    needs: tuple[str, ...] = (),
+    owner_id: Optional[int] = None,
+    overdue_only: bool = False,
+    now: Optional[datetime] = None,
+):
+    """Queue rows ordered by (urgency desc, client id asc), served from the queue index.
+
+    A Core select of just the columns serialize_queue_item needs; run it with
+    `db.execute(...)` to get plain rows rather than ORM objects. `after` is the
+    (urgency_score, client_id) of the last row already returned, which turns
+    the next page into an index range seek instead of an OFFSET scan.
+    `overdue_only` compares follow_up_at with `now` directly: the stored
+    follow_up_state lags until the next write or decay pass.
+    """
+    query = (
+        select(
+            ClientTriageState.client_id,
+            ClientTriageState.urgency_score,
+            ClientTriageState.misses_30d,
+            ClientTriageState.needs_count,
+            ClientTriageState.last_contact_at,
+            Client.display_name,
+            Client.neighborhood,
+            Client.follow_up_at,
+        )
+        .join(Client, Client.id == ClientTriageState.client_id)
+    )
+    if neighborhood:
+        query = query.where(func.lower(Client.neighborhood) == neighborhood.strip().lower())
+    for need in needs:
+        query = query.where(getattr(Client, f"need_{need}").is_(True))
+    if owner_id is not None:
+        query = query.where(Client.created_by_user_id == owner_id)
+    if overdue_only:
+        # Same test as follow_up_state(now, follow_up_at) == "overdue".
+        query = query.where(Client.follow_up_at <= (now or datetime.utcnow()))
+    if after is not None:
+        after_score, after_id = after
+        query = query.where(
+            or_(
+                ClientTriageState.urgency_score < after_score,
+                and_(
+                    ClientTriageState.urgency_score == after_score,
+                    ClientTriageState.client_id > after_id,
+                ),
+            )
+        )
+    query = query.order_by(ClientTriageState.urgency_score.desc(), ClientTriageState.client_id.asc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def serialize_queue_item(row, now: datetime) -> dict[str, object]:
+    """One queue_query row; `follow_up_at` stays a datetime for FastJSONResponse to encode."""
+    return {
+        "client_id": row.client_id,
+        "display_name": row.display_name,
+        "neighborhood": row.neighborhood,
+        "days_since_last": days_since(now, row.last_contact_at),
+        "misses_30d": row.misses_30d,
+        "urgency_score": row.urgency_score,
+        "follow_up_at": row.follow_up_at,
+        "needs_count": row.needs_count,
+    }
+
+
+def run_decay_pass() -> None:
+    """Refresh caseload exposure, then re-score every client against it."""
+    db = SessionLocal()
+    try:
+        exposure.store_exposure(db, exposure.compute_exposure(db))
+        db.commit()
+        result = refresh_all_states(db)
+        logger.info("triage decay pass complete: %s", result)
+    except Exception:
+        db.rollback()
+        logger.exception("triage decay pass failed")
+    finally:
+        db.close()
+
+
+def start_decay_loop(interval_seconds: int = DECAY_INTERVAL_SECONDS) -> threading.Event:
+    """Run the decay pass now and then every `interval_seconds` on a daemon thread."""
+    stop = threading.Event()
+
+    def _loop() -> None:
+        while True:
+            run_decay_pass()
+            if stop.wait(interval_seconds):
+                return
+
+    threading.Thread(target=_loop, name="triage-decay", daemon=True).start()
+    return stop
@@ -0,0 +1,186 @@
+"""Content negotiation for the map endpoints.
+
+The default stays plain JSON with one object per row. Clients may ask for:
+
+- columnar JSON (`Accept: application/vnd.vpsd.columnar+json` or `?format=columnar`):
+  each list is sent as one array per field, and categorical fields as a
+  `{"values": [...], "codes": [...]}` dictionary. Decoding restores exactly
+  the row objects the default format would have carried.
+- MessagePack (`Accept: application/msgpack` or `?format=msgpack`), in
+  either layout (`?format=columnar-msgpack`, `application/vnd.vpsd.columnar+msgpack`).
+
+Any format is gzip-compressed when the client sends `Accept-Encoding: gzip`
+and the body is worth compressing.
+"""
+from datetime import date, datetime
+import gzip
+import struct
+from typing import Any, Iterable, Optional
+
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+
+from fast_json import dumps as json_dumps
+
+try:  # optional; the fallback packer below covers the types these endpoints emit
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
+COLUMNAR_JSON = "application/vnd.vpsd.columnar+json"
+COLUMNAR_MSGPACK = "application/vnd.vpsd.columnar+msgpack"
+MSGPACK = "application/msgpack"
+_MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack")
+_FORMATS = {
+    "json": ("rows", "json"),
+    "columnar": ("columnar", "json"),
+    "msgpack": ("rows", "msgpack"),
+    "columnar-msgpack": ("columnar", "msgpack"),
+}
+DEFAULT = ("rows", "json")
+GZIP_MIN_BYTES = 1024
+_GZIP_LEVEL = 5
+
+
+def columnar(rows: list[dict[str, Any]], categorical: Iterable[str] = ()) -> dict[str, Any]:
+    """Transpose row dicts into `{"length", "fields", "columns"}`.
+
+    Fields named in `categorical` are dictionary-encoded: `values` holds each
+    distinct value once (first-seen order) and `codes` indexes into it per row.
+    """
+    fields = list(rows[0].keys()) if rows else []
+    categorical = set(categorical)
+    columns: dict[str, Any] = {}
+    for name in fields:
+        column = [row[name] for row in rows]
+        if name in categorical:
+            index: dict[Any, int] = {}
+            codes = [index.setdefault(value, len(index)) for value in column]
+            columns[name] = {"values": list(index), "codes": codes}
+        else:
+            columns[name] = column
+    return {"length": len(rows), "fields": fields, "columns": columns}
+
+
+def _pack(value: Any, out: bytearray) -> None:
+    if value is None:
+        out.append(0xC0)
+    elif value is True:
+        out.append(0xC3)
+    elif value is False:
+        out.append(0xC2)
+    elif isinstance(value, int):
+        if 0 <= value < 0x80:
+            out.append(value)
+        elif -32 <= value < 0:
+            out.append(value & 0xFF)
+        elif 0 <= value <= 0xFFFFFFFF:
+            out += struct.pack(">BI", 0xCE, value) if value > 0xFFFF else struct.pack(">BH", 0xCD, value)
+        elif value >= 0:
+            out += struct.pack(">BQ", 0xCF, value)
+        elif value >= -0x80000000:
+            out += struct.pack(">Bi", 0xD2, value)
+        else:
+            out += struct.pack(">Bq", 0xD3, value)
+    elif isinstance(value, float):
+        out += struct.pack(">Bd", 0xCB, value)
+    elif isinstance(value, (datetime, date)):
+        _pack(value.isoformat(), out)
+    elif isinstance(value, str):
+        raw = value.encode("utf-8")
+        n = len(raw)
+        if n < 32:
+            out.append(0xA0 | n)
+        elif n <= 0xFF:
+            out += struct.pack(">BB", 0xD9, n)
+        elif n <= 0xFFFF:
+            out += struct.pack(">BH", 0xDA, n)
+        else:
+            out += struct.pack(">BI", 0xDB, n)
+        out += raw
+    elif isinstance(value, (list, tuple)):
+        n = len(value)
+        if n < 16:
+            out.append(0x90 | n)
+        elif n <= 0xFFFF:
+            out += struct.pack(">BH", 0xDC, n)
+        else:
+            out += struct.pack(">BI", 0xDD, n)
+        for item in value:
+            _pack(item, out)
+    elif isinstance(value, dict):
+        n = len(value)
+        if n < 16:
+            out.append(0x80 | n)
+        elif n <= 0xFFFF:
+            out += struct.pack(">BH", 0xDE, n)
+        else:
+            out += struct.pack(">BI", 0xDF, n)
+        for key, item in value.items():
+            _pack(key, out)
+            _pack(item, out)
+    else:
+        raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+
+def msgpack_dumps(content: Any) -> bytes:
+    if msgpack is not None:
+        return msgpack.packb(content, default=lambda v: v.isoformat() if isinstance(v, (datetime, date)) else v)
+    out = bytearray()
+    _pack(content, out)
+    return bytes(out)
+
+
+def choose_format(request: Request) -> tuple[str, str]:
+    """(layout, encoding) from `?format=` or else the Accept header; defaults to DEFAULT.
+
+    Call it before opening a session so a bad `?format=` is a 400, not a 500.
+    """
+    requested = request.query_params.get("format")
+    if requested:
+        try:
+            return _FORMATS[requested.strip().lower()]
+        except KeyError:
+            raise HTTPException(400, f"format must be one of: {', '.join(_FORMATS)}.")
+    accept = request.headers.get("accept", "").lower()
+    if COLUMNAR_MSGPACK in accept:
+        return "columnar", "msgpack"
+    if COLUMNAR_JSON in accept:
+        return "columnar", "json"
+    if any(alias in accept for alias in _MSGPACK_ALIASES):
+        return "rows", "msgpack"
+    return DEFAULT
+
+
+def respond(
+    request: Request,
+    fmt: tuple[str, str],
+    payload: dict[str, Any],
+    *,
+    list_keys: Iterable[str],
+    categorical: Optional[dict[str, Iterable[str]]] = None,
+) -> Response:
+    """Encode `payload` in `fmt` (from `choose_format`), gzipped if the client accepts it.
+
+    `list_keys` are the row lists to transpose in columnar layout;
+    `categorical` maps each of them to the fields to dictionary-encode.
+    """
+    layout, encoding = fmt
+    if layout == "columnar":
+        payload = dict(payload)
+        for key in list_keys:
+            payload[key] = columnar(payload[key], (categorical or {}).get(key, ()))
+
+    if encoding == "msgpack":
+        body = msgpack_dumps(payload)
+        media_type = COLUMNAR_MSGPACK if layout == "columnar" else MSGPACK
+    else:
+        body = json_dumps(payload)
+        media_type = COLUMNAR_JSON if layout == "columnar" else "application/json"
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if len(body) >= GZIP_MIN_BYTES and "gzip" in request.headers.get("accept-encoding", "").lower():
+        body = gzip.compress(body, compresslevel=_GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type=media_type, headers=headers)
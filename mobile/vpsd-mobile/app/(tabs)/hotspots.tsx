@@ -13,6 +13,7 @@ import {
 } from "react-native";
 import MapView, { Marker } from "react-native-maps";
 import { authenticatedFetch } from "../../src/api/client";
+import { COLUMNAR_JSON, ColumnarTable, decodeColumnar } from "../../src/api/columnar";
 
 type HotspotCell = {
   id: number;
@@ -203,10 +204,10 @@ export default function Hotspots() {
         if (__DEV__) console.log("[hotspots] fetched", data.cells?.length, "cells");
         setCells(Array.isArray(data.cells) ? data.cells : []);
       } else if (layer === "incidents" && events.length === 0) {
-        const res = await authenticatedFetch("/events?days=7");
+        const res = await authenticatedFetch("/events?days=7", { headers: { Accept: COLUMNAR_JSON } });
         if (!res.ok) throw new Error(`Events ${res.status}: ${await res.text()}`);
-        const data = await safeJson<{ items: Incident[] }>(res);
-        const items = Array.isArray(data.items) ? data.items : [];
+        const data = await safeJson<{ items: ColumnarTable }>(res);
+        const items = decodeColumnar<Incident>(data.items);
         if (__DEV__) console.log("[hotspots] fetched", items.length, "incidents");
         setEvents(items);
         if (items.length > 0) setLastUpdated(items[0].occurred_at);
@@ -229,20 +230,22 @@ export default function Hotspots() {
   const refresh = async () => {
     setLoading(true);
     try {
-      const [hotRes, evtRes, fcRes] = await Promise.all([
-        authenticatedFetch("/hotspots"),
-        authenticatedFetch("/events?days=7"),
-        authenticatedFetch("/hotspots/forecast?source=sdpd_nibrs"),
-      ]);
-      const hotData = await safeJson<HotspotsResponse>(hotRes);
-      setCells(Array.isArray(hotData.cells) ? hotData.cells : []);
-
-      const evtData = await safeJson<{ items: Incident[] }>(evtRes);
-      const items = Array.isArray(evtData.items) ? evtData.items : [];
+      // One round trip: the server builds all three layers from one incident snapshot.
+      const res = await authenticatedFetch("/dashboard/map?days=7&source=sdpd_nibrs", {
+        headers: { Accept: COLUMNAR_JSON },
+      });
+      if (!res.ok) throw new Error(`Dashboard ${res.status}: ${await res.text()}`);
+      const data = await safeJson<{
+        hotspots: ColumnarTable;
+        events: ColumnarTable;
+        forecast: ColumnarTable;
+      }>(res);
+      setCells(decodeColumnar<HotspotCell>(data.hotspots));
+
+      const items = decodeColumnar<Incident>(data.events);
       setEvents(items);
 
-      const fcData = await safeJson<{ cells: ForecastCell[] }>(fcRes);
-      setForecast(Array.isArray(fcData.cells) ? fcData.cells : []);
+      setForecast(decodeColumnar<ForecastCell>(data.forecast));
 
       if (items.length > 0) setLastUpdated(items[0].occurred_at);
     } catch (e: any) {
@@ -75,6 +75,8 @@ export default function ReportsScreen() {
   const [locationText, setLocationText] = useState("");
   const [severity, setSeverity] = useState<Severity | null>(null);
   const [reports, setReports] = useState<FieldReport[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [users, setUsers] = useState<UserItem[]>([]);
   const [groups, setGroups] = useState<GroupItem[]>([]);
   const [sharingReport, setSharingReport] = useState<FieldReport | null>(null);
@@ -92,8 +94,31 @@ export default function ReportsScreen() {
 
   const loadReports = async () => {
     const res = await authenticatedFetch(isAdmin ? "/field-reports/inbox" : "/field-reports");
-    const data = await parseApiResponse<{ reports?: FieldReport[] }>(res, "Unable to load field reports.");
+    const data = await parseApiResponse<{ reports?: FieldReport[]; next_cursor?: string | null }>(
+      res,
+      "Unable to load field reports."
+    );
     setReports(Array.isArray(data.reports) ? data.reports : []);
+    setNextCursor(data.next_cursor ?? null);
+  };
+
+  const loadMoreReports = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const res = await authenticatedFetch(`/field-reports?cursor=${encodeURIComponent(nextCursor)}`);
+      const data = await parseApiResponse<{ reports?: FieldReport[]; next_cursor?: string | null }>(
+        res,
+        "Unable to load more field reports."
+      );
+      const more = Array.isArray(data.reports) ? data.reports : [];
+      setReports((prev) => [...prev, ...more]);
+      setNextCursor(data.next_cursor ?? null);
+    } catch (e: any) {
+      Alert.alert("Reports Unavailable", getErrorMessage(e, "Please try again."));
+    } finally {
+      setLoadingMore(false);
+    }
   };
 
   const loadShareTargets = async () => {
@@ -404,6 +429,11 @@ export default function ReportsScreen() {
               </View>
             )}
           />
+          {!isAdmin && nextCursor ? (
+            <Pressable style={styles.refreshBtn} onPress={loadMoreReports} disabled={loadingMore}>
+              <Text style={styles.refreshBtnText}>{loadingMore ? "..." : "Load more"}</Text>
+            </Pressable>
+          ) : null}
         </View>
       </ScrollView>
 
@@ -38,6 +38,14 @@ export default function Screening() {
           <Text style={styles.bold}>Escalate: {String(result.is_escalated)}</Text>
           <Text>Reason: {result.escalation_reason || "None"}</Text>
           <Text>Next: {result.next_steps}</Text>
+          {Array.isArray(result.matches) && result.matches.length > 0 && (
+            <Text>
+              Matched:{" "}
+              {result.matches
+                .map((m: any) => (m.negated ? `${m.text} (negated)` : m.text))
+                .join(", ")}
+            </Text>
+          )}
         </View>
       )}
     </View>
@@ -28,7 +28,7 @@ type QueueItem = {
   needs_count: number;
 };
 
-type QueueResponse = { items: QueueItem[] };
+type QueueResponse = { items: QueueItem[]; next_cursor?: string | null };
 
 function parseISO(iso?: string | null) {
   if (!iso) return null;
@@ -59,7 +59,9 @@ export default function Triage() {
   const router = useRouter();
   const { logout } = useAuth();
   const [items, setItems] = useState<QueueItem[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // Add Client modal
   const [showAdd, setShowAdd] = useState(false);
@@ -90,6 +92,7 @@ export default function Triage() {
       const res = await authenticatedFetch("/triage/queue");
       const data = await parseApiResponse<QueueResponse>(res, "Unable to load the triage queue.");
       setItems(Array.isArray(data.items) ? data.items : []);
+      setNextCursor(data.next_cursor ?? null);
     } catch (e: any) {
       if (__DEV__) console.log(e?.message || e);
       Alert.alert("Triage Unavailable", getErrorMessage(e, "Please try again."));
@@ -98,6 +101,22 @@ export default function Triage() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor || loading || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const res = await authenticatedFetch(`/triage/queue?cursor=${encodeURIComponent(nextCursor)}`);
+      const data = await parseApiResponse<QueueResponse>(res, "Unable to load more of the triage queue.");
+      const more = Array.isArray(data.items) ? data.items : [];
+      setItems((prev) => [...prev, ...more]);
+      setNextCursor(data.next_cursor ?? null);
+    } catch (e: any) {
+      if (__DEV__) console.log(e?.message || e);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const addClient = async () => {
     const display_name = name.trim();
     if (!display_name) {
@@ -270,6 +289,9 @@ export default function Triage() {
           keyExtractor={(i) => String(i.client_id)}
           contentContainerStyle={{ padding: 16, paddingBottom: 28 }}
           renderItem={renderItem}
+          onEndReached={loadMore}
+          onEndReachedThreshold={0.5}
+          ListFooterComponent={loadingMore ? <ActivityIndicator style={{ marginTop: 12 }} /> : null}
           ListEmptyComponent={
             <Text style={styles.emptyText}>
               No clients yet. Tap “Add” to create your first client.
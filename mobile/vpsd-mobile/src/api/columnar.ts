@@ -0,0 +1,34 @@
+/**
+ * Columnar layout served by the map endpoints when requested with
+ * `Accept: application/vnd.vpsd.columnar+json` (see backend/wire_format.py).
+ */
+export const COLUMNAR_JSON = "application/vnd.vpsd.columnar+json";
+
+type DictionaryColumn = { values: unknown[]; codes: number[] };
+
+export type ColumnarTable = {
+  length: number;
+  fields: string[];
+  columns: Record<string, unknown[] | DictionaryColumn>;
+};
+
+/**
+ * Rebuild the row objects the default JSON layout would have carried.
+ */
+export function decodeColumnar<T>(table: ColumnarTable | null | undefined): T[] {
+  if (!table || !Array.isArray(table.fields)) return [];
+  const columns = table.fields.map((field) => {
+    const column = table.columns[field];
+    if (Array.isArray(column)) return column;
+    return column.codes.map((code) => column.values[code]);
+  });
+  const rows = new Array<T>(table.length);
+  for (let i = 0; i < table.length; i++) {
+    const row: Record<string, unknown> = {};
+    for (let f = 0; f < table.fields.length; f++) {
+      row[table.fields[f]] = columns[f][i];
+    }
+    rows[i] = row as T;
+  }
+  return rows;
+}